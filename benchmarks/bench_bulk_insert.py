@@ -0,0 +1,62 @@
+"""
+Throughput of loading rows with psycopg2's row-at-a-time executemany against
+the paged executemany, insert_rows (multi-row VALUES) and copy_rows (COPY).
+
+    FORTRESS_BENCH_DSN="dbname=... user=..." python -m benchmarks.bench_bulk_insert [rows]
+"""
+
+import datetime
+import os
+import sys
+import time
+
+import psycopg2
+
+from fortress_sdk_python.postgres import PostgresConnection
+
+COLUMNS = ["id", "name", "payload", "created"]
+INSERT = "INSERT INTO fortress_bench_insert (id, name, payload, created) VALUES (%s, %s, %s, %s)"
+
+
+def rows(count: int):
+    created = datetime.datetime(2024, 1, 1)
+    for i in range(count):
+        yield (i, f"name {i}", None if i % 10 == 0 else "tab\there", created)
+
+
+def main(count: int = 100_000) -> None:
+    raw = psycopg2.connect(os.environ["FORTRESS_BENCH_DSN"])
+    connection = PostgresConnection(raw)
+    connection.executescript(
+        "DROP TABLE IF EXISTS fortress_bench_insert;"
+        "CREATE TABLE fortress_bench_insert (id int, name text, payload text, created timestamp)"
+    )
+    connection.commit()
+
+    def measure(name: str, load) -> None:
+        connection.executescript("TRUNCATE fortress_bench_insert")
+        start = time.perf_counter()
+        load()
+        connection.commit()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<28} {count / elapsed:12.0f} rows/s")
+
+    with raw.cursor() as cursor:
+        measure("psycopg2 executemany", lambda: cursor.executemany(INSERT, rows(count)))
+    measure("executemany(page_size=100)", lambda: connection.executemany(INSERT, rows(count)))
+    measure(
+        "insert_rows(page_size=1000)",
+        lambda: connection.insert_rows("fortress_bench_insert", COLUMNS, rows(count)),
+    )
+    measure(
+        "copy_rows",
+        lambda: connection.copy_rows("fortress_bench_insert", COLUMNS, rows(count)),
+    )
+
+    connection.executescript("DROP TABLE fortress_bench_insert")
+    connection.commit()
+    connection.close()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,44 @@
+"""
+Per-decrypt cost of the one-shot crypto.decrypt, which parses the API key on
+every call, against a reused Decryptor and Decryptor.decrypt_many.
+
+    python -m benchmarks.bench_decrypt [count]
+"""
+
+import sys
+import time
+
+from fortress_sdk_python.crypto import Decryptor, decrypt
+
+from .fixtures import connection_details, encrypt, generate_api_key
+
+
+def measure(name: str, count: int, function) -> None:
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<32} {elapsed / count * 1e6:10.1f} us/decrypt")
+
+
+def main(count: int = 2000) -> None:
+    api_key, public_key = generate_api_key()
+    ciphertexts = [
+        encrypt(public_key, connection_details(f"tenant{i}")) for i in range(count)
+    ]
+    decryptor = Decryptor(api_key)
+
+    measure("decrypt()", count, lambda: [decrypt(api_key, c) for c in ciphertexts])
+    measure(
+        "Decryptor.decrypt()",
+        count,
+        lambda: [decryptor.decrypt(c) for c in ciphertexts],
+    )
+    measure(
+        "Decryptor.decrypt_many()",
+        count,
+        lambda: decryptor.decrypt_many(ciphertexts),
+    )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
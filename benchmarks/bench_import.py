@@ -0,0 +1,59 @@
+"""
+Startup cost of the package: wall time of each import statement in a fresh
+interpreter, the median of several runs, and which heavy dependencies it
+pulled in.
+
+    python -m benchmarks.bench_import [runs]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+
+STATEMENTS = [
+    "import fortress_sdk_python",
+    "from fortress_sdk_python import Fortress",
+    "from fortress_sdk_python import AsyncFortress",
+    "from fortress_sdk_python import Fortress; Fortress('org', 'key')",
+    "from fortress_sdk_python import postgres",
+]
+
+HEAVY = ["requests", "cryptography", "psycopg2", "psycopg", "httpx", "numpy", "asyncio"]
+
+# Runs in the child interpreter, after its own startup
+PROBE = """
+import sys, time
+start = time.perf_counter()
+exec({statement!r})
+elapsed = time.perf_counter() - start
+print(elapsed, ",".join(name for name in {heavy!r} if name in sys.modules))
+"""
+
+
+def measure(statement: str, runs: int) -> tuple[float, str]:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=root)
+    samples = []
+    loaded = ""
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(statement=statement, heavy=HEAVY)],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split()
+        samples.append(float(output[0]))
+        loaded = output[1] if len(output) > 1 else "-"
+    return statistics.median(samples), loaded
+
+
+def main(runs: int = 7) -> None:
+    for statement in STATEMENTS:
+        elapsed, loaded = measure(statement, runs)
+        print(f"{statement:<66} {elapsed * 1e3:8.1f} ms  {loaded}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
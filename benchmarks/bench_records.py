@@ -0,0 +1,77 @@
+"""
+Bytes per tenant record held in memory: plain dataclasses with parsed dates,
+as list_tenants used to return, against the slotted Tenant records and a
+TenantTable.
+
+    python -m benchmarks.bench_records [count]
+"""
+
+import dataclasses
+import datetime
+import gc
+import json
+import sys
+import tracemalloc
+
+from fortress_sdk_python.client import parse_tenant
+from fortress_sdk_python.tenant_table import TenantTable
+
+
+@dataclasses.dataclass
+class PlainTenant:
+    id: str
+    alias: str
+    database_id: str
+    created_date: datetime.datetime
+
+
+def responses(count: int, databases: int = 100) -> list[dict]:
+    return [
+        {
+            "tenantId": f"tenant-{i:08d}",
+            "alias": f"customer {i % databases}",
+            "databaseId": f"database-{i % databases:04d}",
+            "createdDate": f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}T12:{i % 60:02d}:00",
+        }
+        for i in range(count)
+    ]
+
+
+def plain(data: dict) -> PlainTenant:
+    return PlainTenant(
+        id=data["tenantId"],
+        alias=data["alias"],
+        database_id=data["databaseId"],
+        created_date=datetime.datetime.fromisoformat(data["createdDate"]),
+    )
+
+
+def measure(name: str, count: int, body: bytes, build) -> None:
+    """Decode a list response and build records from it, reporting what stays allocated"""
+    gc.collect()
+    tracemalloc.start()
+    records = build(json.loads(body)["tenants"])
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<16} {size / count:8.1f} bytes/record")
+    del records
+
+
+def main(count: int = 200_000) -> None:
+    body = json.dumps({"tenants": responses(count)}).encode()
+
+    measure("dataclass", count, body, lambda items: [plain(item) for item in items])
+    measure(
+        "Tenant", count, body, lambda items: [parse_tenant(item) for item in items]
+    )
+    measure(
+        "TenantTable",
+        count,
+        body,
+        lambda items: TenantTable(parse_tenant(item) for item in items),
+    )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
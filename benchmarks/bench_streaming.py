@@ -0,0 +1,51 @@
+"""
+Peak RSS of reading a large result with fetchall against iterating a
+streaming (server-side) cursor. Each mode runs in its own process.
+
+    FORTRESS_BENCH_DSN="dbname=... user=..." python -m benchmarks.bench_streaming [rows]
+"""
+
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import psycopg2
+
+from fortress_sdk_python.postgres import PostgresConnection
+
+QUERY = "SELECT i, md5(i::text), now() FROM generate_series(1, %s) AS i"
+
+
+def run(mode: str, rows: int) -> None:
+    connection = PostgresConnection(psycopg2.connect(os.environ["FORTRESS_BENCH_DSN"]))
+    start = time.perf_counter()
+    count = 0
+
+    if mode == "fetchall":
+        count = len(connection.cursor().execute(QUERY, (rows,)).fetchall())
+    else:
+        with connection.cursor(stream=True, itersize=5000) as cursor:
+            for _ in cursor.execute(QUERY, (rows,)):
+                count += 1
+
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:<10} {count} rows {elapsed:8.2f} s peak RSS {peak:8.1f} MiB")
+    connection.close()
+
+
+def main(rows: int = 1_000_000) -> None:
+    for mode in ("fetchall", "stream"):
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_streaming", "--run", mode, str(rows)],
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--run"]:
+        run(sys.argv[2], int(sys.argv[3]))
+    else:
+        main(*(int(arg) for arg in sys.argv[1:]))
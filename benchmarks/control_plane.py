@@ -0,0 +1,141 @@
+"""
+Local stand-in for the Fortress control plane
+
+Serves the endpoints the SDK calls, for organizations of any size: the size
+is the number at the end of the organization ID, e.g. org-100000 has 100,000
+tenants named tenant-0 ... tenant-99999 spread over databases of 100 tenants.
+Connection details are encrypted the way the Fortress API encrypts them, for
+the public key of the API key the server was created with.
+"""
+
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .fixtures import encrypt
+
+TENANTS_PER_DATABASE = 100
+
+_ORG_RE = re.compile(r"^/v1/organization/([^/]+)(/.*)$")
+_SIZE_RE = re.compile(r"(\d+)$")
+
+
+def org_size(org_id: str) -> int:
+    match = _SIZE_RE.search(org_id)
+    return int(match.group(1)) if match else 0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, with Nagle's algorithm every
+    # response would wait for the client's delayed ACK
+    disable_nagle_algorithm = True
+    server: "ControlPlane"
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        match = _ORG_RE.match(self.path.split("?", 1)[0])
+        if match is None:
+            return self.__send(404, b"{}")
+        org_id, path = match.groups()
+
+        if path == "/tenants":
+            return self.__send(200, self.server.listing(org_id, "tenants"))
+        if path == "/databases":
+            return self.__send(200, self.server.listing(org_id, "databases"))
+
+        uri = re.fullmatch(r"/(tenant|database)/([^/]+)/uri", path)
+        if uri is None:
+            return self.__send(404, b"{}")
+        kind, id = uri.groups()
+        if kind == "tenant":
+            index = _SIZE_RE.search(id)
+            if index is None or int(index.group(1)) >= org_size(org_id):
+                return self.__send(404, b'{"message": "Tenant not found"}')
+            database_id = f"database-{int(index.group(1)) // TENANTS_PER_DATABASE}"
+        else:
+            database_id = id
+        body = json.dumps(
+            {"databaseId": database_id, "connectionDetails": self.server.ciphertext}
+        )
+        self.__send(200, body.encode())
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.endswith("/database"):
+            return self.__send(200, b'{"databaseId": "database-new"}')
+        self.__send(200, b"{}")
+
+    def do_DELETE(self) -> None:
+        self.__send(200, b"{}")
+
+    def __send(self, status: int, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ControlPlane(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, public_key, connection_details: str) -> None:
+        """
+        Start serving on a free local port in a background thread
+
+        :param public_key: Public key matching the API key used by the client
+        :param connection_details: Plaintext JSON connection details served for every tenant
+        """
+        super().__init__(("127.0.0.1", 0), _Handler)
+        # Every tenant gets the same ciphertext, the client still decrypts it
+        # in full on every resolution
+        self.ciphertext = encrypt(public_key, connection_details)
+        self.base_url = f"http://127.0.0.1:{self.server_port}"
+        self.__listings: dict[tuple[str, str], bytes] = {}
+        self.__lock = threading.Lock()
+        self.__thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.__thread.start()
+
+    def listing(self, org_id: str, resource: str) -> bytes:
+        """Body of the tenants or databases list of an organization, built once"""
+        key = (org_id, resource)
+        with self.__lock:
+            body = self.__listings.get(key)
+            if body is None:
+                body = self.__listings[key] = self.__build_listing(org_id, resource)
+        return body
+
+    def close(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    @staticmethod
+    def __build_listing(org_id: str, resource: str) -> bytes:
+        size = org_size(org_id)
+        if resource == "tenants":
+            items = [
+                {
+                    "tenantId": f"tenant-{i}",
+                    "alias": f"Tenant {i}",
+                    "databaseId": f"database-{i // TENANTS_PER_DATABASE}",
+                    "createdDate": f"2024-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}",
+                }
+                for i in range(size)
+            ]
+        else:
+            items = [
+                {
+                    "databaseId": f"database-{i}",
+                    "alias": f"Database {i}",
+                    "sizeBytes": 1 << 30,
+                    "averageReadIOPS": 100,
+                    "averageWriteIOPS": 10,
+                    "createdDate": "2024-01-01T00:00:00",
+                }
+                for i in range(max(1, size // TENANTS_PER_DATABASE))
+            ]
+        return json.dumps({resource: items}).encode()
@@ -0,0 +1,55 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+
+from cryptography.hazmat.primitives import padding, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+
+def generate_api_key() -> tuple[str, ec.EllipticCurvePublicKey]:
+    """Generate an API key in the format the SDK expects, with its public key"""
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.TraditionalOpenSSL,
+        serialization.NoEncryption(),
+    ).decode()
+    body = "".join(line for line in pem.splitlines() if not line.startswith("-----"))
+    return body, private_key.public_key()
+
+
+def encrypt(public_key: ec.EllipticCurvePublicKey, plaintext: str) -> str:
+    """Encrypt a plaintext the way the Fortress API encrypts connection details"""
+    ephemeral = ec.generate_private_key(ec.SECP256R1())
+    ephemeral_public_key = ephemeral.public_key().public_bytes(
+        serialization.Encoding.X962,
+        serialization.PublicFormat.UncompressedPoint,
+    )
+    shared = hashlib.sha256(ephemeral.exchange(ec.ECDH(), public_key)).digest()
+
+    padder = padding.PKCS7(128).padder()
+    padded = padder.update(plaintext.encode()) + padder.finalize()
+    iv = os.urandom(16)
+    encryptor = Cipher(algorithms.AES(shared[:16]), modes.CBC(iv)).encryptor()
+    body = iv + encryptor.update(padded) + encryptor.finalize()
+    mac = hmac.new(shared[16:], body, hashlib.sha1).digest()
+
+    return base64.b64encode(
+        bytes([len(ephemeral_public_key)]) + ephemeral_public_key + body + mac
+    ).decode()
+
+
+def connection_details(tenant_id: str, database_id: str = "database") -> str:
+    """Plaintext connection details for a tenant"""
+    return json.dumps(
+        {
+            "url": "localhost",
+            "database": database_id,
+            "port": 5432,
+            "username": f"user_{tenant_id}",
+            "password": f"password_{tenant_id}",
+        }
+    )
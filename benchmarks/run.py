@@ -0,0 +1,218 @@
+"""
+End-to-end benchmarks against a local stand-in for the Fortress control plane
+
+Reports latency percentiles and throughput of decrypt, get_uri, cold and warm
+connect_tenant, tenant and database listings and bulk reads and writes. With
+--dsn, or FORTRESS_BENCH_DSN, tenants connect to that Postgres server;
+otherwise an in-process stub driver is used and only the SDK's own overhead
+is measured.
+
+    python -m benchmarks.run [--dsn DSN] [--iterations 200] [--sizes 1000,100000] [--rows 100000]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+from contextlib import nullcontext
+from typing import Callable
+from unittest import mock
+
+import psycopg2.extensions
+
+from fortress_sdk_python import Fortress
+from fortress_sdk_python import postgres
+from fortress_sdk_python.client import Client
+from fortress_sdk_python.crypto import Decryptor
+
+from . import stub_driver
+from .control_plane import TENANTS_PER_DATABASE, ControlPlane
+from .fixtures import generate_api_key
+
+READ_QUERY = "SELECT i, md5(i::text), i * 0.5 FROM generate_series(1, %s) AS i"
+
+
+def print_header() -> None:
+    print(
+        f"{'benchmark':<34} {'n':>7} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} "
+        f"{'mean ms':>9} {'ops/s':>11}"
+    )
+
+
+def report(name: str, samples: list[float], items: int = 1) -> None:
+    """Print percentiles of per-operation seconds, and items processed per second"""
+    samples = sorted(samples)
+
+    def percentile(fraction: float) -> float:
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))] * 1e3
+
+    mean = statistics.fmean(samples)
+    print(
+        f"{name:<34} {len(samples):>7} {percentile(0.5):>9.3f} {percentile(0.9):>9.3f} "
+        f"{percentile(0.99):>9.3f} {mean * 1e3:>9.3f} {items / mean:>11,.0f}"
+    )
+
+
+def timed(function: Callable[[int], object], iterations: int) -> list[float]:
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        function(i)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def connection_details(dsn: str | None) -> str:
+    if dsn is None:
+        details = {"url": "stub", "port": 5432, "database": "stub"}
+        details.update(username="stub", password="stub")
+    else:
+        parsed = psycopg2.extensions.parse_dsn(dsn)
+        details = {
+            "url": parsed.get("host", "localhost"),
+            "port": int(parsed.get("port", 5432)),
+            "database": parsed.get("dbname", "postgres"),
+            "username": parsed.get("user", "postgres"),
+            # The SDK requires a password, servers using trust auth ignore it
+            "password": parsed.get("password", "unused"),
+        }
+    return json.dumps(details)
+
+
+def bench_control_plane(api_key: str, server: ControlPlane, iterations: int) -> None:
+    decryptor = Decryptor(api_key)
+    report(
+        "decrypt",
+        timed(lambda i: decryptor.decrypt(server.ciphertext), iterations),
+    )
+
+    client = Client(f"org-{iterations}", api_key, server.base_url)
+    report(
+        "get_uri",
+        timed(lambda i: client.get_uri(f"tenant-{i}", "tenant"), iterations),
+    )
+    client.close()
+
+
+def bench_connect(api_key: str, server: ControlPlane, iterations: int) -> None:
+    # One tenant per database, so every cold connect misses the details
+    # cache and opens a new pooled connection
+    org_id = f"org-{iterations * TENANTS_PER_DATABASE}"
+    with Fortress(org_id, api_key, base_url=server.base_url) as fortress:
+
+        def connect(i: int) -> None:
+            fortress.connect_tenant(f"tenant-{i * TENANTS_PER_DATABASE}").close()
+
+        report("connect_tenant cold", timed(connect, iterations))
+        report(
+            "connect_tenant warm",
+            timed(lambda i: fortress.connect_tenant("tenant-0").close(), iterations),
+        )
+
+
+def bench_listing(api_key: str, server: ControlPlane, sizes: list[int]) -> None:
+    for size in sizes:
+        runs = max(3, min(20, 100_000 // size))
+        with Fortress(f"org-{size}", api_key, base_url=server.base_url) as fortress:
+            server.listing(f"org-{size}", "tenants")
+            server.listing(f"org-{size}", "databases")
+            report(
+                f"list_tenants {size:,}",
+                timed(lambda i: fortress.list_tenants(), runs),
+                size,
+            )
+            report(
+                f"tenant_table {size:,}",
+                timed(lambda i: fortress.tenant_table(), runs),
+                size,
+            )
+            report(
+                f"list_databases {size:,}",
+                timed(lambda i: fortress.list_databases(), runs),
+                max(1, size // TENANTS_PER_DATABASE),
+            )
+
+
+def bench_bulk(api_key: str, server: ControlPlane, rows: int) -> None:
+    runs = 5
+    with Fortress("org-1", api_key, base_url=server.base_url) as fortress:
+
+        def fetchall(i: int) -> None:
+            with fortress.connect_tenant("tenant-0") as connection:
+                connection.execute(READ_QUERY, (rows,)).fetchall()
+
+        def stream(i: int) -> None:
+            with fortress.connect_tenant("tenant-0") as connection:
+                with connection.cursor(stream=True, itersize=5000) as cursor:
+                    for _ in cursor.execute(READ_QUERY, (rows,)):
+                        pass
+
+        def copy_rows(i: int) -> None:
+            with fortress.connect_tenant("tenant-0") as connection:
+                connection.execute(
+                    "CREATE TEMP TABLE IF NOT EXISTS bench_items"
+                    " (id int, name text, score float8)"
+                )
+                connection.copy_rows(
+                    "bench_items",
+                    ["id", "name", "score"],
+                    ((n, f"name {n}", n * 0.5) for n in range(rows)),
+                )
+                connection.rollback()
+
+        def executemany(i: int) -> None:
+            with fortress.connect_tenant("tenant-0") as connection:
+                connection.execute(
+                    "CREATE TEMP TABLE IF NOT EXISTS bench_items"
+                    " (id int, name text, score float8)"
+                )
+                connection.executemany(
+                    "INSERT INTO bench_items (id, name, score) VALUES (%s, %s, %s)",
+                    ((n, f"name {n}", n * 0.5) for n in range(rows // 10)),
+                )
+                connection.rollback()
+
+        report(f"read fetchall {rows:,} rows", timed(fetchall, runs), rows)
+        report(f"read stream {rows:,} rows", timed(stream, runs), rows)
+        report(f"write copy_rows {rows:,} rows", timed(copy_rows, runs), rows)
+        report(
+            f"write executemany {rows // 10:,} rows",
+            timed(executemany, runs),
+            rows // 10,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dsn", default=os.environ.get("FORTRESS_BENCH_DSN"))
+    parser.add_argument("--latency", type=float, default=0.0, help="stub round trip seconds")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--sizes", default="1000,100000")
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    api_key, public_key = generate_api_key()
+    server = ControlPlane(public_key, connection_details(args.dsn))
+    driver = (
+        nullcontext()
+        if args.dsn
+        else mock.patch.object(
+            postgres.psycopg2, "connect", stub_driver.connect(args.latency)
+        )
+    )
+
+    print(f"target: {'postgres' if args.dsn else 'stub driver'}")
+    print_header()
+    try:
+        with driver:
+            bench_control_plane(api_key, server, args.iterations)
+            bench_connect(api_key, server, args.iterations)
+            bench_listing(api_key, server, [int(size) for size in args.sizes.split(",")])
+            bench_bulk(api_key, server, args.rows)
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
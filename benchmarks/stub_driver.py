@@ -0,0 +1,141 @@
+"""
+In-process stand-in for psycopg2 connections, for measuring the SDK's own
+overhead without a database server
+
+SELECT statements return as many synthetic rows as their first parameter, or
+a single row without parameters. Other statements, including COPY, consume
+their input and affect nothing. An optional round trip delay is added to
+every statement and connect.
+"""
+
+import time
+
+import psycopg2.extensions
+
+DESCRIPTION = (("id", 23), ("name", 25), ("score", 701))
+
+
+class _Column(tuple):
+    @property
+    def name(self) -> str:
+        return self[0]
+
+    @property
+    def type_code(self) -> int:
+        return self[1]
+
+
+class _Info:
+    def __init__(self) -> None:
+        self.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        self.backend_pid = 1
+
+
+class StubCursor:
+    def __init__(self, connection: "StubConnection", name: str | None = None):
+        self.connection = connection
+        self.name = name
+        self.arraysize = 1
+        self.itersize = 2000
+        self.rowcount = -1
+        self.lastrowid = None
+        self.description = None
+        self.__rows: list[tuple] = []
+        self.__position = 0
+
+    def execute(self, sql, parameters=None) -> None:
+        self.connection.round_trip()
+        statement = sql if isinstance(sql, str) else str(sql)
+        if statement.lstrip()[:6].lower() == "select":
+            count = 1
+            if parameters and isinstance(parameters[0], int):
+                count = parameters[0]
+            self.__rows = [(i, f"name {i}", i * 0.5) for i in range(count)]
+            self.description = tuple(_Column(column) for column in DESCRIPTION)
+        else:
+            self.__rows = []
+            self.description = None
+        self.__position = 0
+        self.rowcount = len(self.__rows)
+
+    def mogrify(self, sql, parameters=None) -> bytes:
+        return (sql % tuple(repr(p) for p in parameters or ())).encode()
+
+    def copy_expert(self, sql, file, size: int = 8192) -> None:
+        self.connection.round_trip()
+        while file.read(size):
+            pass
+        self.rowcount = -1
+
+    def fetchone(self):
+        if self.__position >= len(self.__rows):
+            return None
+        self.__position += 1
+        return self.__rows[self.__position - 1]
+
+    def fetchmany(self, size: int | None = None):
+        size = self.arraysize if size is None else size
+        rows = self.__rows[self.__position : self.__position + size]
+        self.__position += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self.__rows[self.__position :]
+        self.__position = len(self.__rows)
+        return rows
+
+    def close(self) -> None:
+        pass
+
+    def __iter__(self):
+        while True:
+            rows = self.fetchmany(self.itersize)
+            if not rows:
+                return
+            yield from rows
+
+    def __enter__(self) -> "StubCursor":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class StubConnection:
+    def __init__(self, dsn: str, latency: float = 0.0) -> None:
+        self.dsn = dsn
+        self.latency = latency
+        self.autocommit = False
+        self.isolation_level = psycopg2.extensions.ISOLATION_LEVEL_READ_COMMITTED
+        self.encoding = "UTF8"
+        self.closed = 0
+        self.info = _Info()
+        if latency:
+            time.sleep(latency)
+
+    def round_trip(self) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        if not self.autocommit:
+            self.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+
+    def cursor(self, name: str | None = None) -> StubCursor:
+        return StubCursor(self, name)
+
+    def commit(self) -> None:
+        self.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self) -> None:
+        self.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self) -> None:
+        self.closed = 1
+
+
+def connect(latency: float = 0.0):
+    """Return a replacement for psycopg2.connect that opens stub connections"""
+
+    def stub_connect(dsn: str, *args, **kwargs) -> StubConnection:
+        return StubConnection(dsn, latency)
+
+    return stub_connect
@@ -60,3 +60,6 @@ conn.commit()
 result = cursor.execute("SELECT * FROM test").fetchall()
 for row in result:
     print(row)
+
+# Return the connection to the tenant's pool
+conn.close()
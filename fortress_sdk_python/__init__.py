@@ -1 +1,28 @@
-from .fortress import Fortress
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .fortress import Fortress
+    from .async_fortress import AsyncFortress
+
+__all__ = ["Fortress", "AsyncFortress"]
+
+# The clients are imported on first use, so importing the package does not
+# import requests, cryptography or the database drivers
+_EXPORTS = {
+    "Fortress": ".fortress",
+    "AsyncFortress": ".async_fortress",
+}
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
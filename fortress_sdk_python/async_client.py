@@ -0,0 +1,161 @@
+import asyncio
+import datetime
+from typing import AsyncIterator
+from .crypto import Decryptor
+from .lazy import optional_module
+from .client import (
+    Database,
+    Tenant,
+    ConnectionDetails,
+    ValidationError,
+    NEXT_TOKEN_FIELD,
+    RETRY_STATUS_CODES,
+    RETRY_METHODS,
+    handle_response,
+    parse_connection_details,
+    parse_database,
+    parse_tenant,
+)
+
+httpx = optional_module("httpx")
+
+
+class AsyncClient:
+    def __init__(
+        self,
+        org_id: str,
+        api_key: str,
+        base_url: str,
+        timeout: float = 10.0,
+        pool_maxsize: int = 100,
+        max_retries: int = 3,
+        backoff_factor: float = 0.2,
+    ):
+        """
+        Initialize the async control plane client
+
+        Mirrors Client on top of a shared httpx.AsyncClient, so a single event
+        loop can keep many requests in flight over kept-alive connections.
+
+        :param timeout: Seconds to wait for the API to connect and respond
+        :param pool_maxsize: Maximum number of kept-alive connections
+        :param max_retries: Retries on connection errors and 5xx responses
+        :param backoff_factor: Exponential backoff factor between retries, in seconds
+        """
+        if httpx is None:
+            raise ImportError(
+                "httpx is required for the async client, "
+                "install fortress-sdk-python[async]"
+            )
+
+        self.base_url = base_url
+        self.org_id = org_id
+        self.api_key = api_key
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.decryptor = Decryptor(api_key)
+
+        # The limits go on the transport, httpx ignores them on the client
+        # once a transport is given. Retries are left to __request so
+        # connection errors are not retried twice over.
+        self.__session = httpx.AsyncClient(
+            headers={"Api-Key": api_key},
+            timeout=timeout,
+            transport=httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(
+                    max_connections=pool_maxsize,
+                    max_keepalive_connections=pool_maxsize,
+                ),
+            ),
+        )
+
+    async def close(self) -> None:
+        """Close all pooled HTTP connections"""
+        await self.__session.aclose()
+
+    async def __request(
+        self,
+        method: str,
+        path: str,
+        payload: dict | None = None,
+        params: dict[str, str] | None = None,
+    ) -> dict:
+        url = f"{self.base_url}/v1/organization/{self.org_id}{path}"
+        retries = self.max_retries if method in RETRY_METHODS else 0
+
+        for attempt in range(retries + 1):
+            if attempt:
+                await asyncio.sleep(self.backoff_factor * (2 ** (attempt - 1)))
+
+            try:
+                response = await self.__session.request(
+                    method, url, json=payload, params=params
+                )
+            except httpx.TransportError:
+                if attempt == retries:
+                    raise
+                continue
+
+            if response.status_code in RETRY_STATUS_CODES and attempt < retries:
+                continue
+
+            return handle_response(response.status_code, response.content)
+
+    async def get_uri(self, id: str, type: str) -> ConnectionDetails:
+        if type != "tenant" and type != "database":
+            raise ValidationError("Type must be either 'tenant' or 'database'")
+
+        json_response = await self.__request("GET", f"/{type}/{id}/uri")
+        return parse_connection_details(self.decryptor, json_response)
+
+    async def create_database(self, platform: str, alias: str = "") -> str:
+        payload = {"platform": platform, "alias": alias}
+        json_response = await self.__request("POST", "/database", payload)
+        return json_response["databaseId"]
+
+    async def delete_database(self, database_id: str):
+        await self.__request("DELETE", f"/database/{database_id}")
+
+    async def list_databases(self) -> list[Database]:
+        json_response = await self.__request("GET", "/databases")
+        return [parse_database(data) for data in json_response.get("databases", [])]
+
+    async def create_tenant(
+        self,
+        tenant_id: str,
+        isolation_level: str,
+        platform: str,
+        alias: str = "",
+        database_id: str = "",
+    ) -> None:
+        payload = {"isolation": isolation_level, "platform": platform, "alias": alias}
+        if database_id:
+            payload["databaseId"] = database_id
+
+        await self.__request("POST", f"/tenant/{tenant_id}", payload)
+
+    async def delete_tenant(self, tenant_id: str) -> None:
+        await self.__request("DELETE", f"/tenant/{tenant_id}")
+
+    async def list_tenants(self) -> list[Tenant]:
+        json_response = await self.__request("GET", "/tenants")
+        return [parse_tenant(data) for data in json_response.get("tenants", [])]
+
+    async def iter_tenants(
+        self,
+        page_size: int | None = None,
+        created_since: datetime.datetime | None = None,
+    ) -> AsyncIterator[Tenant]:
+        params = {}
+        if page_size is not None:
+            params["limit"] = str(page_size)
+        if created_since is not None:
+            params["createdSince"] = created_since.isoformat()
+        while True:
+            json_response = await self.__request("GET", "/tenants", params=params)
+            for data in json_response.get("tenants", []):
+                yield parse_tenant(data)
+            next_token = json_response.get(NEXT_TOKEN_FIELD)
+            if not next_token:
+                return
+            params = {**params, NEXT_TOKEN_FIELD: next_token}
@@ -0,0 +1,346 @@
+from .client import (
+    ConnectionDetails,
+    Database,
+    Tenant,
+)
+from .async_client import AsyncClient
+from .async_pool import AsyncConnectionPool, AsyncPooledConnection
+from .bulk import TenantResult, run_for_tenants_async, stream_for_tenants_async
+from .database import AsyncConnection
+from .drivers import load_driver
+from .singleflight import AsyncSingleFlight
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable
+import asyncio
+import datetime
+
+# Tenants requested per page when fan_out runs against all tenants
+FAN_OUT_PAGE_SIZE = 1000
+
+
+class _FanOutConnections:
+    def __init__(
+        self,
+        connect: Callable[[ConnectionDetails], Awaitable[AsyncConnection]],
+        max_size: int,
+    ) -> None:
+        """
+        Connections of one fan_out, kept apart from the connections pooled by
+        connect_tenant. Each task holds its own connection and hands it back
+        when done, for tasks of tenants on the same database to reuse. When
+        max_size connections are open, an idle connection to another
+        database is closed before a new one is opened.
+
+        :param connect: Opens a connection for connection details
+        :param max_size: Maximum number of open connections
+        """
+        self.__connect = connect
+        self.max_size = max_size
+        self.__idle: dict[ConnectionDetails, list[AsyncConnection]] = {}
+        self.__size = 0
+
+    async def checkout(self, details: ConnectionDetails) -> AsyncConnection:
+        idle = self.__idle.get(details)
+        if idle:
+            connection = idle.pop()
+            if not idle:
+                del self.__idle[details]
+            return connection
+
+        if self.__size >= self.max_size and self.__idle:
+            other = next(iter(self.__idle))
+            idle = self.__idle[other]
+            connection = idle.pop()
+            if not idle:
+                del self.__idle[other]
+            await self.discard(connection)
+
+        self.__size += 1
+        try:
+            return await self.__connect(details)
+        except BaseException:
+            self.__size -= 1
+            raise
+
+    def checkin(self, details: ConnectionDetails, connection: AsyncConnection) -> None:
+        self.__idle.setdefault(details, []).append(connection)
+
+    async def discard(self, connection: AsyncConnection) -> None:
+        """Close a connection instead of handing it back"""
+        self.__size -= 1
+        await connection.close()
+
+    async def close(self) -> None:
+        idle, self.__idle = self.__idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                await self.discard(connection)
+
+
+class AsyncFortress:
+    def __init__(
+        self,
+        org_id: str,
+        api_key: str,
+        base_url: str = "https://api.fortress.build",
+        timeout: float = 10.0,
+        pool_maxsize: int = 100,
+        max_retries: int = 3,
+        driver: str = "postgres-async",
+        pool_max_size: int = 10,
+        pool_max_total: int = 100,
+        pool_max_idle: float = 300.0,
+        pool_timeout: float = 30.0,
+    ) -> None:
+        """
+        Initialize the asyncio Fortress client
+
+        :param org_id: ID of the organization
+        :param api_key: API key generated from the Fortress dashboard
+        :param base_url: Base URL of the Fortress API (optional)
+        :param timeout: Seconds to wait for the Fortress API to respond (optional)
+        :param pool_maxsize: Maximum number of kept-alive connections to the Fortress API (optional)
+        :param max_retries: Retries on connection errors and server errors (optional)
+        :param driver: Name of the registered database client, imported on the first connection (optional)
+        :param pool_max_size: Maximum connections per database (optional)
+        :param pool_max_total: Maximum connections across all databases (optional)
+        :param pool_max_idle: Seconds before an idle database connection is closed (optional)
+        :param pool_timeout: Seconds to wait for a database connection when the pool is exhausted (optional)
+        """
+        if not org_id:
+            raise ValueError("Organization ID is required")
+        if not api_key:
+            raise ValueError("API Key is required")
+
+        self.__fortress = AsyncClient(
+            org_id,
+            api_key,
+            base_url,
+            timeout=timeout,
+            pool_maxsize=pool_maxsize,
+            max_retries=max_retries,
+        )
+        self.__pool = AsyncConnectionPool(
+            max_size=pool_max_size,
+            max_total=pool_max_total,
+            max_idle=pool_max_idle,
+            timeout=pool_timeout,
+        )
+        self.__tenant_details: dict[str, ConnectionDetails] = {}
+        self.__resolutions = AsyncSingleFlight()
+        self.__driver = driver
+
+    async def close(self) -> None:
+        """Close the idle tenant connections and the connections to the Fortress API"""
+        self.__tenant_details.clear()
+        await self.__pool.close()
+        await self.__fortress.close()
+
+    async def __aenter__(self) -> "AsyncFortress":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def create_database(self, platform: str, alias: str = "") -> str:
+        """
+        Create a new database on the Fortress platform
+        Returns the ID of the created
+
+        :param platform: The cloud platform the database will be hosted on (aws or managed)
+        :param alias: Alias for the database (optional)
+        """
+        return await self.__fortress.create_database(platform=platform, alias=alias)
+
+    async def delete_database(self, database_id: str) -> None:
+        """
+        Delete a database on the Fortress platform
+
+        :param database_id: ID of the database to delete
+        """
+        await self.__fortress.delete_database(database_id=database_id)
+
+    async def list_databases(self) -> list[Database]:
+        """
+        List all databases on the Fortress platform
+
+        :return: List of databases
+        """
+        return await self.__fortress.list_databases()
+
+    async def connect_tenant(self, tenant_id: str) -> AsyncPooledConnection:
+        """
+        Check out a connection to a tenant's database on the Fortress platform
+
+        Every call returns a connection of its own from a pool per database,
+        so a connection must not be shared between tasks. Close it, or use it
+        as an async context manager, to return it to the pool:
+
+            async with await client.connect_tenant(tenant_id) as connection:
+                ...
+
+        :param tenant_id: ID of the tenant
+        :return: Async connection object to the tenant's database
+        """
+        details = await self.__resolve_tenant(tenant_id)
+        connection = await self.__pool.checkout(details, lambda: self.__open(details))
+        return AsyncPooledConnection(self.__pool, connection, tenant_id)
+
+    async def prefetch_tenants(
+        self,
+        tenant_ids: Iterable[str],
+        concurrency: int = 64,
+    ) -> dict[str, TenantResult]:
+        """
+        Resolve and connect to many tenants concurrently, leaving an idle
+        connection in the pool so later connect_tenant calls are served
+        without waiting
+
+        :param tenant_ids: IDs of the tenants
+        :param concurrency: Maximum number of tenants connected at the same time (optional)
+        :return: Result of each tenant with its timing and error, if any
+        """
+
+        async def warm(tenant_id: str) -> None:
+            connection = await self.connect_tenant(tenant_id)
+            await connection.close()
+
+        return await run_for_tenants_async(tenant_ids, warm, concurrency)
+
+    async def fan_out(
+        self,
+        sql: str,
+        parameters: tuple[Any] = ...,
+        tenant_ids: Iterable[str] | AsyncIterable[str] | None = None,
+        concurrency: int = 64,
+        timeout: float | None = None,
+    ) -> AsyncIterator[tuple[str, list[tuple[Any]] | int | Exception]]:
+        """
+        Run the same statement against many tenants concurrently and yield the
+        result of each tenant as soon as it finishes. A failing tenant yields
+        its error instead of aborting the others.
+
+        :param sql: Statement to run
+        :param parameters: Parameters of the statement (optional)
+        :param tenant_ids: IDs of the tenants, defaults to all tenants (optional)
+        :param concurrency: Maximum number of tenants queried at the same time (optional)
+        :param timeout: Seconds per tenant before it fails with TimeoutError (optional)
+        :return: Async iterator of (tenant ID, rows, row count or error) in completion order
+        """
+        if tenant_ids is None:
+            tenant_ids = (
+                tenant.id
+                async for tenant in self.iter_tenants(page_size=FAN_OUT_PAGE_SIZE)
+            )
+        connections = _FanOutConnections(self.__open, max(1, concurrency))
+
+        async def query(tenant_id: str) -> list[tuple[Any]] | int:
+            details = await self.__fortress.get_uri(tenant_id, "tenant")
+            connection = await connections.checkout(details)
+            try:
+                cursor = await connection.cursor().execute(sql, parameters)
+                if cursor.description is None:
+                    result = cursor.rowcount
+                else:
+                    result = await cursor.fetchall()
+                await connection.commit()
+            except asyncio.CancelledError:
+                # Cancelled by the timeout or by closing fan_out, possibly mid
+                # statement, so the connection is not reused
+                await connections.discard(connection)
+                raise
+            except Exception:
+                try:
+                    await connection.rollback()
+                except BaseException:
+                    await connections.discard(connection)
+                    raise
+                connections.checkin(details, connection)
+                raise
+            connections.checkin(details, connection)
+            return result
+
+        results = stream_for_tenants_async(tenant_ids, query, concurrency, timeout)
+        try:
+            async for result in results:
+                yield result
+        finally:
+            # Cancels the running queries, which close their connections
+            await results.aclose()
+            await connections.close()
+
+    async def create_tenant(
+        self,
+        tenant_id: str,
+        isolation_level: str,
+        platform: str,
+        alias: str = "",
+        database_id: str = "",
+    ) -> None:
+        """
+        Create a new tenant on the Fortress platform
+
+        :param tenant_id: ID of the tenant
+        :param isolation_level: Isolation level of the tenant (shared or dedicated)
+        :param platform: The cloud platform the tenant will be hosted on (aws or managed)
+        :param alias: Alias for the tenant (optional)
+        :param database_id: ID of the database to assign the tenant to or if not provided a database will be created (optional)
+        """
+        await self.__fortress.create_tenant(
+            tenant_id=tenant_id,
+            isolation_level=isolation_level,
+            platform=platform,
+            alias=alias,
+            database_id=database_id,
+        )
+
+    async def delete_tenant(self, tenant_id: str) -> None:
+        """
+        Delete a tenant on the Fortress platform
+
+        :param tenant_id: ID of the tenant to delete
+        """
+        await self.__fortress.delete_tenant(tenant_id=tenant_id)
+
+    async def list_tenants(self) -> list[Tenant]:
+        """
+        List all tenants on the Fortress platform
+
+        :return: List of tenants
+        """
+        return await self.__fortress.list_tenants()
+
+    def iter_tenants(
+        self,
+        page_size: int | None = None,
+        created_since: datetime.datetime | None = None,
+    ) -> AsyncIterator[Tenant]:
+        """
+        Iterate over all tenants on the Fortress platform, a page at a time
+
+        :param page_size: Tenants per request, so only one page is held in memory (optional)
+        :param created_since: Only tenants created after this time (optional)
+        :return: Async iterator of tenants
+        """
+        return self.__fortress.iter_tenants(page_size, created_since)
+
+    async def __resolve_tenant(self, tenant_id: str) -> ConnectionDetails:
+        details = self.__tenant_details.get(tenant_id)
+        if details is not None:
+            return details
+
+        async def resolve() -> ConnectionDetails:
+            details = await self.__fortress.get_uri(tenant_id, "tenant")
+            self.__tenant_details[tenant_id] = details
+            return details
+
+        # Concurrent misses for a tenant share a single resolution
+        return await self.__resolutions.do(tenant_id, resolve)
+
+    async def __open(self, details: ConnectionDetails) -> AsyncConnection:
+        return await load_driver(self.__driver)(
+            details.url,
+            details.port,
+            details.username,
+            details.password,
+            details.database,
+        ).connect()
@@ -0,0 +1,307 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+from .database import AsyncConnection, AsyncCursor
+from .pool import PoolTimeout
+
+
+class _Bucket:
+    __slots__ = ("idle", "size")
+
+    def __init__(self) -> None:
+        # Stack of (connection, returned_at), the most recently used first out
+        self.idle: list[tuple[AsyncConnection, float]] = []
+        # Connections owned by this bucket: idle, checked out or being opened
+        self.size = 0
+
+
+class AsyncConnectionPool:
+    def __init__(
+        self,
+        max_size: int = 10,
+        max_total: int = 100,
+        max_idle: float = 300.0,
+        timeout: float = 30.0,
+    ) -> None:
+        """
+        Bounded pools of async database connections, one per key
+
+        The asyncio counterpart of ConnectionPool: each key gets at most
+        max_size connections and all keys together at most max_total. When
+        the global cap is reached an idle connection of the least recently
+        used key is closed to make room, and idle connections older than
+        max_idle are closed when they would be handed out.
+
+        :param max_size: Maximum connections per key
+        :param max_total: Maximum connections across all keys
+        :param max_idle: Seconds an idle connection is kept before being closed
+        :param timeout: Seconds to wait for a connection when the pool is exhausted
+        """
+        if max_size < 1 or max_total < 1:
+            raise ValueError("Pool sizes must be at least 1")
+
+        self.max_size = max_size
+        self.max_total = max_total
+        self.max_idle = max_idle
+        self.timeout = timeout
+
+        self.__buckets: OrderedDict[Hashable, _Bucket] = OrderedDict()
+        self.__checked_out: dict[AsyncConnection, Hashable] = {}
+        self.__total = 0
+        self.__waiters: set[asyncio.Future] = set()
+        self.__loop: asyncio.AbstractEventLoop | None = None
+        # Check-ins scheduled by finalizers, referenced until they finish
+        self.__tasks: set[asyncio.Task] = set()
+
+    async def checkout(
+        self,
+        key: Hashable,
+        factory: Callable[[], Awaitable[AsyncConnection]],
+        timeout: float | None = None,
+    ) -> AsyncConnection:
+        """
+        Check out a connection for a key, opening one with factory if needed
+
+        :param key: Key of the pool to check out from
+        :param factory: Opens a new connection for the key
+        :param timeout: Seconds to wait when the pool is exhausted (optional)
+        :return: Connection that must be returned with checkin
+        """
+        loop = self.__loop = asyncio.get_running_loop()
+        deadline = loop.time() + (self.timeout if timeout is None else timeout)
+
+        while True:
+            connection, reserved, stale = self.__acquire(key)
+            for closing in stale:
+                await _close_quietly(closing)
+            if stale:
+                self.__notify()
+            if connection is not None:
+                return connection
+
+            if reserved:
+                try:
+                    connection = await factory()
+                except BaseException:
+                    self.__release(key)
+                    raise
+                self.__checked_out[connection] = key
+                return connection
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise PoolTimeout()
+            waiter = loop.create_future()
+            self.__waiters.add(waiter)
+            try:
+                await asyncio.wait((waiter,), timeout=remaining)
+            finally:
+                self.__waiters.discard(waiter)
+
+    async def checkin(self, connection: AsyncConnection, discard: bool = False) -> None:
+        """
+        Return a checked out connection to its pool
+
+        :param connection: Connection returned by checkout
+        :param discard: Close the connection instead of keeping it idle (optional)
+        """
+        key = self.__checked_out.pop(connection, None)
+        if key is None:
+            return
+        try:
+            if not discard and not connection.closed and connection.in_transaction:
+                await connection.rollback()
+        except BaseException:
+            discard = True
+            raise
+        finally:
+            if discard or connection.closed:
+                self.__release(key)
+                await _close_quietly(connection)
+            else:
+                self.__buckets[key].idle.append((connection, time.monotonic()))
+                self.__notify()
+
+    def _checkin_later(self, connection: AsyncConnection) -> None:
+        # Finalizers cannot await, so the connection is rolled back and made
+        # idle again by a task on the pool's event loop
+        loop = self.__loop
+        if loop is None or loop.is_closed():
+            return
+
+        def schedule() -> None:
+            task = loop.create_task(self.checkin(connection))
+            self.__tasks.add(task)
+            task.add_done_callback(self.__tasks.discard)
+
+        loop.call_soon_threadsafe(schedule)
+
+    def stats(self) -> dict[str, int]:
+        """Return the number of keys and of open, idle and checked out connections"""
+        idle = sum(len(bucket.idle) for bucket in self.__buckets.values())
+        return {
+            "keys": len(self.__buckets),
+            "total": self.__total,
+            "idle": idle,
+            "in_use": self.__total - idle,
+        }
+
+    async def close(self) -> None:
+        """Close all idle connections, checked out ones are closed when checked in"""
+        idle = []
+        for key, bucket in list(self.__buckets.items()):
+            idle.extend(connection for connection, _ in bucket.idle)
+            bucket.size -= len(bucket.idle)
+            self.__total -= len(bucket.idle)
+            bucket.idle.clear()
+            if bucket.size == 0:
+                del self.__buckets[key]
+        for connection in idle:
+            await _close_quietly(connection)
+
+    def __acquire(
+        self, key: Hashable
+    ) -> tuple[AsyncConnection | None, bool, list[AsyncConnection]]:
+        """
+        Take an idle connection for key, or reserve a slot to open one
+
+        :return: Idle connection if any, whether a slot was reserved, and
+            connections dropped from the pool that must be closed
+        """
+        bucket = self.__buckets.get(key)
+        if bucket is None:
+            bucket = self.__buckets[key] = _Bucket()
+        self.__buckets.move_to_end(key)
+
+        stale = []
+        now = time.monotonic()
+        while bucket.idle:
+            connection, returned_at = bucket.idle.pop()
+            if connection.closed or now - returned_at > self.max_idle:
+                bucket.size -= 1
+                self.__total -= 1
+                stale.append(connection)
+                continue
+            self.__checked_out[connection] = key
+            return connection, False, stale
+
+        if bucket.size >= self.max_size:
+            return None, False, stale
+        if self.__total >= self.max_total:
+            evicted = self.__evict_lru(key)
+            if evicted is None:
+                return None, False, stale
+            stale.append(evicted)
+        bucket.size += 1
+        self.__total += 1
+        return None, True, stale
+
+    def __evict_lru(self, exclude: Hashable) -> AsyncConnection | None:
+        for key, bucket in self.__buckets.items():
+            if key != exclude and bucket.idle:
+                connection, _ = bucket.idle.pop(0)
+                bucket.size -= 1
+                self.__total -= 1
+                return connection
+        return None
+
+    def __release(self, key: Hashable) -> None:
+        bucket = self.__buckets[key]
+        bucket.size -= 1
+        self.__total -= 1
+        if bucket.size == 0:
+            del self.__buckets[key]
+        self.__notify()
+
+    def __notify(self) -> None:
+        for waiter in self.__waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+
+async def _close_quietly(connection: AsyncConnection) -> None:
+    try:
+        await connection.close()
+    except Exception:
+        pass
+
+
+class AsyncPooledConnection(AsyncConnection):
+    def __init__(
+        self,
+        pool: AsyncConnectionPool,
+        connection: AsyncConnection,
+        tenant_id: str | None = None,
+    ) -> None:
+        """
+        Connection checked out from an AsyncConnectionPool for one task
+
+        Closing the connection, or leaving its async with block, returns it
+        to the pool. The block commits on success and rolls back on error. A
+        connection that is garbage collected without being closed is rolled
+        back and returned to the pool by a task on the pool's event loop.
+
+        :param pool: Pool the connection was checked out from
+        :param connection: The checked out connection
+        :param tenant_id: ID of the tenant the connection is for (optional)
+        """
+        self.__pool = pool
+        self.__connection = connection
+        self.tenant_id = tenant_id
+        self.isolation_level: str = connection.isolation_level
+
+    @property
+    def in_transaction(self) -> bool:
+        return self.__checked_out().in_transaction
+
+    @property
+    def closed(self) -> bool:
+        return self.__connection is None or self.__connection.closed
+
+    async def commit(self) -> None:
+        return await self.__checked_out().commit()
+
+    def cursor(self) -> AsyncCursor:
+        return self.__checked_out().cursor()
+
+    async def rollback(self) -> None:
+        return await self.__checked_out().rollback()
+
+    async def execute(self, sql: str, parameters: tuple[Any] = ...) -> AsyncCursor:
+        return await self.__checked_out().execute(sql, parameters)
+
+    async def executemany(
+        self, sql: str, parameters: list[tuple[Any]] = ...
+    ) -> AsyncCursor:
+        return await self.__checked_out().executemany(sql, parameters)
+
+    async def close(self) -> None:
+        """Return the connection to the pool"""
+        connection, self.__connection = self.__connection, None
+        if connection is not None:
+            await self.__pool.checkin(connection)
+
+    async def __aenter__(self) -> "AsyncPooledConnection":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        try:
+            if self.__connection is not None and not self.__connection.closed:
+                if exc_type is None:
+                    await self.__connection.commit()
+                else:
+                    await self.__connection.rollback()
+        finally:
+            await self.close()
+
+    def __del__(self):
+        connection = getattr(self, "_AsyncPooledConnection__connection", None)
+        if connection is not None:
+            self.__pool._checkin_later(connection)
+
+    def __checked_out(self) -> AsyncConnection:
+        if self.__connection is None:
+            raise ValueError("Connection has already been returned to the pool")
+        return self.__connection
@@ -0,0 +1,128 @@
+from .database import (
+    AsyncDatabaseClient,
+    AsyncConnection,
+    AsyncCursor,
+)
+from typing import Any
+
+try:
+    import psycopg
+except ImportError:
+    psycopg = None
+
+
+def _parameters(parameters: Any) -> Any:
+    return None if parameters is ... else parameters
+
+
+class AsyncPostgresCursor(AsyncCursor):
+    def __init__(self, cursor: "psycopg.AsyncCursor"):
+        self.__cursor = cursor
+        self.arraysize: int = cursor.arraysize
+
+    @property
+    def description(self) -> tuple[tuple[Any, ...], ...] | None:
+        return self.__cursor.description
+
+    @property
+    def rowcount(self) -> int:
+        return self.__cursor.rowcount
+
+    @property
+    def lastrowid(self) -> int | None:
+        return None
+
+    async def execute(
+        self, sql: str, parameters: tuple[Any] = ...
+    ) -> "AsyncPostgresCursor":
+        await self.__cursor.execute(sql, _parameters(parameters))
+        return self
+
+    async def executemany(
+        self, sql: str, parameters: list[tuple[Any]] = ...
+    ) -> "AsyncPostgresCursor":
+        await self.__cursor.executemany(sql, _parameters(parameters) or [])
+        return self
+
+    async def fetchone(self) -> tuple[Any] | None:
+        return await self.__cursor.fetchone()
+
+    async def fetchmany(self, size: int = ...) -> list[tuple[Any, ...]]:
+        if size is ...:
+            size = self.arraysize
+        return await self.__cursor.fetchmany(size)
+
+    async def fetchall(self) -> list[tuple[Any]]:
+        return await self.__cursor.fetchall()
+
+    async def close(self) -> None:
+        await self.__cursor.close()
+
+    async def __aenter__(self) -> "AsyncPostgresCursor":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.__cursor.close()
+
+
+class AsyncPostgresConnection(AsyncConnection):
+    def __init__(self, connection: "psycopg.AsyncConnection"):
+        self.__connection = connection
+        self.isolation_level: str = self.__connection.isolation_level
+
+    @property
+    def in_transaction(self) -> bool:
+        return (
+            self.__connection.info.transaction_status
+            != psycopg.pq.TransactionStatus.IDLE
+        )
+
+    @property
+    def closed(self) -> bool:
+        return self.__connection.closed
+
+    async def commit(self) -> None:
+        return await self.__connection.commit()
+
+    def cursor(self) -> AsyncPostgresCursor:
+        return AsyncPostgresCursor(self.__connection.cursor())
+
+    async def rollback(self) -> None:
+        return await self.__connection.rollback()
+
+    async def execute(
+        self, sql: str, parameters: tuple[Any] = ...
+    ) -> AsyncPostgresCursor:
+        return await self.cursor().execute(sql, parameters)
+
+    async def executemany(
+        self, sql: str, parameters: list[tuple[Any]] = ...
+    ) -> AsyncPostgresCursor:
+        return await self.cursor().executemany(sql, parameters)
+
+    async def close(self) -> None:
+        await self.__connection.close()
+
+
+class AsyncPostgresClient(AsyncDatabaseClient):
+    def __init__(
+        self, host: str, port: int, user: str, password: str, database_name: str
+    ) -> None:
+        if psycopg is None:
+            raise ImportError(
+                "psycopg is required for async connections, "
+                "install fortress-sdk-python[async]"
+            )
+
+        self.__host = host
+        self.__port = port
+        self.__user = user
+        self.__password = password
+        self.__database_name = database_name
+
+    async def connect(self) -> AsyncPostgresConnection:
+        return AsyncPostgresConnection(
+            await psycopg.AsyncConnection.connect(
+                f"dbname={self.__database_name} user={self.__user} password={self.__password} host={self.__host} port={self.__port} sslmode=require"
+            )
+        )
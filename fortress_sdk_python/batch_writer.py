@@ -0,0 +1,242 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
+
+from .fortress import Fortress
+
+
+@dataclass
+class BatchFailure:
+    tenant_id: str
+    table: str
+    columns: tuple[str, ...]
+    # Rows that were not written, to be added again or stored elsewhere
+    rows: list[tuple[Any, ...]]
+    error: Exception
+
+
+class BatchWriteError(Exception):
+    def __init__(self, failures: list[BatchFailure]):
+        """
+        Raised by flush and close when buffered rows could not be written
+
+        :param failures: Every failed write, with the rows that were not written
+        """
+        self.failures = failures
+        self.message = f"Failed to write {len(failures)} batch(es): " + "; ".join(
+            f"{failure.tenant_id}.{failure.table}: {failure.error}"
+            for failure in failures
+        )
+        super().__init__(self.message)
+
+
+class _WriteLock:
+    __slots__ = ("lock", "users")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        # Threads writing or waiting to write the key, the lock is dropped at 0
+        self.users = 0
+
+
+class _Buffer:
+    __slots__ = ("rows", "size", "created")
+
+    def __init__(self) -> None:
+        self.rows: list[tuple[Any, ...]] = []
+        self.size = 0
+        self.created = time.monotonic()
+
+
+def _row_size(row: tuple[Any, ...]) -> int:
+    return sum(
+        len(value) if isinstance(value, (str, bytes)) else 8 for value in row
+    )
+
+
+class TenantBatchWriter:
+    def __init__(
+        self,
+        fortress: Fortress,
+        max_rows: int = 10_000,
+        max_bytes: int = 8 * 1024 * 1024,
+        max_age: float = 1.0,
+        max_buffer_bytes: int = 256 * 1024 * 1024,
+        on_error: Callable[[str, str, list[tuple[Any, ...]], Exception], None]
+        | None = None,
+    ) -> None:
+        """
+        Buffer rows per tenant and table and write them in bulk with COPY
+
+        A buffer is written, and committed in its own transaction, when it
+        reaches max_rows rows or max_bytes bytes, or when its oldest row is
+        older than max_age seconds. When all buffers together exceed
+        max_buffer_bytes, add writes the largest buffers before returning, so
+        producers are slowed down to the write rate.
+
+        :param fortress: Client used to connect to the tenants
+        :param max_rows: Rows per buffer before it is written (optional)
+        :param max_bytes: Approximate bytes per buffer before it is written (optional)
+        :param max_age: Seconds before a buffer is written regardless of size (optional)
+        :param max_buffer_bytes: Approximate bytes buffered across all tenants (optional)
+        :param on_error: Called with (tenant ID, table, rows, error) when a write fails, instead of raising the error from flush and close. Errors raised by the callback are raised from flush and close instead (optional)
+        """
+        self.fortress = fortress
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.max_buffer_bytes = max_buffer_bytes
+        self.on_error = on_error
+
+        self.__buffers: dict[tuple[str, str, tuple[str, ...]], _Buffer] = {}
+        # Held while a buffer is written, so the batches of a table keep their order
+        self.__write_locks: dict[tuple[str, str, tuple[str, ...]], _WriteLock] = {}
+        self.__size = 0
+        self.__failures: list[BatchFailure] = []
+        self.__lock = threading.Lock()
+        self.__closed = threading.Event()
+        self.__flusher = threading.Thread(
+            target=self.__flush_aged, name="fortress-batch-writer", daemon=True
+        )
+        self.__flusher.start()
+
+    def add(
+        self, tenant_id: str, table: str, columns: Iterable[str], row: tuple[Any, ...]
+    ) -> None:
+        """
+        Buffer a row for a tenant's table
+
+        :param tenant_id: ID of the tenant
+        :param table: Name of the table, optionally schema qualified
+        :param columns: Names of the columns the row values belong to
+        :param row: Values of the row
+        """
+        self.add_many(tenant_id, table, columns, (row,))
+
+    def add_many(
+        self,
+        tenant_id: str,
+        table: str,
+        columns: Iterable[str],
+        rows: Iterable[tuple[Any, ...]],
+    ) -> None:
+        """
+        Buffer rows for a tenant's table
+
+        :param tenant_id: ID of the tenant
+        :param table: Name of the table, optionally schema qualified
+        :param columns: Names of the columns the row values belong to
+        :param rows: Values of the rows
+        """
+        if self.__closed.is_set():
+            raise ValueError("Batch writer is closed")
+
+        key = (tenant_id, table, tuple(columns))
+        with self.__lock:
+            buffer = self.__buffers.get(key)
+            if buffer is None:
+                buffer = self.__buffers[key] = _Buffer()
+            for row in rows:
+                size = _row_size(row)
+                buffer.rows.append(row)
+                buffer.size += size
+                self.__size += size
+            full = len(buffer.rows) >= self.max_rows or buffer.size >= self.max_bytes
+
+        if full:
+            self.__write(key)
+
+        # Backpressure: write the largest buffers until under the memory cap
+        while self.__size > self.max_buffer_bytes:
+            with self.__lock:
+                if not self.__buffers:
+                    break
+                largest = max(self.__buffers, key=lambda k: self.__buffers[k].size)
+            self.__write(largest)
+
+    def flush(self, tenant_id: str | None = None) -> None:
+        """
+        Write all buffered rows, or only those of one tenant
+
+        :param tenant_id: ID of the tenant to flush (optional)
+        :raises BatchWriteError: When writes failed since the last flush and were not handled by on_error, with the rows that were not written
+        """
+        with self.__lock:
+            keys = [
+                key for key in self.__buffers if tenant_id is None or key[0] == tenant_id
+            ]
+        for key in keys:
+            self.__write(key)
+
+        with self.__lock:
+            failures, self.__failures = self.__failures, []
+        if failures:
+            raise BatchWriteError(failures)
+
+    def close(self) -> None:
+        """Stop the background flushing and write all buffered rows"""
+        self.__closed.set()
+        self.__flusher.join()
+        self.flush()
+
+    def __enter__(self) -> "TenantBatchWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __write(self, key: tuple[str, str, tuple[str, ...]]) -> None:
+        with self.__lock:
+            write_lock = self.__write_locks.get(key)
+            if write_lock is None:
+                write_lock = self.__write_locks[key] = _WriteLock()
+            write_lock.users += 1
+
+        try:
+            with write_lock.lock:
+                self.__write_buffer(key)
+        finally:
+            with self.__lock:
+                write_lock.users -= 1
+                if write_lock.users == 0:
+                    del self.__write_locks[key]
+
+    def __write_buffer(self, key: tuple[str, str, tuple[str, ...]]) -> None:
+        with self.__lock:
+            buffer = self.__buffers.pop(key, None)
+        if buffer is None:
+            return
+
+        tenant_id, table, columns = key
+        try:
+            with self.fortress.connect_tenant(tenant_id) as connection:
+                connection.copy_rows(table, list(columns), buffer.rows)
+        except Exception as e:
+            error = e
+            if self.on_error is not None:
+                try:
+                    self.on_error(tenant_id, table, buffer.rows, e)
+                    error = None
+                except Exception as callback_error:
+                    error = callback_error
+            if error is not None:
+                with self.__lock:
+                    self.__failures.append(
+                        BatchFailure(tenant_id, table, columns, buffer.rows, error)
+                    )
+        finally:
+            with self.__lock:
+                self.__size -= buffer.size
+
+    def __flush_aged(self) -> None:
+        while not self.__closed.wait(self.max_age / 2):
+            now = time.monotonic()
+            with self.__lock:
+                keys = [
+                    key
+                    for key, buffer in self.__buffers.items()
+                    if now - buffer.created >= self.max_age
+                ]
+            for key in keys:
+                self.__write(key)
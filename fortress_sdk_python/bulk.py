@@ -0,0 +1,261 @@
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Iterator,
+    TypeVar,
+)
+
+from .lazy import lazy_module
+
+# Only the async helpers use asyncio, the threaded ones do not import it
+asyncio = lazy_module("asyncio")
+
+T = TypeVar("T")
+
+
+@dataclass
+class TenantResult:
+    tenant_id: str
+    ok: bool
+    elapsed: float
+    error: Exception | None = None
+    # Outcome of a provisioning call, e.g. created, exists, deleted or missing
+    status: str = ""
+    # HTTP requests sent for the tenant, including retries and existence checks
+    attempts: int = 1
+
+
+@dataclass
+class NewTenant:
+    tenant_id: str
+    isolation_level: str
+    platform: str
+    alias: str = ""
+    database_id: str = ""
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        """
+        Rate limiter shared between threads
+
+        :param rate: Acquisitions allowed per second on average
+        :param capacity: Acquisitions allowed in a burst, defaults to one second's worth (optional)
+        """
+        if rate <= 0:
+            raise ValueError("Rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.__tokens = self.capacity
+        self.__updated = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a token is available and take it"""
+        while True:
+            with self.__lock:
+                now = time.monotonic()
+                self.__tokens = min(
+                    self.capacity, self.__tokens + (now - self.__updated) * self.rate
+                )
+                self.__updated = now
+                if self.__tokens >= 1:
+                    self.__tokens -= 1
+                    return
+                delay = (1 - self.__tokens) / self.rate
+            time.sleep(delay)
+
+
+def retry(
+    function: Callable[[], T],
+    retries: int,
+    is_transient: Callable[[Exception], bool],
+    backoff_factor: float = 0.2,
+    limiter: TokenBucket | None = None,
+) -> T:
+    """
+    Call function until it succeeds or fails with an error that is not
+    transient, sleeping with exponential backoff and jitter between attempts
+
+    :param function: Function to call
+    :param retries: Attempts after the first one
+    :param is_transient: Whether an error is worth another attempt
+    :param backoff_factor: Seconds before the first retry, doubled for each further one (optional)
+    :param limiter: Rate limiter every attempt takes a token from (optional)
+    :return: Result of function
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            return function()
+        except Exception as e:
+            if attempt > retries or not is_transient(e):
+                raise
+        time.sleep(backoff_factor * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+
+
+def run_for_tenants(
+    tenant_ids: Iterable[str],
+    function: Callable[[str], Any],
+    concurrency: int,
+) -> dict[str, TenantResult]:
+    """
+    Call function for every tenant on a thread pool and report the outcome of each
+
+    :param tenant_ids: IDs of the tenants
+    :param function: Called with a tenant ID, a raised error marks the tenant as failed
+    :param concurrency: Maximum number of concurrent calls
+    :return: Result per tenant ID
+    """
+
+    def run(tenant_id: str) -> TenantResult:
+        start = time.perf_counter()
+        try:
+            function(tenant_id)
+        except Exception as e:
+            return TenantResult(tenant_id, False, time.perf_counter() - start, e)
+        return TenantResult(tenant_id, True, time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        return {
+            result.tenant_id: result
+            for result in executor.map(run, dict.fromkeys(tenant_ids))
+        }
+
+
+async def run_for_tenants_async(
+    tenant_ids: Iterable[str],
+    function: Callable[[str], Awaitable[Any]],
+    concurrency: int,
+) -> dict[str, TenantResult]:
+    """
+    Await function for every tenant and report the outcome of each
+
+    :param tenant_ids: IDs of the tenants
+    :param function: Called with a tenant ID, a raised error marks the tenant as failed
+    :param concurrency: Maximum number of concurrent calls
+    :return: Result per tenant ID
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(tenant_id: str) -> TenantResult:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await function(tenant_id)
+            except Exception as e:
+                return TenantResult(tenant_id, False, time.perf_counter() - start, e)
+            return TenantResult(tenant_id, True, time.perf_counter() - start)
+
+    results = await asyncio.gather(*(run(t) for t in dict.fromkeys(tenant_ids)))
+    return {result.tenant_id: result for result in results}
+
+
+def stream_for_tenants(
+    tenant_ids: Iterable[str],
+    function: Callable[[str], Any],
+    concurrency: int,
+) -> Iterator[tuple[str, Any]]:
+    """
+    Call function for every tenant on a thread pool and yield each result as
+    soon as it is ready. At most concurrency calls are in flight, so neither
+    the tenant IDs nor the results are ever held all at once.
+
+    :param tenant_ids: IDs of the tenants, consumed lazily
+    :param function: Called with a tenant ID
+    :param concurrency: Maximum number of concurrent calls
+    :return: Iterator of (tenant ID, result or raised error) in completion order
+    """
+    tenant_ids = iter(tenant_ids)
+    pending: dict[Future, str] = {}
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+
+    def submit_next() -> None:
+        for tenant_id in tenant_ids:
+            pending[executor.submit(function, tenant_id)] = tenant_id
+            return
+
+    try:
+        for _ in range(max(1, concurrency)):
+            submit_next()
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                tenant_id = pending.pop(future)
+                submit_next()
+                error = future.exception()
+                yield tenant_id, error if error is not None else future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+async def _aiter(items: Iterable[T]) -> AsyncIterator[T]:
+    for item in items:
+        yield item
+
+
+async def stream_for_tenants_async(
+    tenant_ids: Iterable[str] | AsyncIterable[str],
+    function: Callable[[str], Awaitable[Any]],
+    concurrency: int,
+    timeout: float | None = None,
+) -> AsyncIterator[tuple[str, Any]]:
+    """
+    Await function for every tenant and yield each result as soon as it is
+    ready, with at most concurrency calls in flight
+
+    :param tenant_ids: IDs of the tenants, consumed lazily, e.g. from an async iterator over pages of tenants
+    :param function: Called with a tenant ID
+    :param concurrency: Maximum number of concurrent calls
+    :param timeout: Seconds after which a call is cancelled and fails with TimeoutError (optional)
+    :return: Async iterator of (tenant ID, result or raised error) in completion order
+    """
+    if isinstance(tenant_ids, AsyncIterable):
+        ids = aiter(tenant_ids)
+    else:
+        ids = _aiter(tenant_ids)
+    pending: dict[asyncio.Task, str] = {}
+
+    async def call(tenant_id: str) -> Any:
+        # function is only called once the task runs, so a task cancelled
+        # before it started leaves no coroutine behind
+        return await asyncio.wait_for(function(tenant_id), timeout)
+
+    async def submit_next() -> None:
+        tenant_id = await anext(ids, None)
+        if tenant_id is not None:
+            pending[asyncio.ensure_future(call(tenant_id))] = tenant_id
+
+    try:
+        for _ in range(max(1, concurrency)):
+            await submit_next()
+
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                tenant_id = pending.pop(task)
+                await submit_next()
+                error = task.exception()
+                yield tenant_id, error if error is not None else task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        # Let the cancelled calls clean up, e.g. close their connections
+        if pending:
+            await asyncio.wait(pending)
+        aclose = getattr(ids, "aclose", None)
+        if aclose is not None:
+            await aclose()
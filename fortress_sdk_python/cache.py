@@ -0,0 +1,172 @@
+import dataclasses
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from .client import ConnectionDetails
+from . import fork
+from .lazy import lazy_module
+
+hashes = lazy_module("cryptography.hazmat.primitives.hashes")
+aead = lazy_module("cryptography.hazmat.primitives.ciphers.aead")
+hkdf = lazy_module("cryptography.hazmat.primitives.kdf.hkdf")
+
+
+class CacheBackend:
+    """Shared store behind ConnectionDetailsCache, e.g. for several worker processes"""
+
+    def get(self, key: str) -> tuple[ConnectionDetails, float] | None:
+        """Return the details and their expiry as a UNIX timestamp, if stored"""
+        raise NotImplementedError
+
+    def set(self, key: str, details: ConnectionDetails, expires_at: float) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class FileCacheBackend(CacheBackend):
+    def __init__(self, path: str, secret: str) -> None:
+        """
+        Store connection details as encrypted files in a directory
+
+        Every entry is encrypted with AES-GCM under a key derived from secret,
+        usually the API key, so any process on the host holding the same
+        secret can read the entries and a process restart starts warm.
+
+        :param path: Directory to store the entries in, created if missing
+        :param secret: Secret the encryption key is derived from
+        """
+        self.path = path
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        self.__aead = aead.AESGCM(
+            hkdf.HKDF(
+                algorithm=hashes.SHA256(),
+                length=32,
+                salt=None,
+                info=b"fortress connection details cache",
+            ).derive(secret.encode())
+        )
+
+    def get(self, key: str) -> tuple[ConnectionDetails, float] | None:
+        name = self.__name(key)
+        try:
+            with open(os.path.join(self.path, name), "rb") as file:
+                data = file.read()
+            entry = json.loads(self.__aead.decrypt(data[:12], data[12:], name.encode()))
+        except Exception:
+            return None
+
+        return ConnectionDetails(**entry["details"]), entry["expires_at"]
+
+    def set(self, key: str, details: ConnectionDetails, expires_at: float) -> None:
+        name = self.__name(key)
+        nonce = os.urandom(12)
+        entry = json.dumps(
+            {"details": dataclasses.asdict(details), "expires_at": expires_at}
+        )
+        data = nonce + self.__aead.encrypt(nonce, entry.encode(), name.encode())
+
+        # Write to a temporary file and rename it so readers never see a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=self.path, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(temp_path, os.path.join(self.path, name))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def delete(self, key: str) -> None:
+        try:
+            os.unlink(os.path.join(self.path, self.__name(key)))
+        except FileNotFoundError:
+            pass
+
+    def clear(self) -> None:
+        for name in os.listdir(self.path):
+            try:
+                os.unlink(os.path.join(self.path, name))
+            except FileNotFoundError:
+                pass
+
+    def __name(self, key: str) -> str:
+        return hashlib.sha256(key.encode()).hexdigest()
+
+
+class ConnectionDetailsCache:
+    def __init__(self, ttl: float = 300.0, backend: CacheBackend | None = None) -> None:
+        """
+        In-process TTL cache of decrypted connection details
+
+        Entries are kept in memory and, when a backend is given, written
+        through to it. Misses in memory are looked up in the backend before
+        the caller falls back to the Fortress API.
+
+        :param ttl: Seconds an entry stays valid
+        :param backend: Shared store consulted on in-process misses (optional)
+        """
+        self.ttl = ttl
+        self.backend = backend
+        self.__entries: dict[str, tuple[ConnectionDetails, float]] = {}
+        self.__lock = threading.Lock()
+        fork.register(self)
+
+    def _after_fork(self) -> None:
+        # Entries are kept for the child, but the lock may have been held by
+        # a thread of the parent
+        self.__lock = threading.Lock()
+
+    def get(self, key: str, allow_stale: bool = False) -> ConnectionDetails | None:
+        """
+        Return the cached details for a key, or None when missing or expired
+
+        Expired entries are kept until they are replaced or invalidated, so
+        they can serve as the last known-good details while the Fortress API
+        is unavailable.
+
+        :param key: Key of the entry
+        :param allow_stale: Return the entry even if it has expired (optional)
+        """
+        now = 0.0 if allow_stale else time.time()
+        entry = self.__entries.get(key)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+
+        if self.backend is not None:
+            entry = self.backend.get(key)
+            if entry is not None and entry[1] > now:
+                with self.__lock:
+                    self.__entries[key] = entry
+                return entry[0]
+
+        return None
+
+    def set(self, key: str, details: ConnectionDetails) -> None:
+        """Cache the details for a key for ttl seconds"""
+        expires_at = time.time() + self.ttl
+        with self.__lock:
+            self.__entries[key] = (details, expires_at)
+        if self.backend is not None:
+            self.backend.set(key, details, expires_at)
+
+    def invalidate(self, key: str) -> None:
+        """Drop the cached details for a key"""
+        with self.__lock:
+            self.__entries.pop(key, None)
+        if self.backend is not None:
+            self.backend.delete(key)
+
+    def clear(self) -> None:
+        """Drop all cached details"""
+        with self.__lock:
+            self.__entries.clear()
+        if self.backend is not None:
+            self.backend.clear()
@@ -0,0 +1,67 @@
+import threading
+import time
+
+from . import fork
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int = 5, cooldown: float = 30.0) -> None:
+        """
+        Fail fast on an endpoint that keeps failing
+
+        After threshold consecutive failures the circuit opens and calls are
+        refused for cooldown seconds. Then a single trial call is let through:
+        its success closes the circuit, its failure opens it again.
+
+        :param threshold: Consecutive failures that open the circuit
+        :param cooldown: Seconds the circuit stays open before a trial call
+        """
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.trips = 0
+        self.rejections = 0
+        self.__failures = 0
+        self.__opened_at: float | None = None
+        self.__trial = False
+        self.__lock = threading.Lock()
+        fork.register(self)
+
+    def _after_fork(self) -> None:
+        self.__lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """closed, open or half-open"""
+        with self.__lock:
+            if self.__opened_at is None:
+                return "closed"
+            if self.__trial or time.monotonic() - self.__opened_at >= self.cooldown:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        """Whether a call may be made now, counting a rejection if not"""
+        with self.__lock:
+            if self.__opened_at is None:
+                return True
+            if not self.__trial and time.monotonic() - self.__opened_at >= self.cooldown:
+                self.__trial = True
+                return True
+            self.rejections += 1
+            return False
+
+    def record_success(self) -> None:
+        with self.__lock:
+            self.__failures = 0
+            self.__opened_at = None
+            self.__trial = False
+
+    def record_failure(self) -> None:
+        with self.__lock:
+            self.__failures += 1
+            if self.__trial or (
+                self.__opened_at is None and self.__failures >= self.threshold
+            ):
+                self.trips += 1
+                self.__opened_at = time.monotonic()
+                self.__trial = False
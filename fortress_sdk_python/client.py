@@ -1,11 +1,35 @@
+import codecs
 import json
-import requests
+import os
+import re
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from dataclasses import dataclass
+from typing import Any, Iterable, Iterator
 import datetime
-from .crypto import decrypt
+from .circuit import CircuitBreaker
+from .crypto import Decryptor
+from .lazy import lazy_module
+from . import fork
+from . import instrumentation
 
+requests = lazy_module("requests")
+urllib3 = lazy_module("urllib3")
 
-@dataclass
+
+def _parse_date(value: str | datetime.datetime) -> datetime.datetime:
+    if isinstance(value, str):
+        return datetime.datetime.fromisoformat(value)
+    return value
+
+
+# Records are slotted and immutable so large listings stay small in memory.
+# created_date is parsed once, when the record is built from the ISO 8601
+# string of the response.
+
+
+@dataclass(frozen=True, slots=True)
 class Database:
     id: str
     alias: str
@@ -14,16 +38,22 @@ class Database:
     average_write_iops: int
     created_date: datetime.datetime
 
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "created_date", _parse_date(self.created_date))
+
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Tenant:
     id: str
     alias: str
     database_id: str
     created_date: datetime.datetime
 
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "created_date", _parse_date(self.created_date))
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class ConnectionDetails:
     database_id: str
     url: str
@@ -34,151 +64,535 @@ class ConnectionDetails:
 
 
 class InternalError(Exception):
-    def __init__(self, message="Internal Server Error"):
+    def __init__(self, message="Internal Server Error", status_code: int | None = None):
         self.message = message
+        # Status code of the failed response, None for errors raised by the client
+        self.status_code = status_code
         super().__init__(self.message)
 
 
+class NotFoundError(InternalError):
+    def __init__(self, message="Not Found"):
+        super().__init__(message, 404)
+
+
+class CircuitOpenError(InternalError):
+    def __init__(self, message="Circuit open, the endpoint has been failing"):
+        super().__init__(message)
+
+
 class ValidationError(Exception):
     def __init__(self, message="Validation Error"):
         self.message = message
         super().__init__(self.message)
 
 
+# Status codes that are retried with backoff, together with connection errors
+RETRY_STATUS_CODES = frozenset({500, 502, 503, 504})
+# Only idempotent requests are retried once they have reached the server
+RETRY_METHODS = frozenset({"GET", "DELETE"})
+# Client errors that may succeed when sent again, other 4xx responses such as
+# 401 and 403 do not
+TRANSIENT_CLIENT_STATUS_CODES = frozenset({408, 429})
+
+
+# IDs in request paths, replaced to name the endpoint of a request
+_PATH_ID_RE = re.compile(r"^/(tenant|database)/[^/?]+")
+
+
+def endpoint(method: str, path: str) -> str:
+    """Name of the endpoint a request goes to, e.g. GET /tenant/{id}/uri"""
+    return f"{method} " + _PATH_ID_RE.sub(r"/\1/{id}", path)
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Whether a failed request may succeed when sent again"""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if not isinstance(error, InternalError):
+        return False
+    status_code = error.status_code
+    return (
+        status_code is None
+        or status_code >= 500
+        or status_code in TRANSIENT_CLIENT_STATUS_CODES
+    )
+
+
+def handle_response(status_code: int, content: bytes) -> dict:
+    """Decode an API response body and raise the matching error for a failed request"""
+    try:
+        json_response = json.loads(content) if content else {}
+    except ValueError:
+        json_response = {}
+
+    if status_code != 200:
+        if status_code == 400:
+            raise ValidationError(json_response.get("message", "Validation Error"))
+        if status_code == 404:
+            raise NotFoundError(json_response.get("message", "Not Found"))
+        raise InternalError(
+            json_response.get("message", "Internal Server Error"), status_code
+        )
+
+    return json_response
+
+
+# Field of a list response holding the token of the next page, sent back as
+# a query parameter of the same name. Responses without it are complete.
+NEXT_TOKEN_FIELD = "nextToken"
+
+_DECODER = json.JSONDecoder()
+
+
+class _JsonReader:
+    """Read JSON tokens and values from a stream of byte chunks"""
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self.__chunks = iter(chunks)
+        self.__text = codecs.getincrementaldecoder("utf-8")()
+        self.__buffer = ""
+        self.__pos = 0
+        self.__eof = False
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character, or "" at the end"""
+        while True:
+            buffer = self.__buffer
+            while self.__pos < len(buffer) and buffer[self.__pos] in " \t\n\r":
+                self.__pos += 1
+            if self.__pos < len(buffer):
+                return buffer[self.__pos]
+            if not self.__fill():
+                return ""
+
+    def take(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at position {self.__pos}")
+        self.__pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.__buffer, self.__pos)
+            except json.JSONDecodeError:
+                if not self.__fill():
+                    raise
+                continue
+            # A number or literal ending with the buffer may continue in the next chunk
+            if end < len(self.__buffer) or not self.__fill():
+                self.__pos = end
+                return value
+
+    def items(self) -> Iterator[Any]:
+        """
+        Yield the items of an array whose "[" has been taken, then take its "]"
+
+        The complete objects in the buffer are decoded together by one
+        json.loads call, items are only decoded one at a time where the
+        buffer does not end between objects.
+        """
+        if self.peek() == "]":
+            self.__pos += 1
+            return
+
+        failed_buffer: str | None = None
+        failed_end = -1
+        while True:
+            buffer = self.__buffer
+            end = max(buffer.rfind("},", self.__pos), buffer.rfind("}]", self.__pos))
+            values = None
+            if end > self.__pos and not (buffer is failed_buffer and end == failed_end):
+                try:
+                    # Fails when end is inside a string or a nested object
+                    values = json.loads(f"[{buffer[self.__pos : end + 1]}]")
+                except json.JSONDecodeError:
+                    failed_buffer, failed_end = buffer, end
+            if values is not None:
+                self.__pos = end + 1
+                yield from values
+            else:
+                yield self.value()
+
+            if self.peek() != ",":
+                break
+            self.__pos += 1
+        self.take("]")
+
+    def __fill(self) -> bool:
+        if self.__eof:
+            return False
+        for chunk in self.__chunks:
+            if chunk:
+                text = self.__text.decode(chunk)
+                break
+        else:
+            self.__eof = True
+            text = self.__text.decode(b"", final=True)
+        self.__buffer = self.__buffer[self.__pos :] + text
+        self.__pos = 0
+        return True
+
+
+def iter_json_list(
+    chunks: Iterable[bytes], key: str, fields: dict[str, Any]
+) -> Iterator[Any]:
+    """
+    Yield the items of the array under key in a JSON object as they arrive
+
+    Only one item is decoded at a time, so the memory used does not grow with
+    the length of the array. The other members of the object are stored in
+    fields as they are read.
+
+    :param chunks: Body of the response, in chunks of any size
+    :param key: Name of the array member
+    :param fields: Receives the other members of the object
+    """
+    reader = _JsonReader(chunks)
+    reader.take("{")
+    if reader.peek() == "}":
+        return
+
+    while True:
+        name = reader.value()
+        reader.take(":")
+        if name == key and reader.peek() == "[":
+            reader.take("[")
+            yield from reader.items()
+        else:
+            fields[name] = reader.value()
+
+        if reader.peek() != ",":
+            break
+        reader.take(",")
+    reader.take("}")
+
+
+class ListResponse:
+    def __init__(self, response: "requests.Response", key: str) -> None:
+        """
+        List response whose items are decoded while iterating, as the body is
+        read from the network
+
+        :param response: Streamed response
+        :param key: Name of the member holding the items
+        """
+        self.etag: str | None = response.headers.get("ETag")
+        self.fields: dict[str, Any] = {}
+        self.__response = response
+        self.__key = key
+
+    @property
+    def next_token(self) -> str | None:
+        """Token of the next page, available once all items have been read"""
+        return self.fields.get(NEXT_TOKEN_FIELD) or None
+
+    def __iter__(self) -> Iterator[dict]:
+        chunks = self.__response.iter_content(65536)
+        try:
+            yield from iter_json_list(chunks, self.__key, self.fields)
+            # Read to the end of the body so the connection can be reused
+            for _ in chunks:
+                pass
+        except ValueError:
+            raise InternalError("An error occured: Invalid list response")
+        finally:
+            self.__response.close()
+
+
+def parse_connection_details(
+    decryptor: Decryptor, json_response: dict
+) -> ConnectionDetails:
+    """Decrypt and validate the connection details returned by the uri endpoint"""
+    connection_details_str = None
+    try:
+        connection_details_str = decryptor.decrypt(
+            json_response.get("connectionDetails", "")
+        )
+    except Exception as e:
+        raise InternalError("An error occured: Unable to decrypt connection details")
+
+    if connection_details_str is None:
+        raise InternalError("An error occured: Unable to decrypt connection details")
+
+    connection_details = json.loads(connection_details_str)
+    url = connection_details.get("url", "")
+    database = connection_details.get("database", "")
+    port = int(connection_details.get("port", 0))
+    username = connection_details.get("username", "")
+    password = connection_details.get("password", "")
+
+    if url == "" or port == 0 or username == "" or password == "" or database == "":
+        raise InternalError("An error occured: Invalid connection details")
+
+    return ConnectionDetails(
+        database_id=sys.intern(json_response["databaseId"]),
+        url=sys.intern(url),
+        database=sys.intern(database),
+        port=port,
+        username=sys.intern(username),
+        password=password,
+    )
+
+
+def parse_database(data: dict) -> Database:
+    return Database(
+        id=sys.intern(data.get("databaseId", "")),
+        alias=sys.intern(data.get("alias", "")),
+        size=data.get("sizeBytes", 0),
+        average_read_iops=data.get("averageReadIOPS", 0),
+        average_write_iops=data.get("averageWriteIOPS", 0),
+        created_date=data.get("createdDate", ""),
+    )
+
+
+def parse_tenant(data: dict) -> Tenant:
+    return Tenant(
+        id=data.get("tenantId", ""),
+        # Many tenants share a database and an alias, so one copy of each is kept
+        alias=sys.intern(data.get("alias", "")),
+        database_id=sys.intern(data.get("databaseId", "")),
+        created_date=data.get("createdDate", ""),
+    )
+
+
 class Client:
     def __init__(
         self,
         org_id: str,
         api_key: str,
         base_url: str,
+        timeout: float = 10.0,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        max_retries: int = 3,
+        backoff_factor: float = 0.2,
+        breaker_threshold: int = 5,
+        breaker_cooldown: float = 30.0,
+        hedge_after: float | None = None,
     ):
+        """
+        Initialize the control plane client
+
+        Requests go through a single keep-alive session, so the TCP and TLS
+        handshakes are paid once per pooled connection instead of once per call.
+        A forked child leaves the inherited session alone and opens its own.
+
+        :param timeout: Seconds to wait for the API to connect and respond
+        :param pool_connections: Number of hosts to keep connection pools for
+        :param pool_maxsize: Maximum number of kept-alive connections per host
+        :param max_retries: Retries on connection errors and 5xx responses
+        :param backoff_factor: Exponential backoff factor between retries, in seconds
+        :param breaker_threshold: Consecutive failures of an endpoint before its calls fail fast with CircuitOpenError, 0 disables circuit breaking
+        :param breaker_cooldown: Seconds an endpoint fails fast before a trial call
+        :param hedge_after: Seconds to wait for get_uri before sending a second request and taking the first answer, None disables hedging
+        """
         self.base_url = base_url
         self.org_id = org_id
         self.api_key = api_key
-
-    def get_uri(self, id: str, type: str) -> ConnectionDetails:
-        if type != "tenant" and type != "database":
-            raise ValidationError("Type must be either 'tenant' or 'database'")
-
-        endpoint = f"{self.base_url}/v1/organization/{self.org_id}/{type}/{id}/uri"
-        response = requests.get(
-            endpoint,
-            headers={"Api-Key": self.api_key},
+        self.timeout = timeout
+        self.decryptor = Decryptor(api_key)
+
+        self.__pool_connections = pool_connections
+        self.__pool_maxsize = pool_maxsize
+        self.__retry = urllib3.util.Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=RETRY_METHODS,
+            raise_on_status=False,
+            respect_retry_after_header=True,
         )
-
-        json_response = response.json()
-        if response.status_code != 200:
-            if response.status_code == 400:
-                raise ValidationError(json_response.get("message", "Validation Error"))
-            if response.status_code == 500:
-                raise InternalError(
-                    json_response.get("message", "Internal Server Error")
-                )
-
-        connection_details_str = None
-        try:
-            connection_details_str = decrypt(
-                private_key=self.api_key,
-                ciphertext=json_response.get("connectionDetails", ""),
+        self.__session = self.__new_session(self.__retry)
+        # Sends every request once, for callers that retry and count attempts themselves
+        self.__single_session = self.__new_session(0)
+        self.__pid = os.getpid()
+        fork.register(self)
+
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.hedge_after = hedge_after
+        self.__breakers: dict[str, CircuitBreaker] = {}
+        self.__hedges = 0
+        self.__hedge_wins = 0
+        self.__executor: ThreadPoolExecutor | None = None
+        self.__lock = threading.Lock()
+
+    def close(self) -> None:
+        """Close all pooled HTTP connections"""
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=False)
+        self.__session.close()
+        self.__single_session.close()
+
+    def _after_fork(self) -> None:
+        # The parent keeps using the inherited sockets, so they are dropped
+        # without being closed. The hedging threads only exist in the parent.
+        if fork.is_forked(self.__pid):
+            fork.abandon([self.__session, self.__single_session])
+            self.__session = self.__new_session(self.__retry)
+            self.__single_session = self.__new_session(0)
+            self.__executor = None
+            self.__lock = threading.Lock()
+            self.__pid = os.getpid()
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Return circuit breaker and hedging counters
+
+        :return: Circuit trips, calls rejected by an open circuit, hedge
+            requests sent and won, and the endpoints whose circuit is not closed
+        """
+        breakers = list(self.__breakers.items())
+        return {
+            "trips": sum(breaker.trips for _, breaker in breakers),
+            "rejections": sum(breaker.rejections for _, breaker in breakers),
+            "hedges": self.__hedges,
+            "hedge_wins": self.__hedge_wins,
+            "open_circuits": {
+                name: breaker.state
+                for name, breaker in breakers
+                if breaker.state != "closed"
+            },
+        }
+
+    def __new_session(self, retry: "urllib3.util.Retry | int") -> "requests.Session":
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=self.__pool_connections,
+            pool_maxsize=self.__pool_maxsize,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.headers.update({"Api-Key": self.api_key})
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def __current_session(self, retry: bool = True) -> "requests.Session":
+        if fork.is_forked(self.__pid):
+            self._after_fork()
+        return self.__session if retry else self.__single_session
+
+    def __breaker(self, method: str, path: str) -> CircuitBreaker | None:
+        if self.breaker_threshold <= 0:
+            return None
+        name = endpoint(method, path)
+        breaker = self.__breakers.get(name)
+        if breaker is None:
+            breaker = self.__breakers.setdefault(
+                name, CircuitBreaker(self.breaker_threshold, self.breaker_cooldown)
             )
+        return breaker
+
+    def __guarded(self, method: str, path: str, send):
+        """Call send through the circuit breaker of the endpoint"""
+        breaker = self.__breaker(method, path)
+        if breaker is None:
+            return send()
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit open for {endpoint(method, path)}")
+        try:
+            result = send()
         except Exception as e:
-            raise InternalError(
-                "An error occured: Unable to decrypt connection details"
-            )
+            # Error responses such as 400 and 404 come from a healthy API
+            if is_transient_error(e):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            raise
+        breaker.record_success()
+        return result
 
-        if connection_details_str is None:
-            raise InternalError(
-                "An error occured: Unable to decrypt connection details"
-            )
+    def __request(
+        self,
+        method: str,
+        path: str,
+        payload: dict | None = None,
+        params: dict[str, str] | None = None,
+        retry: bool = True,
+    ) -> dict:
+        def send() -> dict:
+            with instrumentation.span("fortress.http") as span:
+                span.set("method", method)
+                span.set("path", path)
+                response = self.__current_session(retry).request(
+                    method,
+                    f"{self.base_url}/v1/organization/{self.org_id}{path}",
+                    json=payload,
+                    params=params,
+                    timeout=self.timeout,
+                )
+                span.set("status", response.status_code)
+            return handle_response(response.status_code, response.content)
+
+        return self.__guarded(method, path, send)
+
+    def __hedged_request(self, method: str, path: str) -> dict:
+        """
+        Send a request, and a second one if the first has not answered after
+        hedge_after seconds, returning the first successful response
+        """
+        with self.__lock:
+            if self.__executor is None:
+                self.__executor = ThreadPoolExecutor(
+                    max_workers=2 * self.__pool_maxsize,
+                    thread_name_prefix="fortress-hedge",
+                )
+            executor = self.__executor
+
+        first = executor.submit(self.__request, method, path)
+        if wait([first], timeout=self.hedge_after).done:
+            return first.result()
+
+        with self.__lock:
+            self.__hedges += 1
+        second = executor.submit(self.__request, method, path)
+        pending: set[Future] = {first, second}
+        error: BaseException | None = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        with self.__lock:
+                            self.__hedge_wins += 1
+                    return future.result()
+                if error is None:
+                    error = future.exception()
+        raise error
+
+    def get_uri(self, id: str, type: str, retry: bool = True) -> ConnectionDetails:
+        """
+        Fetch and decrypt the connection details of a tenant or database
+
+        :param retry: Retry connection errors and 5xx responses and hedge, False sends exactly one request (optional)
+        """
+        if type != "tenant" and type != "database":
+            raise ValidationError("Type must be either 'tenant' or 'database'")
 
-        connection_details = json.loads(connection_details_str)
-        url = connection_details.get("url", "")
-        database = connection_details.get("database", "")
-        port = int(connection_details.get("port", 0))
-        username = connection_details.get("username", "")
-        password = connection_details.get("password", "")
-
-        if url == "" or port == 0 or username == "" or password == "" or database == "":
-            raise InternalError("An error occured: Invalid connection details")
-
-        return ConnectionDetails(
-            database_id=json_response["databaseId"],
-            url=url,
-            database=database,
-            port=port,
-            username=username,
-            password=password,
-        )
+        if not retry:
+            json_response = self.__request("GET", f"/{type}/{id}/uri", retry=False)
+        elif self.hedge_after is None:
+            json_response = self.__request("GET", f"/{type}/{id}/uri")
+        else:
+            json_response = self.__hedged_request("GET", f"/{type}/{id}/uri")
+        return parse_connection_details(self.decryptor, json_response)
 
     def create_database(self, platform: str, alias: str = "") -> str:
-        endpoint = f"{self.base_url}/v1/organization/{self.org_id}/database"
         payload = {"platform": platform, "alias": alias}
-        response = requests.post(
-            endpoint,
-            headers={"Api-Key": self.api_key},
-            json=payload,
-        )
-
-        json_response = response.json()
-        if response.status_code != 200:
-            if response.status_code == 400:
-                raise ValidationError(json_response.get("message", "Validation Error"))
-            if response.status_code == 500:
-                raise InternalError(
-                    json_response.get("message", "Internal Server Error")
-                )
-
+        json_response = self.__request("POST", "/database", payload)
         return json_response["databaseId"]
 
     def delete_database(self, database_id: str):
-        endpoint = (
-            f"{self.base_url}/v1/organization/{self.org_id}/database/{database_id}"
-        )
-        response = requests.delete(
-            endpoint,
-            headers={"Api-Key": self.api_key},
-        )
-
-        json_response = response.json()
-        if response.status_code != 200:
-            if response.status_code == 400:
-                raise ValidationError(json_response.get("message", "Validation Error"))
-            if response.status_code == 500:
-                raise InternalError(
-                    json_response.get("message", "Internal Server Error")
-                )
+        self.__request("DELETE", f"/database/{database_id}")
 
     def list_databases(self) -> list[Database]:
-        endpoint = f"{self.base_url}/v1/organization/{self.org_id}/databases"
-        response = requests.get(
-            endpoint,
-            headers={"Api-Key": self.api_key},
-        )
-
-        json_response = response.json()
-        if response.status_code != 200:
-            if response.status_code == 400:
-                raise ValidationError(json_response.get("message", "Validation Error"))
-            else:
-                raise InternalError(
-                    json_response.get("message", "Internal Server Error")
-                )
-
-        databases = [
-            Database(
-                id=data.get("databaseId", ""),
-                alias=data.get("alias", ""),
-                size=data.get("sizeBytes", 0),
-                average_read_iops=data.get("averageReadIOPS", 0),
-                average_write_iops=data.get("averageWriteIOPS", 0),
-                created_date=datetime.datetime.fromisoformat(
-                    data.get("createdDate", "")
-                ),
-            )
-            for data in json_response.get("databases", [])
-        ]
+        return [parse_database(data) for data in self.__list_pages("databases")]
 
-        return databases
+    def iter_databases(self, page_size: int | None = None) -> Iterator[Database]:
+        for data in self.__iter_pages("databases", {}, page_size):
+            yield parse_database(data)
 
     def create_tenant(
         self,
@@ -187,69 +601,90 @@ class Client:
         platform: str,
         alias: str = "",
         database_id: str = "",
+        retry: bool = True,
     ) -> None:
-        endpoint = f"{self.base_url}/v1/organization/{self.org_id}/tenant/{tenant_id}"
         payload = {"isolation": isolation_level, "platform": platform, "alias": alias}
         if database_id:
             payload["databaseId"] = database_id
 
-        response = requests.post(
-            endpoint,
-            headers={"Api-Key": self.api_key},
-            json=payload,
-        )
-
-        json_response = response.json()
-        if response.status_code != 200:
-            if response.status_code == 400:
-                raise ValidationError(json_response.get("message", "Validation Error"))
-            if response.status_code == 500:
-                raise InternalError(
-                    json_response.get("message", "Internal Server Error")
-                )
-
-    def delete_tenant(self, tenant_id: str) -> None:
-        endpoint = f"{self.base_url}/v1/organization/{self.org_id}/tenant/{tenant_id}"
-        response = requests.delete(
-            endpoint,
-            headers={"Api-Key": self.api_key},
-        )
+        self.__request("POST", f"/tenant/{tenant_id}", payload, retry=retry)
 
-        json_response = response.json()
-        if response.status_code != 200:
-            if response.status_code == 400:
-                raise ValidationError(json_response.get("message", "Validation Error"))
-            if response.status_code == 500:
-                raise InternalError(
-                    json_response.get("message", "Internal Server Error")
-                )
+    def delete_tenant(self, tenant_id: str, retry: bool = True) -> None:
+        self.__request("DELETE", f"/tenant/{tenant_id}", retry=retry)
 
     def list_tenants(self) -> list[Tenant]:
-        endpoint = f"{self.base_url}/v1/organization/{self.org_id}/tenants"
-        response = requests.get(
-            endpoint,
-            headers={"Api-Key": self.api_key},
-        )
+        return [parse_tenant(data) for data in self.__list_pages("tenants")]
 
-        json_response = response.json()
-        if response.status_code != 200:
-            if response.status_code == 400:
-                raise ValidationError(json_response.get("message", "Validation Error"))
-            else:
-                raise InternalError(
-                    json_response.get("message", "Internal Server Error")
+    def iter_tenants(
+        self,
+        page_size: int | None = None,
+        created_since: datetime.datetime | None = None,
+    ) -> Iterator[Tenant]:
+        params = {}
+        if created_since is not None:
+            params["createdSince"] = created_since.isoformat()
+        for data in self.__iter_pages("tenants", params, page_size):
+            yield parse_tenant(data)
+
+    def stream_list(
+        self,
+        resource: str,
+        params: dict[str, str] | None = None,
+        etag: str | None = None,
+    ) -> ListResponse | None:
+        """
+        Request a list of tenants or databases without reading the body
+
+        :param resource: Either 'tenants' or 'databases'
+        :param params: Query parameters (optional)
+        :param etag: ETag of a previous response, to only get the list when it changed (optional)
+        :return: Response to iterate, or None when the list did not change since etag
+        """
+        if resource != "tenants" and resource != "databases":
+            raise ValidationError("Resource must be either 'tenants' or 'databases'")
+
+        def send() -> ListResponse | None:
+            with instrumentation.span("fortress.http") as span:
+                span.set("method", "GET")
+                span.set("path", f"/{resource}")
+                response = self.__current_session().request(
+                    "GET",
+                    f"{self.base_url}/v1/organization/{self.org_id}/{resource}",
+                    params=params,
+                    headers={"If-None-Match": etag} if etag else None,
+                    stream=True,
+                    timeout=self.timeout,
                 )
-
-        tenants = [
-            Tenant(
-                name=data.get("tenantId", ""),
-                alias=data.get("alias", ""),
-                database_id=data.get("databaseId", ""),
-                created_date=datetime.datetime.fromisoformat(
-                    data.get("createdDate", "")
-                ),
-            )
-            for data in json_response.get("tenants", [])
-        ]
-
-        return tenants
+                span.set("status", response.status_code)
+            if response.status_code == 304:
+                response.close()
+                return None
+            if response.status_code != 200:
+                handle_response(response.status_code, response.content)
+            return ListResponse(response, resource)
+
+        return self.__guarded("GET", f"/{resource}", send)
+
+    def __list_pages(self, resource: str) -> Iterator[dict]:
+        # The whole list is kept, so each page is read and decoded at once,
+        # which is faster than decoding it incrementally as __iter_pages does
+        params: dict[str, str] = {}
+        while True:
+            json_response = self.__request("GET", f"/{resource}", params=params)
+            yield from json_response.get(resource, [])
+            next_token = json_response.get(NEXT_TOKEN_FIELD)
+            if not next_token:
+                return
+            params = {NEXT_TOKEN_FIELD: next_token}
+
+    def __iter_pages(
+        self, resource: str, params: dict[str, str], page_size: int | None
+    ) -> Iterator[dict]:
+        if page_size is not None:
+            params = {**params, "limit": str(page_size)}
+        while True:
+            listing = self.stream_list(resource, params)
+            yield from listing
+            if listing.next_token is None:
+                return
+            params = {**params, NEXT_TOKEN_FIELD: listing.next_token}
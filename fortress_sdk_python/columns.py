@@ -0,0 +1,135 @@
+from typing import Any, Iterator
+
+from .lazy import optional_module
+
+numpy = optional_module("numpy")
+
+# NumPy dtypes for PostgreSQL type OIDs, other types become object arrays
+_DTYPES = {
+    16: "bool",  # bool
+    20: "int64",  # int8
+    21: "int16",  # int2
+    23: "int32",  # int4
+    700: "float32",  # float4
+    701: "float64",  # float8
+    1082: "datetime64[D]",  # date
+    1114: "datetime64[us]",  # timestamp
+}
+
+
+def transpose(rows: list[tuple[Any, ...]], width: int) -> list[list[Any]]:
+    """Turn a batch of rows into one list per column"""
+    if not rows:
+        return [[] for _ in range(width)]
+    return [list(column) for column in zip(*rows)]
+
+
+def to_array(values: list[Any], type_code: int) -> "numpy.ndarray":
+    """
+    Build a typed array for a column, from the column's type in the cursor
+    description. NULLs become NaN in float columns and NaT in date columns,
+    integer columns with NULLs are widened to float64 and bool columns with
+    NULLs become object arrays holding True, False and None.
+    """
+    dtype = _DTYPES.get(type_code)
+    if dtype is None:
+        return _object_array(values)
+
+    if dtype == "bool":
+        # numpy converts None to False instead of failing
+        if any(value is None for value in values):
+            return _object_array(values)
+        return numpy.fromiter(values, dtype=dtype, count=len(values))
+
+    if dtype.startswith("datetime64"):
+        return numpy.array(
+            [numpy.datetime64("NaT") if value is None else value for value in values],
+            dtype=dtype,
+        )
+
+    try:
+        return numpy.fromiter(values, dtype=dtype, count=len(values))
+    except TypeError:
+        # NULLs in the column
+        if dtype.startswith(("int", "float")):
+            return numpy.fromiter(
+                (numpy.nan if value is None else value for value in values),
+                dtype="float64",
+                count=len(values),
+            )
+        return _object_array(values)
+
+
+def _object_array(values: list[Any]) -> "numpy.ndarray":
+    array = numpy.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def column_description(cursor) -> tuple[tuple[Any, ...], ...]:
+    """
+    Description of the cursor's result
+
+    :raises ValueError: When the last statement did not return rows
+    """
+    if cursor.description is None:
+        raise ValueError(
+            "The last statement did not return rows, there are no columns to fetch"
+        )
+    return cursor.description
+
+
+def column_names(description: tuple[tuple[Any, ...], ...]) -> list[str]:
+    """
+    Names to key a result's columns by, unique so that no column overwrites
+    another: a repeated name gets the first free suffix, e.g. a, a_1, a_2
+    """
+    names = []
+    seen = set()
+    for column in description:
+        name = column[0]
+        if name in seen:
+            suffix = 1
+            while f"{name}_{suffix}" in seen:
+                suffix += 1
+            name = f"{name}_{suffix}"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def iter_column_batches(
+    cursor, batch_size: int
+) -> Iterator[dict[str, list[Any]]]:
+    """Fetch the remaining rows of a cursor batch_size at a time as columns"""
+    # Server-side cursors only have a description after the first fetch
+    rows = cursor.fetchmany(batch_size)
+    names = column_names(column_description(cursor))
+    while rows:
+        yield dict(zip(names, transpose(rows, len(names))))
+        rows = cursor.fetchmany(batch_size)
+
+
+def iter_array_batches(
+    cursor, batch_size: int
+) -> Iterator[dict[str, "numpy.ndarray"]]:
+    """Fetch the remaining rows of a cursor batch_size at a time as NumPy arrays"""
+    if numpy is None:
+        raise ImportError(
+            "numpy is required for NumPy results, install fortress-sdk-python[numpy]"
+        )
+
+    # Server-side cursors only have a description after the first fetch
+    rows = cursor.fetchmany(batch_size)
+    description = column_description(cursor)
+    columns = list(
+        zip(column_names(description), (column[1] for column in description))
+    )
+    while rows:
+        yield {
+            name: to_array(values, type_code)
+            for (name, type_code), values in zip(
+                columns, transpose(rows, len(columns))
+            )
+        }
+        rows = cursor.fetchmany(batch_size)
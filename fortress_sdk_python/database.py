@@ -75,3 +75,90 @@ class DatabaseClient:
     def connect(self) -> Connection:
         """Connect return an active connection to the database"""
         raise NotImplementedError
+
+    @staticmethod
+    def is_auth_failure(error: Exception) -> bool:
+        """Whether an error means the database rejected the credentials"""
+        return False
+
+    @staticmethod
+    def is_disconnect(error: Exception) -> bool:
+        """Whether an error means the database could not be reached or dropped the connection"""
+        return False
+
+
+class AsyncCursor:
+    def __init__(self, cursor):
+        self.__cursor: "AsyncCursor" = NotImplementedError
+        self.arraysize: int = NotImplementedError
+
+    @property
+    def description(self) -> tuple[tuple[Any, ...], ...] | None:
+        raise NotImplementedError
+
+    @property
+    def rowcount(self) -> int:
+        raise NotImplementedError
+
+    @property
+    def lastrowid(self) -> int | None:
+        raise NotImplementedError
+
+    async def execute(self, sql: str, parameters: tuple[Any] = ...) -> "AsyncCursor":
+        raise NotImplementedError
+
+    async def executemany(
+        self, sql: str, parameters: list[tuple[Any]] = ...
+    ) -> "AsyncCursor":
+        raise NotImplementedError
+
+    async def fetchone(self) -> tuple[Any] | None:
+        raise NotImplementedError
+
+    async def fetchmany(self, size: int = ...) -> list[tuple[Any, ...]]:
+        raise NotImplementedError
+
+    async def fetchall(self) -> list[tuple[Any]]:
+        raise NotImplementedError
+
+    async def __aenter__(self) -> "AsyncCursor":
+        raise NotImplementedError
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        raise NotImplementedError
+
+
+class AsyncConnection:
+    def __init__(self, connection):
+        self.in_transaction: bool = NotImplementedError
+        self.isolation_level: str = NotImplementedError
+
+    async def commit(self) -> None:
+        raise NotImplementedError
+
+    def cursor(self) -> AsyncCursor:
+        raise NotImplementedError
+
+    async def rollback(self) -> None:
+        raise NotImplementedError
+
+    async def execute(self, sql: str, parameters: tuple[Any] = ...) -> AsyncCursor:
+        raise NotImplementedError
+
+    async def executemany(
+        self, sql: str, parameters: list[tuple[Any]] = ...
+    ) -> AsyncCursor:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        raise NotImplementedError
+
+
+class AsyncDatabaseClient:
+    def __init__(self) -> None:
+        """Initialize the async Database client"""
+        raise NotImplementedError
+
+    async def connect(self) -> AsyncConnection:
+        """Connect return an active async connection to the database"""
+        raise NotImplementedError
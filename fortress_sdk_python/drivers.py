@@ -0,0 +1,38 @@
+import importlib
+import threading
+from typing import Any
+
+# Database clients by name, as "module:attribute" until first used. The
+# modules import the database driver packages, so they are only imported
+# when the first connection is opened.
+_drivers: dict[str, Any] = {
+    "postgres": "fortress_sdk_python.postgres:PostgresClient",
+    "postgres-async": "fortress_sdk_python.async_postgres:AsyncPostgresClient",
+}
+_lock = threading.Lock()
+
+
+def register_driver(name: str, driver: Any) -> None:
+    """
+    Register a database client under a name
+
+    The client is constructed with the same arguments as PostgresClient and
+    its connect method returns the connection.
+
+    :param name: Name to select the driver by, e.g. in Fortress(driver=...)
+    :param driver: The client class, or a "module:attribute" path to import it from on first use
+    """
+    with _lock:
+        _drivers[name] = driver
+
+
+def load_driver(name: str) -> Any:
+    """Return the database client registered under a name, importing it if needed"""
+    with _lock:
+        if name not in _drivers:
+            raise ValueError(f"Unknown database driver: {name}")
+        driver = _drivers[name]
+        if isinstance(driver, str):
+            module, attribute = driver.split(":")
+            driver = _drivers[name] = getattr(importlib.import_module(module), attribute)
+        return driver
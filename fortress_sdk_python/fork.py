@@ -0,0 +1,52 @@
+"""
+Fork awareness for objects that hold sockets
+
+A forked child shares the sockets of the connections it inherits with its
+parent, so it must neither use nor close them: closing a psycopg2 connection
+sends a Terminate message that ends the parent's session. Registered objects
+have their _after_fork method called in the child, and check is_forked before
+using their sockets to also catch forks that skip os.register_at_fork
+handlers. Inherited connections are handed to abandon, which keeps them
+referenced so they are never finalized.
+"""
+
+import os
+import weakref
+from typing import Any, Iterable
+
+_objects: "weakref.WeakSet[Any]" = weakref.WeakSet()
+# Inherited connections by id, never used or closed again
+_inherited: dict[int, Any] = {}
+
+
+def register(obj: Any) -> None:
+    """Call obj._after_fork() in every forked child"""
+    _objects.add(obj)
+
+
+def abandon(objects: Iterable[Any]) -> None:
+    """Keep connections inherited from the parent process open and unused"""
+    for obj in objects:
+        _inherited[id(obj)] = obj
+
+
+def is_inherited(obj: Any) -> bool:
+    """Whether a connection was inherited from the parent process and abandoned"""
+    return _inherited.get(id(obj)) is obj
+
+
+def is_forked(pid: int) -> bool:
+    """Whether the current process is a fork of the one with the given PID"""
+    return pid != os.getpid()
+
+
+def _after_fork_in_child() -> None:
+    for obj in list(_objects):
+        try:
+            obj._after_fork()
+        except Exception:
+            pass
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
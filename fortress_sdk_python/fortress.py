@@ -2,9 +2,55 @@ from .client import (
     Database,
     Tenant,
     Client,
+    ConnectionDetails,
+    NotFoundError,
+    ValidationError,
+    is_transient_error,
 )
-from .database import Connection
-from .postgres import PostgresClient, PostgresConnection
+from .bulk import (
+    NewTenant,
+    TenantResult,
+    TokenBucket,
+    retry,
+    run_for_tenants,
+    stream_for_tenants,
+)
+from .cache import ConnectionDetailsCache
+from .drivers import load_driver
+from . import fork
+from .pool import ConnectionPool, PooledConnection, PoolTimeout, StickyConnections
+from .prepared import StatementStats
+from .query_cache import QueryCache
+from .singleflight import SingleFlight
+from . import instrumentation
+from .tenant_index import TenantIndex
+from .tenant_table import TenantTable
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator
+import datetime
+import threading
+import time
+
+if TYPE_CHECKING:
+    from .postgres import PostgresConnection
+
+# Seconds before a tenant whose database rejected or could not be reached with
+# freshly resolved details is resolved again
+MIN_REFRESH_INTERVAL = 5.0
+
+# Tenants requested per page when fan_out runs against all tenants
+FAN_OUT_PAGE_SIZE = 1000
+
+
+def pool_key(details: ConnectionDetails) -> tuple:
+    """Key of the connection pool shared by all tenants on the same database and credentials"""
+    return (
+        details.database_id,
+        details.url,
+        details.port,
+        details.database,
+        details.username,
+        details.password,
+    )
 
 
 class Fortress:
@@ -13,15 +59,113 @@ class Fortress:
         org_id: str,
         api_key: str,
         base_url: str = "https://api.fortress.build",
+        timeout: float = 10.0,
+        pool_maxsize: int = 10,
+        max_retries: int = 3,
+        pool_min_size: int = 0,
+        pool_max_size: int = 10,
+        pool_max_total: int = 100,
+        pool_max_idle: float = 300.0,
+        pool_timeout: float = 30.0,
+        tenant_setting: str | None = "fortress.tenant_id",
+        details_cache: ConnectionDetailsCache | None = None,
+        prepared_statements: int = 0,
+        prepare_threshold: int = 5,
+        query_cache: QueryCache | None = None,
+        driver: str = "postgres",
+        breaker_threshold: int = 5,
+        breaker_cooldown: float = 30.0,
+        hedge_after: float | None = None,
+        reconnect_retries: int = 3,
+        reconnect_backoff: float = 0.2,
     ) -> None:
-        """Initialize the Fortress client"""
+        """
+        Initialize the Fortress client
+
+        :param org_id: ID of the organization
+        :param api_key: API key generated from the Fortress dashboard
+        :param base_url: Base URL of the Fortress API (optional)
+        :param timeout: Seconds to wait for the Fortress API to respond (optional)
+        :param pool_maxsize: Maximum number of kept-alive connections to the Fortress API (optional)
+        :param max_retries: Retries on connection errors and server errors (optional)
+        :param pool_min_size: Idle connections kept per database (optional)
+        :param pool_max_size: Maximum connections per database (optional)
+        :param pool_max_total: Maximum connections across all databases (optional)
+        :param pool_max_idle: Seconds before an idle database connection is closed (optional)
+        :param pool_timeout: Seconds to wait for a database connection when the pool is exhausted (optional)
+        :param tenant_setting: Session setting set to the tenant ID on every checkout, or None to disable (optional)
+        :param details_cache: Cache for decrypted connection details, defaults to an in-process cache with a 5 minute TTL (optional)
+        :param prepared_statements: Statements kept prepared per database connection, 0 disables preparing (optional)
+        :param prepare_threshold: Executions of a statement on a connection before it is prepared (optional)
+        :param query_cache: Cache of SELECT results per tenant, disabled by default (optional)
+        :param driver: Name of the registered database client, imported on the first connection (optional)
+        :param breaker_threshold: Consecutive failures of a Fortress API endpoint before its calls fail fast, 0 disables circuit breaking (optional)
+        :param breaker_cooldown: Seconds a failing endpoint fails fast before a trial call (optional)
+        :param hedge_after: Seconds to wait for a tenant's connection details before sending a second request, None disables hedging (optional)
+        :param reconnect_retries: Retries of a read-only statement on a new connection when its connection was lost, 0 disables them (optional)
+        :param reconnect_backoff: Seconds before the first of those retries, doubled for each further one (optional)
+        """
         if not org_id:
             raise ValueError("Organization ID is required")
         if not api_key:
             raise ValueError("API Key is required")
 
-        self.__fortress = Client(org_id, api_key, base_url)
-        self.__tenant_connection_cache = {}
+        self.__fortress = Client(
+            org_id,
+            api_key,
+            base_url,
+            timeout=timeout,
+            pool_maxsize=pool_maxsize,
+            max_retries=max_retries,
+            breaker_threshold=breaker_threshold,
+            breaker_cooldown=breaker_cooldown,
+            hedge_after=hedge_after,
+        )
+        self.__tenant_setting = tenant_setting
+        self.__details_cache = (
+            details_cache if details_cache is not None else ConnectionDetailsCache()
+        )
+        self.__resolutions = SingleFlight()
+        self.__fallbacks = 0
+        self.__fallbacks_lock = threading.Lock()
+        self.__refreshed: dict[str, float] = {}
+        self.__refresh_lock = threading.Lock()
+        self.__reconnect_retries = reconnect_retries
+        self.__reconnect_backoff = reconnect_backoff
+        self.__prepared_statements = prepared_statements
+        self.__prepare_threshold = prepare_threshold
+        self.__statement_stats = StatementStats()
+        self.__query_cache = query_cache
+        self.__driver = driver
+        self.__pool = ConnectionPool(
+            min_size=pool_min_size,
+            max_size=pool_max_size,
+            max_total=pool_max_total,
+            max_idle=pool_max_idle,
+            timeout=pool_timeout,
+        )
+        self.__sticky = StickyConnections(self.__pool)
+        fork.register(self)
+
+    def close(self) -> None:
+        """Close all pooled tenant connections and the connections to the Fortress API"""
+        self.__pool.close()
+        self.__fortress.close()
+
+    def __enter__(self) -> "Fortress":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _after_fork(self) -> None:
+        # The pool and the API client drop their inherited sockets themselves,
+        # while the decrypted connection details and the parsed API key are
+        # kept, so a client warmed before forking needs no API calls in the
+        # child. Resolutions in flight belong to threads of the parent.
+        self.__resolutions = SingleFlight()
+        self.__fallbacks_lock = threading.Lock()
+        self.__refresh_lock = threading.Lock()
 
     def create_database(self, platform: str, alias: str = "") -> str:
         """
@@ -49,29 +193,290 @@ class Fortress:
         """
         return self.__fortress.list_databases()
 
-    def connect_tenant(self, tenant_id: str) -> Connection:
+    def iter_databases(self, page_size: int | None = None) -> Iterator[Database]:
+        """
+        Iterate over all databases on the Fortress platform, decoding them
+        as the response is received instead of loading the full list
+
+        :param page_size: Databases requested per page, if the API pages the list (optional)
+        :return: Iterator of databases
+        """
+        return self.__fortress.iter_databases(page_size=page_size)
+
+    def connect_tenant(self, tenant_id: str) -> PooledConnection:
         """
         Connect to a tenant's database on the Fortress platform
 
+        Connections are pooled per database and credentials, so tenants that
+        share a database share its pool. On checkout the session setting
+        configured by tenant_setting is set to the tenant ID. Close the
+        connection, or use it as a context manager, to return it to the pool.
+        A connection that is dropped without being closed stays checked out
+        for the calling thread and is returned by its next connect_tenant for
+        the tenant, with its open transaction, until the thread exits or
+        needs the connection for another tenant because the pool is full.
+
+        When the database rejects the tenant's credentials or cannot be
+        reached, e.g. after the password was rotated or the database moved,
+        the tenant is resolved from the Fortress platform again. Read-only
+        statements passed to execute are retried on a new connection if the
+        connection is lost outside of a transaction.
+
         :param tenant_id: ID of the tenant
         :return: Connection object to the tenant's database
         """
-        if tenant_id in self.__tenant_connection_cache:
-            return self.__tenant_connection_cache[tenant_id]
+        with instrumentation.span("fortress.connect_tenant") as span:
+            span.set("tenant_id", tenant_id)
+            connection = self.__sticky.take(tenant_id)
+            span.set("sticky", connection is not None)
+            if connection is None:
+                connection = self.__checkout(tenant_id)
 
-        response = self.__fortress.get_uri(tenant_id, "tenant")
+        return PooledConnection(
+            self.__pool,
+            connection,
+            tenant_id,
+            reconnect=lambda: self.__checkout(tenant_id),
+            retries=self.__reconnect_retries,
+            backoff_factor=self.__reconnect_backoff,
+            is_disconnect=load_driver(self.__driver).is_disconnect,
+            on_drop=self.__sticky.keeper(tenant_id),
+        )
 
-        connection = PostgresClient(
-            response.url,
-            response.port,
-            response.username,
-            response.password,
-            response.database,
-        ).connect()
+    def __checkout(self, tenant_id: str) -> "PostgresConnection":
+        details = self.__resolve_tenant(tenant_id)
+        try:
+            connection = self.__pool_checkout(details)
+        except Exception as e:
+            driver = load_driver(self.__driver)
+            if not (driver.is_auth_failure(e) or driver.is_disconnect(e)):
+                raise
+            refreshed = self.__refresh_tenant(tenant_id, details)
+            if refreshed is None or refreshed == details:
+                raise
+            details = refreshed
+            connection = self.__pool_checkout(details)
 
-        self.__tenant_connection_cache[tenant_id] = connection
+        if self.__tenant_setting is not None:
+            try:
+                connection.scope_to_tenant(self.__tenant_setting, tenant_id)
+            except BaseException:
+                self.__pool.checkin(connection, discard=True)
+                raise
+        # Tenants with shared isolation read the same tables, so writes
+        # invalidate cached results per database
+        connection.use_query_cache(
+            self.__query_cache, tenant_id, details.database_id
+        )
+        connection.tenant_id = tenant_id
         return connection
 
+    def __pool_checkout(self, details: ConnectionDetails) -> "PostgresConnection":
+        key, factory = pool_key(details), self.__connection_factory(details)
+        if self.__sticky.holding():
+            # Connections this thread dropped without closing them may be
+            # what keeps the pool full, so they are given back before waiting
+            try:
+                return self.__pool.checkout(key, factory, timeout=0)
+            except PoolTimeout:
+                self.__sticky.release()
+        return self.__pool.checkout(key, factory)
+
+    def prefetch_tenants(
+        self,
+        tenant_ids: Iterable[str],
+        concurrency: int = 16,
+        connect: bool = True,
+    ) -> dict[str, TenantResult]:
+        """
+        Resolve the connection details of many tenants in parallel, and
+        optionally open pooled connections to their databases, so later
+        connect_tenant calls are served without waiting
+
+        :param tenant_ids: IDs of the tenants
+        :param concurrency: Maximum number of tenants resolved at the same time (optional)
+        :param connect: Open pool_min_size connections, at least one, per database (optional)
+        :return: Result of each tenant with its timing and error, if any
+        """
+
+        def prefetch(tenant_id: str) -> None:
+            details = self.__resolve_tenant(tenant_id)
+            if connect:
+                self.__pool.warm(
+                    pool_key(details),
+                    self.__connection_factory(details),
+                    max(1, self.__pool.min_size),
+                )
+
+        return run_for_tenants(tenant_ids, prefetch, concurrency)
+
+    def fan_out(
+        self,
+        sql: str,
+        parameters: tuple[Any] = ...,
+        tenant_ids: Iterable[str] | None = None,
+        concurrency: int = 16,
+        timeout: float | None = None,
+    ) -> Iterator[tuple[str, list[tuple[Any]] | int | Exception]]:
+        """
+        Run the same statement against many tenants in parallel and yield the
+        result of each tenant as soon as it finishes. A failing tenant yields
+        its error instead of aborting the others.
+
+        The timeout only bounds the statement. Resolving a tenant is bounded
+        by the client's timeout and retries, and waiting for its connection by
+        pool_timeout.
+
+        :param sql: Statement to run
+        :param parameters: Parameters of the statement (optional)
+        :param tenant_ids: IDs of the tenants, defaults to all tenants (optional)
+        :param concurrency: Maximum number of tenants queried at the same time (optional)
+        :param timeout: Statement timeout per tenant in seconds (optional)
+        :return: Iterator of (tenant ID, rows, row count or error) in completion order
+        """
+        if tenant_ids is None:
+            tenant_ids = (
+                tenant.id for tenant in self.iter_tenants(page_size=FAN_OUT_PAGE_SIZE)
+            )
+
+        def query(tenant_id: str) -> list[tuple[Any]] | int:
+            with self.connect_tenant(tenant_id) as connection:
+                cursor = connection.cursor()
+                if timeout is not None:
+                    cursor.execute(
+                        "SET LOCAL statement_timeout = %s", (int(timeout * 1000),)
+                    )
+                cursor.execute(sql, parameters)
+                if cursor.description is None:
+                    return cursor.rowcount
+                return cursor.fetchall()
+
+        return stream_for_tenants(tenant_ids, query, concurrency)
+
+    def __connection_factory(
+        self, details: ConnectionDetails
+    ) -> Callable[[], "PostgresConnection"]:
+        return lambda: load_driver(self.__driver)(
+            details.url,
+            details.port,
+            details.username,
+            details.password,
+            details.database,
+            statement_cache_size=self.__prepared_statements,
+            prepare_threshold=self.__prepare_threshold,
+            statement_stats=self.__statement_stats,
+        ).connect()
+
+    def __resolve_tenant(self, tenant_id: str) -> ConnectionDetails:
+        """
+        Return the tenant's connection details from the cache or the Fortress
+        platform. Concurrent misses for a tenant share a single request.
+        While the platform is failing, expired details are used if cached.
+        """
+        key = f"tenant:{tenant_id}"
+        details = self.__details_cache.get(key)
+        if details is not None:
+            return details
+
+        def resolve() -> ConnectionDetails:
+            try:
+                details = self.__fortress.get_uri(tenant_id, "tenant")
+            except Exception as e:
+                if not is_transient_error(e):
+                    raise
+                stale = self.__details_cache.get(key, allow_stale=True)
+                if stale is None:
+                    raise
+                with self.__fallbacks_lock:
+                    self.__fallbacks += 1
+                return stale
+            self.__details_cache.set(key, details)
+            return details
+
+        return self.__resolutions.do(key, resolve)
+
+    def __refresh_tenant(
+        self, tenant_id: str, failed: ConnectionDetails
+    ) -> ConnectionDetails | None:
+        """
+        Resolve the tenant's connection details, which its database
+        rejected, again with a fresh decryption. The cached details are only
+        replaced once the new ones are fetched, so they stay available to
+        the stale fallback of __resolve_tenant if the request fails. Threads
+        failing together share one request, and a tenant is resolved again
+        at most once per MIN_REFRESH_INTERVAL.
+
+        :return: The new details, or None if the tenant was refreshed too recently
+        """
+        key = f"tenant:{tenant_id}"
+
+        def refresh() -> ConnectionDetails | None:
+            current = self.__details_cache.get(key, allow_stale=True)
+            if current is not None and current != failed:
+                # Already refreshed by a thread that failed earlier
+                return current
+
+            now = time.monotonic()
+            with self.__refresh_lock:
+                last = self.__refreshed.get(key)
+                if last is not None and now - last < MIN_REFRESH_INTERVAL:
+                    return None
+                self.__refreshed[key] = now
+
+            details = self.__fortress.get_uri(tenant_id, "tenant")
+            self.__details_cache.set(key, details)
+            return details
+
+        # Not shared with __resolve_tenant, whose callers need details and
+        # must not receive the None of a throttled refresh
+        return self.__resolutions.do(f"refresh:{tenant_id}", refresh)
+
+    def invalidate_tenant(self, tenant_id: str) -> None:
+        """
+        Forget the cached connection details of a tenant, so the next
+        connect_tenant resolves them from the Fortress platform again
+
+        :param tenant_id: ID of the tenant
+        """
+        self.__details_cache.invalidate(f"tenant:{tenant_id}")
+
+    def resilience_stats(self) -> dict[str, Any]:
+        """
+        Circuit breaker, hedging and fallback counters of tenant resolution
+
+        :return: Circuit trips, calls rejected by an open circuit, hedge
+            requests sent and won, connections made with expired details
+            while the Fortress API was failing, and the endpoints whose
+            circuit is not closed
+        """
+        return {**self.__fortress.stats(), "fallbacks": self.__fallbacks}
+
+    def statement_stats(self) -> dict[str, int]:
+        """
+        Prepared statement statistics across all tenant connections
+
+        :return: Hits, misses, prepares, evictions, failures and the hit rate
+        """
+        return self.__statement_stats.snapshot()
+
+    def query_cache_stats(self) -> dict[str, Any] | None:
+        """
+        Query result cache statistics across all tenants
+
+        :return: Hits, misses, hit rate, evictions, invalidations and size, or None when the cache is disabled
+        """
+        if self.__query_cache is None:
+            return None
+        return self.__query_cache.stats()
+
+    def pool_stats(self) -> dict[str, int]:
+        """
+        Statistics of the tenant connection pools
+
+        :return: Number of pooled keys and open, idle and checked out connections
+        """
+        return self.__pool.stats()
+
     def create_tenant(
         self,
         tenant_id: str,
@@ -104,6 +509,154 @@ class Fortress:
         :param tenant_id: ID of the tenant to delete
         """
         self.__fortress.delete_tenant(tenant_id=tenant_id)
+        self.invalidate_tenant(tenant_id)
+
+    def create_tenants(
+        self,
+        tenants: Iterable[NewTenant | dict[str, str]],
+        concurrency: int = 16,
+        rate_limit: float | None = None,
+        retries: int = 3,
+        warm: bool = False,
+    ) -> dict[str, TenantResult]:
+        """
+        Create many tenants in parallel
+
+        Requests that fail with a connection error or a server error are
+        retried with backoff. The HTTP session sends every request once and
+        retries happen here, so each request takes a rate limit token and
+        counts towards the attempts of its tenant. A tenant that is rejected
+        because it already exists, e.g. because an earlier run or a retried
+        request created it, is reported with status "exists" instead of
+        failing, so a partially failed batch can simply be submitted again.
+        Raise pool_maxsize to at least concurrency to keep all requests on
+        kept-alive connections.
+
+        :param tenants: Tenants to create, as NewTenant or dicts of create_tenant arguments
+        :param concurrency: Maximum number of requests in flight (optional)
+        :param rate_limit: Maximum requests per second, including retries (optional)
+        :param retries: Retries per tenant on transient failures (optional)
+        :param warm: Resolve and cache the connection details of every created tenant, failures are ignored (optional)
+        :return: Result per tenant ID with status created, exists or failed
+        """
+        specs = {}
+        for tenant in tenants:
+            if not isinstance(tenant, NewTenant):
+                tenant = NewTenant(**tenant)
+            specs[tenant.tenant_id] = tenant
+        limiter = TokenBucket(rate_limit) if rate_limit else None
+        statuses: dict[str, str] = {}
+        attempts: dict[str, int] = {}
+
+        def create(tenant_id: str) -> None:
+            spec = specs[tenant_id]
+
+            def request() -> None:
+                attempts[tenant_id] = attempts.get(tenant_id, 0) + 1
+                self.__fortress.create_tenant(
+                    tenant_id=spec.tenant_id,
+                    isolation_level=spec.isolation_level,
+                    platform=spec.platform,
+                    alias=spec.alias,
+                    database_id=spec.database_id,
+                    retry=False,
+                )
+
+            try:
+                retry(request, retries, is_transient_error, limiter=limiter)
+                statuses[tenant_id] = "created"
+            except ValidationError:
+                if not self.__tenant_exists(tenant_id, limiter, attempts):
+                    raise
+                statuses[tenant_id] = "exists"
+                return
+
+            if warm:
+                try:
+                    self.__fetch_tenant(tenant_id, limiter, attempts)
+                except Exception:
+                    pass
+
+        return self.__report(
+            run_for_tenants(specs, create, concurrency), statuses, attempts
+        )
+
+    def delete_tenants(
+        self,
+        tenant_ids: Iterable[str],
+        concurrency: int = 16,
+        rate_limit: float | None = None,
+        retries: int = 3,
+    ) -> dict[str, TenantResult]:
+        """
+        Delete many tenants in parallel
+
+        Requests that fail with a connection error or a server error are
+        retried with backoff. The HTTP session sends every request once and
+        retries happen here, so each request takes a rate limit token and
+        counts towards the attempts of its tenant. A tenant that no longer
+        exists is reported with status "missing" instead of failing.
+
+        :param tenant_ids: IDs of the tenants to delete
+        :param concurrency: Maximum number of requests in flight (optional)
+        :param rate_limit: Maximum requests per second, including retries (optional)
+        :param retries: Retries per tenant on transient failures (optional)
+        :return: Result per tenant ID with status deleted, missing or failed
+        """
+        limiter = TokenBucket(rate_limit) if rate_limit else None
+        statuses: dict[str, str] = {}
+        attempts: dict[str, int] = {}
+
+        def delete(tenant_id: str) -> None:
+            def request() -> None:
+                attempts[tenant_id] = attempts.get(tenant_id, 0) + 1
+                self.__fortress.delete_tenant(tenant_id=tenant_id, retry=False)
+
+            try:
+                retry(request, retries, is_transient_error, limiter=limiter)
+                statuses[tenant_id] = "deleted"
+            except NotFoundError:
+                statuses[tenant_id] = "missing"
+            finally:
+                self.invalidate_tenant(tenant_id)
+
+        return self.__report(
+            run_for_tenants(tenant_ids, delete, concurrency), statuses, attempts
+        )
+
+    def __tenant_exists(
+        self, tenant_id: str, limiter: TokenBucket | None, attempts: dict[str, int]
+    ) -> bool:
+        """Check that a tenant exists by fetching, and caching, its connection details"""
+        try:
+            self.__fetch_tenant(tenant_id, limiter, attempts)
+        except Exception:
+            return False
+        return True
+
+    def __fetch_tenant(
+        self, tenant_id: str, limiter: TokenBucket | None, attempts: dict[str, int]
+    ) -> None:
+        """
+        Fetch and cache a tenant's connection details with exactly one
+        request, which takes a token from limiter and is counted in attempts
+        """
+        if limiter is not None:
+            limiter.acquire()
+        attempts[tenant_id] = attempts.get(tenant_id, 0) + 1
+        details = self.__fortress.get_uri(tenant_id, "tenant", retry=False)
+        self.__details_cache.set(f"tenant:{tenant_id}", details)
+
+    @staticmethod
+    def __report(
+        results: dict[str, TenantResult],
+        statuses: dict[str, str],
+        attempts: dict[str, int],
+    ) -> dict[str, TenantResult]:
+        for tenant_id, result in results.items():
+            result.status = statuses.get(tenant_id, "failed")
+            result.attempts = attempts.get(tenant_id, 0)
+        return results
 
     def list_tenants(self) -> list[Tenant]:
         """
@@ -112,3 +665,40 @@ class Fortress:
         :return: List of tenants
         """
         return self.__fortress.list_tenants()
+
+    def iter_tenants(
+        self,
+        page_size: int | None = None,
+        created_since: datetime.datetime | None = None,
+    ) -> Iterator[Tenant]:
+        """
+        Iterate over all tenants on the Fortress platform, decoding them as
+        the response is received instead of loading the full list
+
+        :param page_size: Tenants requested per page, if the API pages the list (optional)
+        :param created_since: Only list tenants created at or after this time (optional)
+        :return: Iterator of tenants
+        """
+        return self.__fortress.iter_tenants(
+            page_size=page_size, created_since=created_since
+        )
+
+    def tenant_index(self) -> TenantIndex:
+        """
+        Build a local index of all tenants, with lookups by tenant ID and by
+        database. Call refresh on the index to pick up new tenants.
+
+        :return: Loaded tenant index
+        """
+        index = TenantIndex(self.__fortress)
+        index.refresh()
+        return index
+
+    def tenant_table(self) -> TenantTable:
+        """
+        List all tenants into a column-oriented TenantTable, which takes a
+        fraction of the memory of a list of Tenant objects
+
+        :return: Table of all tenants
+        """
+        return TenantTable(self.iter_tenants())
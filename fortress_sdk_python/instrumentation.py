@@ -0,0 +1,223 @@
+"""
+Timing of the SDK's hot paths
+
+Instrumented operations are recorded as spans and handed to the hooks
+registered with add_hook. While no hook is registered span returns a shared
+no-op span, so a disabled span costs a function call and an empty with block.
+
+Spans recorded by the SDK:
+
+- fortress.connect_tenant: tenant_id
+- fortress.http: method, path, status
+- fortress.decrypt
+- fortress.pool.checkout: opened, whether a new connection was opened
+- fortress.connect: host, database
+- fortress.query: tenant_id, rows, cached
+"""
+
+import contextvars
+import math
+import threading
+import time
+from typing import Any, Iterable
+
+
+class Hook:
+    """Receives the spans of instrumented operations, e.g. to export them"""
+
+    def on_start(self, span: "Span") -> None:
+        pass
+
+    def on_end(self, span: "Span") -> None:
+        pass
+
+
+_hooks: tuple[Hook, ...] = ()
+_hooks_lock = threading.Lock()
+_current: contextvars.ContextVar["Span | None"] = contextvars.ContextVar(
+    "fortress_span", default=None
+)
+
+
+def add_hook(hook: Hook) -> None:
+    """Start passing spans to a hook"""
+    global _hooks
+    with _hooks_lock:
+        _hooks = _hooks + (hook,)
+
+
+def remove_hook(hook: Hook) -> None:
+    """Stop passing spans to a hook"""
+    global _hooks
+    with _hooks_lock:
+        _hooks = tuple(h for h in _hooks if h is not hook)
+
+
+class Span:
+    __slots__ = ("name", "attributes", "parent", "start", "duration", "error", "_token")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.attributes: dict[str, Any] = {}
+        self.parent: Span | None = None
+        self.start = 0.0
+        self.duration = 0.0
+        self.error: BaseException | None = None
+        self._token = None
+
+    def set(self, key: str, value: Any) -> None:
+        """Set an attribute of the span"""
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        self.parent = _current.get()
+        self._token = _current.set(self)
+        for hook in _hooks:
+            try:
+                hook.on_start(self)
+            except Exception:
+                pass
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.duration = time.perf_counter() - self.start
+        self.error = exc_value
+        _current.reset(self._token)
+        for hook in _hooks:
+            try:
+                hook.on_end(self)
+            except Exception:
+                pass
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name: str) -> Span | _NoopSpan:
+    """Span of an operation, to be used as a context manager"""
+    if not _hooks:
+        return _NOOP
+    return Span(name)
+
+
+def current_span() -> Span | None:
+    """Innermost span open in this thread or task"""
+    return _current.get()
+
+
+# Histogram buckets are a quarter of a power of two wide, about 19%
+_BUCKETS_PER_OCTAVE = 4
+
+
+class _Histogram:
+    __slots__ = ("count", "errors", "total", "min", "max", "rows", "buckets")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.rows = 0
+        self.buckets: dict[int, int] = {}
+
+    def add(self, duration: float, error: bool, rows: int) -> None:
+        self.count += 1
+        self.errors += error
+        self.total += duration
+        if duration < self.min:
+            self.min = duration
+        if duration > self.max:
+            self.max = duration
+        self.rows += rows
+        index = math.floor(math.log2(max(duration, 1e-9)) * _BUCKETS_PER_OCTAVE)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def percentile(self, fraction: float) -> float:
+        rank = fraction * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                # Upper bound of the bucket, capped by the largest value seen
+                return min(2 ** ((index + 1) / _BUCKETS_PER_OCTAVE), self.max)
+        return self.max
+
+
+class HistogramExporter(Hook):
+    def __init__(self, group_by: Iterable[str] = ("status",)) -> None:
+        """
+        Aggregate span durations into in-memory histograms
+
+        Spans are grouped by name and by the values of the group_by
+        attributes they have, e.g. ("tenant_id",) for per-tenant query
+        latency. Add it with add_hook and read it with snapshot.
+
+        :param group_by: Attributes to group spans by (optional)
+        """
+        self.group_by = tuple(group_by)
+        self.__histograms: dict[tuple, _Histogram] = {}
+        self.__lock = threading.Lock()
+
+    def on_end(self, span: Span) -> None:
+        attributes = span.attributes
+        key = (span.name,)
+        if self.group_by:
+            key += tuple(
+                (name, attributes[name]) for name in self.group_by if name in attributes
+            )
+        rows = attributes.get("rows")
+        with self.__lock:
+            histogram = self.__histograms.get(key)
+            if histogram is None:
+                histogram = self.__histograms[key] = _Histogram()
+            histogram.add(
+                span.duration,
+                span.error is not None,
+                rows if isinstance(rows, int) and rows > 0 else 0,
+            )
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        """
+        Return the statistics of every group
+
+        :return: Name, group attributes, count, errors, rows and durations in
+            seconds (total, min, max, p50, p90, p99) per group
+        """
+        with self.__lock:
+            return [
+                {
+                    "name": key[0],
+                    "attributes": dict(key[1:]),
+                    "count": histogram.count,
+                    "errors": histogram.errors,
+                    "rows": histogram.rows,
+                    "total": histogram.total,
+                    "min": histogram.min,
+                    "max": histogram.max,
+                    "p50": histogram.percentile(0.5),
+                    "p90": histogram.percentile(0.9),
+                    "p99": histogram.percentile(0.99),
+                }
+                for key, histogram in self.__histograms.items()
+            ]
+
+    def reset(self) -> None:
+        """Drop all recorded statistics"""
+        with self.__lock:
+            self.__histograms.clear()
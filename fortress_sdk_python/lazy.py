@@ -0,0 +1,42 @@
+import importlib
+import importlib.util
+import types
+from typing import Any
+
+
+class LazyModule(types.ModuleType):
+    """
+    Stand-in for a module that is imported on first attribute access
+
+    Once imported, the module's attributes are copied onto the stand-in, so
+    later lookups cost the same as on the module itself.
+    """
+
+    def __getattr__(self, attribute: str) -> Any:
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(vars(module))
+        try:
+            return getattr(module, attribute)
+        except AttributeError:
+            pass
+        # Submodules the package does not import itself, e.g. psycopg2.extras
+        try:
+            return importlib.import_module(f"{self.__name__}.{attribute}")
+        except ModuleNotFoundError:
+            raise AttributeError(
+                f"module {self.__name__!r} has no attribute {attribute!r}"
+            ) from None
+
+
+def lazy_module(name: str) -> LazyModule:
+    """Return a module that is imported when it is first used"""
+    return LazyModule(name)
+
+
+def optional_module(name: str) -> LazyModule | None:
+    """Return a module that is imported when it is first used, or None if it is not installed"""
+    try:
+        spec = importlib.util.find_spec(name)
+    except ImportError:
+        spec = None
+    return LazyModule(name) if spec is not None else None
@@ -0,0 +1,606 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import TYPE_CHECKING, Any, Callable, Hashable, Iterable
+
+from .bulk import retry
+from .database import Connection
+from . import fork
+from . import instrumentation
+from .query_cache import is_read_only
+
+if TYPE_CHECKING:
+    from .postgres import BatchResult, PostgresConnection, PostgresCursor
+
+
+class PoolTimeout(Exception):
+    def __init__(self, message="Timed out waiting for a database connection"):
+        self.message = message
+        super().__init__(self.message)
+
+
+class _Bucket:
+    __slots__ = ("idle", "size")
+
+    def __init__(self) -> None:
+        # Stack of (connection, returned_at) so the most recently used
+        # connection is handed out first and the rest can age out
+        self.idle: list[tuple[PostgresConnection, float]] = []
+        # Connections owned by this bucket: idle, checked out or being opened
+        self.size = 0
+
+
+class ConnectionPool:
+    def __init__(
+        self,
+        min_size: int = 0,
+        max_size: int = 10,
+        max_total: int = 100,
+        max_idle: float = 300.0,
+        check_interval: float = 30.0,
+        timeout: float = 30.0,
+    ) -> None:
+        """
+        Bounded pools of database connections, one per key
+
+        Each key gets at most max_size connections and all keys together at
+        most max_total. When the global cap is reached an idle connection of
+        the least recently used key is closed to make room, and connections
+        idle for longer than max_idle are closed down to min_size per key.
+        In a forked child the pool starts empty: connections inherited from
+        the parent are left open for the parent and never handed out.
+
+        :param min_size: Idle connections kept per key when reaping
+        :param max_size: Maximum connections per key
+        :param max_total: Maximum connections across all keys
+        :param max_idle: Seconds an idle connection is kept before being closed
+        :param check_interval: Seconds a connection may sit idle before it is pinged on checkout
+        :param timeout: Seconds to wait for a connection when the pool is exhausted
+        """
+        if max_size < 1 or max_total < 1:
+            raise ValueError("Pool sizes must be at least 1")
+        if min_size > max_size:
+            raise ValueError("min_size cannot be larger than max_size")
+
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_total = max_total
+        self.max_idle = max_idle
+        self.check_interval = check_interval
+        self.timeout = timeout
+
+        self.__buckets: OrderedDict[Hashable, _Bucket] = OrderedDict()
+        self.__checked_out: dict[PostgresConnection, Hashable] = {}
+        self.__total = 0
+        self.__orphans: deque[PostgresConnection] = deque()
+        self.__condition = threading.Condition(threading.Lock())
+        self.__last_reap = time.monotonic()
+        self.__pid = os.getpid()
+        fork.register(self)
+
+    def checkout(
+        self,
+        key: Hashable,
+        factory: Callable[[], "PostgresConnection"],
+        timeout: float | None = None,
+    ) -> "PostgresConnection":
+        """
+        Check out a live connection for a key, opening one with factory if needed
+
+        :param key: Key of the pool to check out from
+        :param factory: Opens a new connection for the key
+        :param timeout: Seconds to wait when the pool is exhausted (optional)
+        :return: Connection that must be returned with checkin
+        """
+        if fork.is_forked(self.__pid):
+            self._after_fork()
+        self.__return_orphans()
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+
+        with instrumentation.span("fortress.pool.checkout") as span:
+            while True:
+                connection, returned_at = self.__acquire(key, deadline)
+
+                if connection is None:
+                    # A slot was reserved, connect outside of the lock
+                    span.set("opened", True)
+                    try:
+                        connection = factory()
+                    except BaseException:
+                        self.__release(key, None)
+                        raise
+                    with self.__condition:
+                        self.__checked_out[connection] = key
+                    return connection
+
+                if self.__is_alive(connection, returned_at):
+                    span.set("opened", False)
+                    return connection
+
+                self.__release(key, connection)
+
+    def checkin(self, connection: "PostgresConnection", discard: bool = False) -> None:
+        """
+        Return a checked out connection to its pool
+
+        :param connection: Connection returned by checkout
+        :param discard: Close the connection instead of keeping it idle (optional)
+        """
+        if fork.is_inherited(connection):
+            return
+        if not discard and not connection.closed and connection.in_transaction:
+            try:
+                connection.rollback()
+            except Exception:
+                discard = True
+
+        with self.__condition:
+            key = self.__checked_out.get(connection)
+            if key is not None and not discard and not connection.closed:
+                del self.__checked_out[connection]
+                self.__buckets[key].idle.append((connection, time.monotonic()))
+                self.__condition.notify_all()
+                return
+
+        self.__release(key, connection)
+
+    def _checkin_later(self, connection: "PostgresConnection") -> None:
+        # Called from finalizers, which may run while this thread holds the
+        # lock, so the connection is only queued, then rolled back and made
+        # idle again on the next checkout
+        self.__orphans.append(connection)
+
+    def warm(
+        self, key: Hashable, factory: Callable[[], "PostgresConnection"], count: int = 1
+    ) -> None:
+        """
+        Open idle connections for a key ahead of time
+
+        :param key: Key of the pool to warm
+        :param factory: Opens a new connection for the key
+        :param count: Number of idle connections to have open, bounded by max_size
+        """
+        connections = []
+        try:
+            for _ in range(min(count, self.max_size)):
+                connections.append(self.checkout(key, factory))
+        finally:
+            for connection in connections:
+                self.checkin(connection)
+
+    def stats(self) -> dict[str, int]:
+        """Return the number of open, idle and checked out connections and keys"""
+        with self.__condition:
+            idle = sum(len(bucket.idle) for bucket in self.__buckets.values())
+            return {
+                "keys": len(self.__buckets),
+                "total": self.__total,
+                "idle": idle,
+                "in_use": len(self.__checked_out),
+            }
+
+    def close(self) -> None:
+        """Close all idle connections and forget checked out ones"""
+        with self.__condition:
+            connections = [
+                connection
+                for bucket in self.__buckets.values()
+                for connection, _ in bucket.idle
+            ]
+            connections.extend(self.__orphans)
+            self.__buckets.clear()
+            self.__checked_out.clear()
+            self.__orphans.clear()
+            self.__total = 0
+            self.__condition.notify_all()
+
+        for connection in connections:
+            _close(connection)
+
+    def _after_fork(self) -> None:
+        if not fork.is_forked(self.__pid):
+            return
+        # The lock may have been held by a thread that does not exist in the
+        # child, so it is replaced rather than acquired
+        fork.abandon(
+            [connection for bucket in self.__buckets.values() for connection, _ in bucket.idle]
+        )
+        fork.abandon(self.__checked_out)
+        fork.abandon(self.__orphans)
+        self.__buckets = OrderedDict()
+        self.__checked_out = {}
+        self.__orphans = deque()
+        self.__total = 0
+        self.__condition = threading.Condition(threading.Lock())
+        self.__pid = os.getpid()
+
+    def __acquire(
+        self, key: Hashable, deadline: float
+    ) -> tuple["PostgresConnection | None", float]:
+        to_close = []
+        try:
+            with self.__condition:
+                to_close.extend(self.__reap())
+
+                while True:
+                    bucket = self.__buckets.get(key)
+                    if bucket is None:
+                        bucket = self.__buckets[key] = _Bucket()
+                    else:
+                        self.__buckets.move_to_end(key)
+
+                    if bucket.idle:
+                        connection, returned_at = bucket.idle.pop()
+                        self.__checked_out[connection] = key
+                        return connection, returned_at
+
+                    if bucket.size < self.max_size:
+                        if self.__total >= self.max_total:
+                            evicted = self.__evict_lru(key)
+                            if evicted is not None:
+                                to_close.append(evicted)
+
+                        if self.__total < self.max_total:
+                            bucket.size += 1
+                            self.__total += 1
+                            return None, 0.0
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout()
+                    self.__condition.wait(remaining)
+        finally:
+            for connection in to_close:
+                _close(connection)
+
+    def __release(self, key: Hashable | None, connection: "PostgresConnection | None"):
+        """Give up a connection slot, closing the connection if there is one"""
+        with self.__condition:
+            if connection is not None:
+                key = self.__checked_out.pop(connection, None)
+            bucket = self.__buckets.get(key) if key is not None else None
+            if bucket is not None:
+                bucket.size -= 1
+                self.__total -= 1
+                if bucket.size == 0:
+                    del self.__buckets[key]
+            self.__condition.notify_all()
+
+        if connection is not None:
+            _close(connection)
+
+    def __is_alive(self, connection: "PostgresConnection", returned_at: float) -> bool:
+        if connection.closed:
+            return False
+        if time.monotonic() - returned_at >= self.check_interval:
+            return connection.ping()
+        return True
+
+    def __evict_lru(self, exclude: Hashable) -> "PostgresConnection | None":
+        for key, bucket in self.__buckets.items():
+            if key == exclude or not bucket.idle:
+                continue
+            connection, _ = bucket.idle.pop(0)
+            bucket.size -= 1
+            self.__total -= 1
+            if bucket.size == 0:
+                del self.__buckets[key]
+            return connection
+        return None
+
+    def __return_orphans(self) -> None:
+        while self.__orphans:
+            try:
+                connection = self.__orphans.popleft()
+            except IndexError:
+                break
+            self.checkin(connection)
+
+    def __reap(self) -> list["PostgresConnection"]:
+        now = time.monotonic()
+        if now - self.__last_reap < self.max_idle / 4:
+            return []
+        self.__last_reap = now
+
+        expired = []
+        for key in list(self.__buckets):
+            bucket = self.__buckets[key]
+            while (
+                bucket.idle
+                and bucket.size > self.min_size
+                and now - bucket.idle[0][1] >= self.max_idle
+            ):
+                connection, _ = bucket.idle.pop(0)
+                bucket.size -= 1
+                self.__total -= 1
+                expired.append(connection)
+            if bucket.size == 0:
+                del self.__buckets[key]
+        return expired
+
+
+def _close(connection: "PostgresConnection") -> None:
+    if fork.is_inherited(connection):
+        return
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+class _Held:
+    """Connection of a PooledConnection that was dropped without being closed"""
+
+    __slots__ = ("pool", "connection")
+
+    def __init__(self, pool: ConnectionPool, connection: "PostgresConnection") -> None:
+        self.pool = pool
+        self.connection: PostgresConnection | None = connection
+
+    def take(self) -> "PostgresConnection | None":
+        connection, self.connection = self.connection, None
+        return connection
+
+    def __del__(self):
+        if self.connection is not None:
+            self.pool._checkin_later(self.connection)
+
+
+class StickyConnections:
+    def __init__(self, pool: ConnectionPool) -> None:
+        """
+        Connections of dropped PooledConnections, kept per thread and key
+
+        Code that never closes its connections, e.g.
+        connect_tenant(tenant_id).cursor().execute(...), gets the connection
+        back on its next checkout of the key from the same thread, with its
+        open transaction and cursors, instead of a new one each time. Kept
+        connections are returned to the pool when their thread exits or by
+        release, e.g. when the thread runs the pool out of connections.
+
+        :param pool: Pool the connections were checked out from
+        """
+        self.__pool = pool
+        self.__local = threading.local()
+        self.__pid = os.getpid()
+        fork.register(self)
+
+    def take(self, key: Hashable) -> "PostgresConnection | None":
+        """
+        Take the connection the current thread dropped for a key, if any
+
+        :param key: Key the connection was kept for
+        :return: Connection that is still checked out from the pool, or None
+        """
+        if fork.is_forked(self.__pid):
+            self._after_fork()
+        entry = self.__held().pop(key, None)
+        connection = entry.take() if entry is not None else None
+        if connection is not None and connection.closed:
+            self.__pool.checkin(connection)
+            return None
+        return connection
+
+    def keeper(self, key: Hashable) -> Callable[["PostgresConnection"], None]:
+        """
+        Callback keeping a dropped connection for the current thread, for
+        the on_drop parameter of PooledConnection
+
+        :param key: Key to keep the connection for
+        """
+        held = self.__held()
+        pool = self.__pool
+
+        def keep(connection: "PostgresConnection") -> None:
+            # Replacing an entry drops it, queueing its connection for checkin
+            held[key] = _Held(pool, connection)
+
+        return keep
+
+    def holding(self) -> bool:
+        """Whether the current thread keeps any connections"""
+        return bool(self.__held())
+
+    def release(self) -> None:
+        """Return the connections kept for the current thread to the pool"""
+        held = self.__held()
+        while held:
+            try:
+                _, entry = held.popitem()
+            except KeyError:
+                break
+            connection = entry.take()
+            if connection is not None:
+                self.__pool.checkin(connection)
+
+    def _after_fork(self) -> None:
+        # Kept connections belong to the parent, the pool abandons them
+        self.__local = threading.local()
+        self.__pid = os.getpid()
+
+    def __held(self) -> dict[Hashable, _Held]:
+        held = getattr(self.__local, "held", None)
+        if held is None:
+            held = self.__local.held = {}
+        return held
+
+
+class PooledConnection(Connection):
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        connection: "PostgresConnection",
+        tenant_id: str | None = None,
+        reconnect: Callable[[], "PostgresConnection"] | None = None,
+        retries: int = 0,
+        backoff_factor: float = 0.1,
+        is_disconnect: Callable[[Exception], bool] | None = None,
+        on_drop: Callable[["PostgresConnection"], None] | None = None,
+    ) -> None:
+        """
+        Connection checked out from a ConnectionPool
+
+        Closing the connection, or leaving its with block, returns it to the
+        pool. The with block commits on success and rolls back on error.
+        A connection that is garbage collected without being closed is
+        passed to on_drop, or else rolled back and returned to the pool.
+
+        When the connection is lost while it is not in a transaction, a
+        read-only statement passed to execute is run again on a connection
+        from reconnect, retries times at most with exponential backoff. If
+        no replacement could be opened, the connection is broken and every
+        later call raises the error of the last reconnect until it is closed.
+
+        :param pool: Pool the connection was checked out from
+        :param connection: The checked out connection
+        :param tenant_id: ID of the tenant the connection is for (optional)
+        :param reconnect: Checks out a replacement connection (optional)
+        :param retries: Attempts after the first one for read-only statements (optional)
+        :param backoff_factor: Seconds before the first retry, doubled for each further one (optional)
+        :param is_disconnect: Whether an error means the database was lost or unreachable, defaults to checking whether the connection closed (optional)
+        :param on_drop: Takes over the connection when this object is garbage collected without being closed, e.g. StickyConnections.keeper (optional)
+        """
+        self.__pool = pool
+        self.__on_drop = on_drop
+        self.__connection = connection
+        # Error of the last failed reconnect, while no connection replaces the lost one
+        self.__broken: Exception | None = None
+        self.__reconnect = reconnect
+        self.__retries = retries
+        self.__backoff_factor = backoff_factor
+        self.__is_disconnect = is_disconnect
+        self.tenant_id = tenant_id
+        self.isolation_level: str = connection.isolation_level
+
+    @property
+    def in_transaction(self) -> bool:
+        return self.__checked_out().in_transaction
+
+    @property
+    def closed(self) -> bool:
+        return self.__connection is None or self.__connection.closed
+
+    def commit(self) -> None:
+        return self.__checked_out().commit()
+
+    def cursor(self, stream: bool = False, itersize: int = 2000) -> "PostgresCursor":
+        return self.__checked_out().cursor(stream=stream, itersize=itersize)
+
+    def sync(self) -> None:
+        return self.__checked_out().sync()
+
+    def rollback(self) -> None:
+        return self.__checked_out().rollback()
+
+    def execute(self, sql: str, parameters: tuple[Any] = ...) -> "PostgresCursor":
+        connection = self.__checked_out()
+        if (
+            self.__reconnect is None
+            or self.__retries <= 0
+            or connection.in_transaction
+            or not is_read_only(sql)
+        ):
+            return connection.execute(sql, parameters)
+
+        def attempt() -> "PostgresCursor":
+            if self.__connection is None or self.__connection.closed:
+                self.__replace()
+            return self.__connection.execute(sql, parameters)
+
+        return retry(attempt, self.__retries, self.__is_lost, self.__backoff_factor)
+
+    def executemany(
+        self,
+        sql: str,
+        parameters: Iterable[tuple[Any]] = ...,
+        page_size: int = 100,
+    ) -> "PostgresCursor":
+        return self.__checked_out().executemany(sql, parameters, page_size=page_size)
+
+    def executescript(self, script: str) -> None:
+        return self.__checked_out().executescript(script)
+
+    def execute_batch(
+        self,
+        statements: Iterable[tuple[str, tuple[Any] | None]],
+        atomic: bool = True,
+    ) -> list["BatchResult"]:
+        return self.__checked_out().execute_batch(statements, atomic=atomic)
+
+    def insert_rows(
+        self,
+        table: str,
+        columns: list[str],
+        rows: Iterable[tuple[Any, ...]],
+        page_size: int = 1000,
+    ) -> int:
+        return self.__checked_out().insert_rows(
+            table, columns, rows, page_size=page_size
+        )
+
+    def copy_rows(
+        self,
+        table: str,
+        columns: list[str],
+        rows: Iterable[tuple[Any, ...]],
+        size: int = 65536,
+    ) -> int:
+        return self.__checked_out().copy_rows(table, columns, rows, size=size)
+
+    def close(self) -> None:
+        """Return the connection to the pool"""
+        connection, self.__connection = self.__connection, None
+        self.__broken = None
+        if connection is not None:
+            self.__pool.checkin(connection)
+
+    def __enter__(self) -> "PooledConnection":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if self.__connection is not None and not self.__connection.closed:
+                if exc_type is None:
+                    self.__connection.commit()
+                else:
+                    self.__connection.rollback()
+        finally:
+            self.close()
+
+    def __del__(self):
+        connection = getattr(self, "_PooledConnection__connection", None)
+        if connection is None:
+            return
+        if self.__on_drop is not None:
+            self.__on_drop(connection)
+        else:
+            self.__pool._checkin_later(connection)
+
+    def __is_lost(self, error: Exception) -> bool:
+        # The statement failed because the connection went away, or no
+        # replacement could be opened yet
+        if self.__is_disconnect is not None:
+            return self.__is_disconnect(error)
+        return self.__connection is not None and self.__connection.closed
+
+    def __replace(self) -> None:
+        """Swap the lost connection for a new one checked out with reconnect"""
+        connection, self.__connection = self.__connection, None
+        if connection is not None:
+            self.__pool.checkin(connection, discard=True)
+        try:
+            self.__connection = self.__reconnect()
+        except Exception as e:
+            # Later calls raise this error rather than claiming the
+            # connection was returned to the pool
+            self.__broken = e
+            raise
+        self.__broken = None
+
+    def __checked_out(self) -> "PostgresConnection":
+        if self.__connection is None:
+            if self.__broken is not None:
+                raise self.__broken
+            raise ValueError("Connection has already been returned to the pool")
+        return self.__connection
@@ -3,44 +3,444 @@ from .database import (
     Connection,
     Cursor,
 )
+from .prepared import StatementCache, StatementStats
+from .query_cache import CachedRows, QueryCache, QueryScope
+from . import columns as columns_module
+from . import instrumentation
 import psycopg2
-from typing import Any
+import psycopg2.extras
+from psycopg2 import sql as pgsql
+from dataclasses import dataclass
+from typing import Any, Hashable, Iterable, Iterator
+import itertools
+import json
+import re
+import uuid
+
+
+@dataclass
+class BatchResult:
+    rows: list[tuple[Any, ...]] | None
+    rowcount: int
+    error: Exception | None = None
+
+
+class BatchError(Exception):
+    def __init__(self, index: int, error: Exception, results: list[BatchResult]):
+        """
+        Raised by an atomic execute_batch when a statement fails
+
+        :param index: Index of the failed statement
+        :param error: Error raised by the failed statement
+        :param results: Results of the statements before the failed one
+        """
+        self.index = index
+        self.error = error
+        self.results = results
+        self.message = f"Statement {index} of the batch failed: {error}"
+        super().__init__(self.message)
+
+
+# Statements that never return rows. Anything else, e.g. SELECT, CALL, a
+# parenthesized query or a CTE, is assumed to return rows.
+_NO_ROWS_RE = re.compile(
+    r"(?:\s+|--[^\n]*+|/\*.*?\*/)*+"
+    r"(?:insert|update|delete|merge|set|reset|create|alter|drop|truncate|grant"
+    r"|revoke|comment|lock|do|notify|listen|unlisten|analyze|vacuum|refresh)\b",
+    re.IGNORECASE | re.DOTALL,
+)
+_RETURNING_RE = re.compile(r"\breturning\b", re.IGNORECASE)
+
+
+def _returns_rows(sql: str) -> bool:
+    """
+    Whether a statement may return rows. Only statements that certainly do
+    not are batched with the next one, so an unrecognised statement costs a
+    round trip instead of losing its rows.
+    """
+    return _NO_ROWS_RE.match(sql) is None or _RETURNING_RE.search(sql) is not None
+
+
+_batches = itertools.count()
+
+_INSERT_VALUES_RE = re.compile(r"^\s*insert\s+into\s+.+?\s+values\s*(?=\()", re.I | re.S)
+
+
+def _values_template(sql: str) -> tuple[str, str] | None:
+    """
+    Split a single row INSERT ... VALUES (...) statement into the statement
+    with VALUES %s and the row template, for execute_values. Statements with
+    anything after the row, such as ON CONFLICT or RETURNING, are not split.
+    """
+    match = _INSERT_VALUES_RE.match(sql)
+    if match is None:
+        return None
+
+    depth = 0
+    quote = None
+    for end in range(match.end(), len(sql)):
+        char = sql[end]
+        if quote is not None:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                break
+    else:
+        return None
+
+    if sql[end + 1 :].strip().rstrip(";").strip():
+        return None
+    return sql[: match.end()] + "%s", sql[match.end() : end + 1]
+
+
+def _pages(items: Iterable[Any], page_size: int) -> Iterator[list[Any]]:
+    items = iter(items)
+    while page := list(itertools.islice(items, max(1, page_size))):
+        yield page
+
+
+class _ManyResult:
+    """Cursor after executemany, with the row count of all its statements"""
+
+    def __init__(self, cursor, rowcount: int) -> None:
+        self.__cursor = cursor
+        self.rowcount = rowcount
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.__cursor, name)
+
+    def __iter__(self) -> Iterator[tuple[Any, ...]]:
+        return iter(self.__cursor)
+
+
+class _CopyStream:
+    """File-like object that encodes rows to COPY text format as they are read"""
+
+    def __init__(self, rows: Iterable[Iterable[Any]]) -> None:
+        self.__rows = iter(rows)
+        self.__buffer = ""
+        self.rowcount = 0
+
+    def read(self, size: int = -1) -> str:
+        lines = [self.__buffer]
+        length = len(self.__buffer)
+        for row in self.__rows:
+            line = "\t".join(_copy_value(value) for value in row) + "\n"
+            lines.append(line)
+            length += len(line)
+            self.rowcount += 1
+            if 0 <= size <= length:
+                break
+
+        data = "".join(lines)
+        if size < 0:
+            size = len(data)
+        self.__buffer = data[size:]
+        return data[:size]
+
+
+_COPY_ESCAPES = str.maketrans(
+    {"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"}
+)
+
+
+def _copy_value(value: Any) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "\\\\x" + bytes(value).hex()
+    if isinstance(value, list):
+        value = _array_literal(value)
+    elif isinstance(value, dict):
+        value = json.dumps(value)
+    elif isinstance(value, psycopg2.extras.Json):
+        value = value.dumps(value.adapted)
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def _array_literal(values: list[Any]) -> str:
+    """Postgres array literal of a list, nested lists being sub-arrays, as psycopg2 adapts lists"""
+    elements = []
+    for value in values:
+        if value is None:
+            elements.append("NULL")
+            continue
+        if isinstance(value, list):
+            elements.append(_array_literal(value))
+            continue
+        if isinstance(value, bool):
+            text = "t" if value else "f"
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            text = "\\x" + bytes(value).hex()
+        elif isinstance(value, dict):
+            text = json.dumps(value)
+        elif isinstance(value, psycopg2.extras.Json):
+            text = value.dumps(value.adapted)
+        else:
+            text = str(value)
+        elements.append('"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"')
+    return "{" + ",".join(elements) + "}"
 
 
 class PostgresCursor(Cursor):
-    def __init__(self, cursor):
+    def __init__(
+        self,
+        cursor,
+        statements: StatementCache | None = None,
+        queries: QueryScope | None = None,
+        tenant_id: str | None = None,
+    ):
         self.__cursor = cursor
+        self.__statements = statements
+        self.__queries = queries
+        self.__tenant_id = tenant_id
+        # Rows are read from the cursor, or from the cached result of the last query
+        self.__result = cursor
 
     @property
     def description(self) -> tuple[tuple[Any, ...], ...] | None:
-        return self.__cursor.description
+        return self.__result.description
 
     @property
     def rowcount(self) -> int:
-        return self.__cursor.rowcount
+        return self.__result.rowcount
 
     @property
     def lastrowid(self) -> int | None:
-        return self.__cursor.lastrowid
+        return self.__result.lastrowid
+
+    @property
+    def itersize(self) -> int:
+        return self.__cursor.itersize
+
+    @itersize.setter
+    def itersize(self, itersize: int) -> None:
+        self.__cursor.itersize = itersize
 
     def execute(self, sql: str, parameters: tuple[Any] = ...) -> "PostgresCursor":
-        self.__cursor.execute(sql, parameters)
-        return PostgresCursor(self.__cursor)
+        with instrumentation.span("fortress.query") as span:
+            span.set("tenant_id", self.__tenant_id)
+            cached = self.__execute(sql, parameters)
+            span.set("rows", self.__result.rowcount)
+            span.set("cached", cached)
+        return self
+
+    def __execute(self, sql: str, parameters: tuple[Any]) -> bool:
+        """Execute a statement, returning whether its result came from the query cache"""
+        if parameters is ...:
+            parameters = None
+        self.__result = self.__cursor
+
+        tables = None
+        if self.__queries is not None:
+            cached, tables = self.__queries.lookup(
+                sql, parameters, self.__cursor.connection.autocommit
+            )
+            if cached is not None:
+                self.__result = cached
+                return True
+
+        if self.__statements is not None:
+            self.__statements.execute(self.__cursor, sql, parameters)
+        else:
+            self.__cursor.execute(sql, parameters)
+
+        if tables is not None and self.__cursor.description is not None:
+            rows = self.__cursor.fetchall()
+            description = self.__cursor.description
+            self.__queries.store(sql, parameters, tables, description, rows)
+            self.__result = CachedRows(description, rows)
+        return False
 
     def executemany(
-        self, sql: str, parameters: list[tuple[Any]] = ...
+        self,
+        sql: str,
+        parameters: Iterable[tuple[Any]] = ...,
+        page_size: int = 100,
     ) -> "PostgresCursor":
-        self.__cursor.executemany(sql, parameters)
-        return PostgresCursor(self.__cursor)
+        """
+        Execute a statement for every set of parameters, sending page_size
+        statements per round trip. Parameters may be any iterable, including
+        a generator, and are consumed one page at a time.
+
+        A single row INSERT ... VALUES (...) statement is sent as one multi-row
+        INSERT per page and rowcount is the number of rows inserted. Postgres
+        only reports the row count of the last statement of a round trip, so
+        for other statements rowcount is -1.
+        """
+        self.__result = self.__cursor
+        if self.__queries is not None:
+            self.__queries.record_write(sql, self.__cursor.connection.autocommit)
+        if parameters is ...:
+            parameters = []
+
+        template = _values_template(sql)
+        rowcount = 0 if template is not None else -1
+        for page in _pages(parameters, page_size):
+            if template is not None:
+                psycopg2.extras.execute_values(
+                    self.__cursor, template[0], page, template[1], len(page)
+                )
+                rowcount += self.__cursor.rowcount
+            else:
+                psycopg2.extras.execute_batch(
+                    self.__cursor, sql, page, page_size=len(page)
+                )
+        self.__result = _ManyResult(self.__cursor, rowcount)
+        return self
+
+    def insert_rows(
+        self,
+        table: str,
+        columns: list[str],
+        rows: Iterable[tuple[Any, ...]],
+        page_size: int = 1000,
+    ) -> int:
+        """
+        Insert rows with multi-row INSERT ... VALUES statements of page_size
+        rows each. Rows may be any iterable and are consumed one page at a time.
+
+        :param table: Name of the table, optionally schema qualified
+        :param columns: Names of the columns the row values belong to
+        :param rows: Rows to insert
+        :param page_size: Rows per statement (optional)
+        :return: Number of rows inserted
+        """
+        query = pgsql.SQL("INSERT INTO {} ({}) VALUES %s").format(
+            _identifier(table),
+            pgsql.SQL(", ").join(pgsql.Identifier(column) for column in columns),
+        )
+        self.__record_table_write(table)
+        count = 0
+
+        def counted() -> Iterator[tuple[Any, ...]]:
+            nonlocal count
+            for row in rows:
+                count += 1
+                yield row
+
+        psycopg2.extras.execute_values(
+            self.__cursor, query, counted(), page_size=page_size
+        )
+        return count
+
+    def copy_rows(
+        self,
+        table: str,
+        columns: list[str],
+        rows: Iterable[tuple[Any, ...]],
+        size: int = 65536,
+    ) -> int:
+        """
+        Load rows with COPY FROM STDIN. Rows are encoded and sent size bytes at
+        a time as they are consumed, so any iterable, including a generator,
+        can be loaded without holding it in memory.
+
+        :param table: Name of the table, optionally schema qualified
+        :param columns: Names of the columns the row values belong to
+        :param rows: Rows to load
+        :param size: Bytes sent per chunk (optional)
+        :return: Number of rows loaded
+        """
+        query = pgsql.SQL("COPY {} ({}) FROM STDIN").format(
+            _identifier(table),
+            pgsql.SQL(", ").join(pgsql.Identifier(column) for column in columns),
+        )
+        self.__record_table_write(table)
+        stream = _CopyStream(rows)
+        self.__cursor.copy_expert(query, stream, size)
+        return stream.rowcount
+
+    def __record_table_write(self, table: str) -> None:
+        self.__result = self.__cursor
+        if self.__queries is not None:
+            self.__queries.record_tables((table,), self.__cursor.connection.autocommit)
 
     def fetchone(self) -> tuple[Any] | None:
-        return self.__cursor.fetchone()
+        return self.__result.fetchone()
 
     def fetchmany(self, size: int = ...) -> list[tuple[Any, ...]]:
-        return self.__cursor.fetchmany(size)
+        if size is ...:
+            size = self.__result.arraysize
+        return self.__result.fetchmany(size)
 
     def fetchall(self) -> list[tuple[Any]]:
-        return self.__cursor.fetchall()
+        return self.__result.fetchall()
+
+    def fetch_columns(self, batch_size: int = 10_000) -> dict[str, list[Any]]:
+        """
+        Fetch the remaining rows as one list per column, keyed by column name,
+        with repeated names made unique by columns.column_names. Rows are
+        fetched and transposed batch_size at a time, so the full result is
+        never held as tuples.
+        """
+        self.__check_rows()
+        columns: dict[str, list[Any]] = {}
+        for batch in columns_module.iter_column_batches(self, batch_size):
+            for name, values in batch.items():
+                columns.setdefault(name, []).extend(values)
+        if not columns:
+            description = columns_module.column_description(self)
+            columns = {name: [] for name in columns_module.column_names(description)}
+        return columns
+
+    def iter_column_batches(
+        self, batch_size: int = 10_000
+    ) -> Iterator[dict[str, list[Any]]]:
+        """Yield the remaining rows batch_size at a time as lists per column"""
+        self.__check_rows()
+        return columns_module.iter_column_batches(self, batch_size)
+
+    def fetch_numpy(self, batch_size: int = 10_000) -> dict[str, Any]:
+        """
+        Fetch the remaining rows as one NumPy array per column, keyed by column
+        name like fetch_columns. Array types follow the column types in
+        description, see columns.to_array. Requires numpy.
+        """
+        self.__check_rows()
+        batches = list(columns_module.iter_array_batches(self, batch_size))
+        if not batches:
+            description = columns_module.column_description(self)
+            return {
+                name: columns_module.to_array([], column[1])
+                for name, column in zip(
+                    columns_module.column_names(description), description
+                )
+            }
+        if len(batches) == 1:
+            return batches[0]
+        return {
+            name: columns_module.numpy.concatenate([batch[name] for batch in batches])
+            for name in batches[0]
+        }
+
+    def iter_numpy_batches(self, batch_size: int = 10_000) -> Iterator[dict[str, Any]]:
+        """
+        Yield the remaining rows batch_size at a time as NumPy arrays per
+        column, so a streaming cursor can process results of any size as
+        record batches. Requires numpy.
+        """
+        self.__check_rows()
+        return columns_module.iter_array_batches(self, batch_size)
+
+    def close(self) -> None:
+        self.__cursor.close()
+
+    def __check_rows(self) -> None:
+        # Server-side cursors only have a description after the first fetch
+        if getattr(self.__result, "name", None) is None:
+            columns_module.column_description(self)
+
+    def __iter__(self) -> Iterator[tuple[Any, ...]]:
+        return iter(self.__result)
 
     def __enter__(self) -> "PostgresCursor":
         return self
@@ -50,47 +450,372 @@ class PostgresCursor(Cursor):
 
 
 class PostgresConnection(Connection):
-    def __init__(self, connection: psycopg2.extensions.connection):
+    def __init__(
+        self,
+        connection: psycopg2.extensions.connection,
+        statement_cache_size: int = 0,
+        prepare_threshold: int = 5,
+        statement_stats: StatementStats | None = None,
+    ):
+        """
+        Wrap a psycopg2 connection
+
+        :param connection: Connection to wrap
+        :param statement_cache_size: Statements to keep prepared, 0 disables preparing (optional)
+        :param prepare_threshold: Executions of a statement before it is prepared (optional)
+        :param statement_stats: Counters shared with other connections (optional)
+        """
         self.__connection = connection
+        self.__tenant_scope: tuple[str, str] | None = None
+        self.__statements = (
+            StatementCache(
+                connection,
+                max_size=statement_cache_size,
+                threshold=prepare_threshold,
+                stats=statement_stats,
+            )
+            if statement_cache_size > 0
+            else None
+        )
+        self.__queries: QueryScope | None = None
         self.isolation_level: str = self.__connection.isolation_level
+        # Tenant the connection is checked out for, reported with query spans
+        self.tenant_id: str | None = None
+
+    @property
+    def statement_stats(self) -> dict[str, int] | None:
+        """Prepared statement hits, misses and prepares, if preparing is enabled"""
+        if self.__statements is None:
+            return None
+        return self.__statements.stats.snapshot()
+
+    @property
+    def in_transaction(self) -> bool:
+        return (
+            self.__connection.info.transaction_status
+            != psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        )
+
+    @property
+    def closed(self) -> bool:
+        return bool(self.__connection.closed)
+
+    def ping(self) -> bool:
+        """Check that the server still answers on this connection"""
+        try:
+            with self.__connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            if not self.__connection.autocommit:
+                self.__connection.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def close(self) -> None:
+        self.__connection.close()
+
+    def scope_to_tenant(self, setting: str, tenant_id: str) -> None:
+        """
+        Set a session setting to the tenant ID, for use by row level security
+        policies or views through current_setting(). The setting is only sent
+        when it changed since the last call on this connection.
+
+        :param setting: Name of the setting, which must contain a dot
+        :param tenant_id: ID of the tenant
+        """
+        if self.__tenant_scope == (setting, tenant_id):
+            return
+
+        with self.__connection.cursor() as cursor:
+            cursor.execute("SELECT set_config(%s, %s, false)", (setting, tenant_id))
+        if not self.__connection.autocommit:
+            self.__connection.commit()
+        self.__tenant_scope = (setting, tenant_id)
+
+    def use_query_cache(
+        self,
+        cache: QueryCache | None,
+        tenant_id: str,
+        database: Hashable | None = None,
+    ) -> None:
+        """
+        Serve SELECT statements of non-streaming cursors from a query cache,
+        on behalf of a tenant, and drop the cached results of all tenants on
+        the database for the tables this connection commits writes to
+
+        :param cache: Cache to use, or None to stop caching
+        :param tenant_id: ID of the tenant the cached results belong to
+        :param database: Key of the database the connection is on, e.g. its database ID, defaults to the tenant ID (optional)
+        """
+        self.__queries = (
+            QueryScope(cache, tenant_id, database) if cache is not None else None
+        )
 
     def commit(self) -> None:
-        return self.__connection.commit()
+        self.__connection.commit()
+        if self.__queries is not None:
+            self.__queries.commit()
+
+    def cursor(self, stream: bool = False, itersize: int = 2000) -> PostgresCursor:
+        """
+        Open a cursor on the connection
 
-    def cursor(self) -> PostgresCursor:
-        return PostgresCursor(self.__connection.cursor())
+        A streaming cursor is a server-side cursor: rows stay on the server and
+        are fetched itersize at a time while iterating or calling fetchmany, so
+        memory does not grow with the size of the result. It can run a single
+        query and must be used inside a transaction, i.e. not in autocommit mode.
+
+        :param stream: Open a server-side cursor (optional)
+        :param itersize: Rows fetched per round trip when iterating a streaming cursor (optional)
+        """
+        if not stream:
+            return PostgresCursor(
+                self.__connection.cursor(),
+                self.__statements,
+                self.__queries,
+                self.tenant_id,
+            )
+
+        cursor = self.__connection.cursor(name=f"fortress_{uuid.uuid4().hex}")
+        cursor.itersize = itersize
+        return PostgresCursor(cursor, tenant_id=self.tenant_id)
 
     def sync(self) -> None:
         return self.__connection.sync()
 
     def rollback(self) -> None:
-        return self.__connection.rollback()
+        self.__connection.rollback()
+        if self.__queries is not None:
+            self.__queries.rollback()
+
+    def execute(self, sql: str, parameters: tuple[Any] = ...) -> PostgresCursor:
+        return self.cursor().execute(sql, parameters)
 
     def fetchall(self, sql: str, parameters: tuple[Any] = ...) -> list[tuple[Any]]:
-        return self.__connection.fetchall(sql, parameters)
+        return self.execute(sql, parameters).fetchall()
 
     def executemany(
-        self, sql: str, parameters: list[tuple[Any]] = ...
+        self,
+        sql: str,
+        parameters: Iterable[tuple[Any]] = ...,
+        page_size: int = 100,
     ) -> PostgresCursor:
-        return self.__connection.executemany(sql, parameters)
+        return self.cursor().executemany(sql, parameters, page_size=page_size)
 
     def executescript(self, script: str) -> None:
-        return self.__connection.executescript(script)
+        if self.__queries is not None:
+            self.__queries.record_write(script, self.__connection.autocommit)
+        with self.__connection.cursor() as cursor:
+            cursor.execute(script)
+        if self.__statements is not None:
+            self.__statements.observe(script)
+
+    def execute_batch(
+        self,
+        statements: Iterable[tuple[str, tuple[Any] | None]],
+        atomic: bool = True,
+    ) -> list[BatchResult]:
+        """
+        Execute several statements in as few round trips as possible
+
+        Statements are sent together up to and including the next statement
+        that may return rows, so the number of round trips is the number of
+        such statements, plus one for trailing writes. Only writes without
+        RETURNING and utility statements such as SET or DDL are known not to
+        return rows, every other statement ends a round trip. Statements run
+        in the connection's current transaction, which is left open for the
+        caller to commit.
+
+        The batch and each of its statements run behind savepoints, so a
+        failure is pinned to its statement. With atomic, a failure rolls back
+        every statement of the batch, but not the work the transaction did
+        before it, and raises BatchError. Without atomic, only the failed
+        statement is rolled back, its error is reported in its result and the
+        batch continues.
+
+        :param statements: (sql, parameters) pairs, parameters may be None
+        :param atomic: Roll back the whole batch when a statement fails (optional)
+        :return: Result per statement, rows are only set for row-returning statements
+        """
+        if self.__connection.autocommit:
+            raise ValueError("execute_batch requires autocommit to be disabled")
+
+        statements = list(statements)
+        if self.__queries is not None:
+            for sql, _ in statements:
+                self.__queries.record_write(sql)
+        results: list[BatchResult] = []
+        # Savepoint names are unique per batch, so a savepoint left from an
+        # earlier batch in the same transaction is never mistaken for one of
+        # this batch when looking for the failed statement
+        prefix = f"fortress_batch_{next(_batches)}"
+        # Sent with the first group, rolled back to when the batch is aborted
+        release = f"SAVEPOINT {prefix}"
+
+        with self.__connection.cursor() as cursor:
+            start = 0
+            while start < len(statements):
+                end = start
+                while end < len(statements) - 1 and not _returns_rows(
+                    statements[end][0]
+                ):
+                    end += 1
+
+                # The savepoints of the previous group are released with this
+                # group, the last group's are released when the transaction ends
+                parts = [release]
+                for index in range(start, end + 1):
+                    sql, parameters = statements[index]
+                    parts.append(f"SAVEPOINT {prefix}_{index}")
+                    parts.append(
+                        cursor.mogrify(
+                            sql, None if parameters is ... else parameters
+                        ).decode()
+                    )
+                release = f"RELEASE SAVEPOINT {prefix}_{start}"
+
+                try:
+                    cursor.execute(";\n".join(parts))
+                except psycopg2.Error as error:
+                    failed = self.__rollback_failed_statement(
+                        cursor, prefix, start, end
+                    )
+                    if failed is None or atomic:
+                        self.__rollback_batch(cursor, prefix)
+                        if failed is None:
+                            raise
+                        results.extend(
+                            BatchResult(None, -1) for _ in range(start, failed)
+                        )
+                        raise BatchError(failed, error, results) from error
+
+                    results.extend(BatchResult(None, -1) for _ in range(start, failed))
+                    results.append(BatchResult(None, -1, error))
+                    start = failed + 1
+                    continue
+
+                if self.__statements is not None:
+                    for index in range(start, end + 1):
+                        self.__statements.observe(statements[index][0])
+                results.extend(BatchResult(None, -1) for _ in range(start, end))
+                rows = cursor.fetchall() if cursor.description is not None else None
+                results.append(BatchResult(rows, cursor.rowcount))
+                start = end + 1
+
+        return results
+
+    def __rollback_batch(self, cursor, prefix: str) -> None:
+        """Undo every statement of a batch, keeping the earlier work of the transaction"""
+        try:
+            cursor.execute(
+                f"ROLLBACK TO SAVEPOINT {prefix}; RELEASE SAVEPOINT {prefix}"
+            )
+        except psycopg2.Error:
+            # The batch savepoint was never created, e.g. because the
+            # transaction had already failed, or the connection is lost
+            self.__connection.rollback()
+
+    def __rollback_failed_statement(
+        self, cursor, prefix: str, start: int, end: int
+    ) -> int | None:
+        """
+        Find the statement of a batch that failed by rolling back to the last
+        savepoint that was reached, which is the one set just before it
+        """
+        for index in range(end, start - 1, -1):
+            try:
+                cursor.execute(f"ROLLBACK TO SAVEPOINT {prefix}_{index}")
+                return index
+            except psycopg2.Error:
+                continue
+        return None
+
+    def insert_rows(
+        self,
+        table: str,
+        columns: list[str],
+        rows: Iterable[tuple[Any, ...]],
+        page_size: int = 1000,
+    ) -> int:
+        with self.cursor() as cursor:
+            return cursor.insert_rows(table, columns, rows, page_size=page_size)
+
+    def copy_rows(
+        self,
+        table: str,
+        columns: list[str],
+        rows: Iterable[tuple[Any, ...]],
+        size: int = 65536,
+    ) -> int:
+        with self.cursor() as cursor:
+            return cursor.copy_rows(table, columns, rows, size=size)
+
+
+def _identifier(name: str) -> pgsql.Composable:
+    return pgsql.Identifier(*name.split("."))
+
+
+# Connection failures carry no SQLSTATE, so rejected credentials are told
+# apart by libpq's message
+_AUTH_FAILURE_RE = re.compile(
+    r"authentication failed|no password supplied|no pg_hba\.conf entry"
+    r'|role "[^"]*" does not exist',
+    re.IGNORECASE,
+)
+# Server shutting down, crashed or still starting
+_SHUTDOWN_CODES = frozenset({"57P01", "57P02", "57P03"})
 
 
 class PostgresClient(DatabaseClient):
     def __init__(
-        self, host: str, port: int, user: str, password: str, database_name: str
+        self,
+        host: str,
+        port: int,
+        user: str,
+        password: str,
+        database_name: str,
+        statement_cache_size: int = 0,
+        prepare_threshold: int = 5,
+        statement_stats: StatementStats | None = None,
     ) -> None:
         self.__host = host
         self.__port = port
         self.__user = user
         self.__password = password
         self.__database_name = database_name
+        self.__statement_cache_size = statement_cache_size
+        self.__prepare_threshold = prepare_threshold
+        self.__statement_stats = statement_stats
+
+    @staticmethod
+    def is_auth_failure(error: Exception) -> bool:
+        if not isinstance(error, psycopg2.OperationalError):
+            return False
+        if error.pgcode is not None:
+            # Class 28, invalid authorization specification
+            return error.pgcode.startswith("28")
+        return _AUTH_FAILURE_RE.search(str(error)) is not None
+
+    @staticmethod
+    def is_disconnect(error: Exception) -> bool:
+        if isinstance(error, psycopg2.InterfaceError):
+            return True
+        if not isinstance(error, psycopg2.OperationalError):
+            return False
+        code = error.pgcode
+        # Class 08, connection exception
+        return code is None or code.startswith("08") or code in _SHUTDOWN_CODES
 
     def connect(self) -> PostgresConnection:
-        return PostgresConnection(
-            psycopg2.connect(
+        with instrumentation.span("fortress.connect") as span:
+            span.set("host", self.__host)
+            span.set("database", self.__database_name)
+            connection = psycopg2.connect(
                 f"dbname={self.__database_name} user={self.__user} password={self.__password} host={self.__host} port={self.__port} sslmode=require"
             )
+        return PostgresConnection(
+            connection,
+            statement_cache_size=self.__statement_cache_size,
+            prepare_threshold=self.__prepare_threshold,
+            statement_stats=self.__statement_stats,
         )
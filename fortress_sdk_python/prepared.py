@@ -0,0 +1,281 @@
+import datetime
+import decimal
+import itertools
+import math
+import re
+import threading
+from collections import OrderedDict
+from typing import Any
+
+from .lazy import lazy_module
+
+# Imported with the first connection, StatementStats is used before that
+psycopg2 = lazy_module("psycopg2")
+
+# Statements that PREPARE accepts
+_PREPARABLE = ("select", "insert", "update", "delete", "values", "with", "merge")
+
+# Statements that deallocate prepared statements of the session
+_DEALLOCATE_RE = re.compile(
+    r"\b(?:discard\s+all|deallocate\s+(?:prepare\s+)?(\w+))\b", re.IGNORECASE
+)
+
+_INT4 = range(-(2**31), 2**31)
+_INT8 = range(-(2**63), 2**63)
+
+
+class StatementStats:
+    def __init__(self) -> None:
+        """Counters of prepared statement use, shareable between connections"""
+        self.__lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.prepares = 0
+        self.evictions = 0
+        self.failures = 0
+
+    def add(self, counter: str) -> None:
+        with self.__lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self) -> dict[str, int]:
+        """Return the counters and the hit rate"""
+        with self.__lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "prepares": self.prepares,
+                "evictions": self.evictions,
+                "failures": self.failures,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def to_positional(sql: str) -> tuple[str, int] | None:
+    """
+    Convert psycopg2 %s placeholders to $1, $2, ... for PREPARE
+
+    :return: Converted statement and number of parameters, or None when the
+        statement uses placeholders other than %s
+    """
+    parts = []
+    count = 0
+    i = 0
+    while True:
+        j = sql.find("%", i)
+        if j < 0:
+            parts.append(sql[i:])
+            return "".join(parts), count
+        parts.append(sql[i:j])
+        marker = sql[j + 1 : j + 2]
+        if marker == "%":
+            parts.append("%")
+        elif marker == "s":
+            count += 1
+            parts.append(f"${count}")
+        else:
+            return None
+        i = j + 2
+
+
+def parameter_type(value: Any) -> str | None:
+    """
+    Type of the literal psycopg2 sends for a parameter, declared with PREPARE
+    so prepared executions convert parameters the way plain executions do
+
+    :return: Type name, unknown when the server infers it from the
+        statement, or None when the value is not prepared
+    """
+    if value is None or isinstance(value, str):
+        return "unknown"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        if value in _INT4:
+            return "int4"
+        return "int8" if value in _INT8 else "numeric"
+    if isinstance(value, float):
+        # NaN and infinities are sent as float8, other floats as numeric
+        return "numeric" if math.isfinite(value) else "float8"
+    if isinstance(value, decimal.Decimal):
+        return "numeric"
+    if isinstance(value, datetime.datetime):
+        return "timestamptz" if value.tzinfo is not None else "timestamp"
+    if isinstance(value, datetime.date):
+        return "date"
+    if isinstance(value, datetime.time):
+        return "timetz" if value.tzinfo is not None else "time"
+    if isinstance(value, datetime.timedelta):
+        return "interval"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "bytea"
+    return None
+
+
+_names = itertools.count()
+
+
+class StatementCache:
+    def __init__(
+        self,
+        connection: "psycopg2.extensions.connection",
+        max_size: int = 100,
+        threshold: int = 5,
+        stats: StatementStats | None = None,
+    ) -> None:
+        """
+        Prepare statements that are executed often on a connection
+
+        Once a statement with positional parameters has been executed
+        threshold times with the same parameter types it is PREPAREd and
+        later executions send only EXECUTE with the parameters, skipping
+        parsing and planning. The parameter types are declared to be those of
+        the literals psycopg2 would send, and a statement executed with other
+        types is prepared separately. At most max_size statements stay
+        prepared, the least recently used is deallocated. The cache is reset
+        when the server session changes or a statement executed through it
+        runs DISCARD ALL or DEALLOCATE.
+
+        :param connection: Connection the statements are prepared on
+        :param max_size: Maximum number of prepared statements
+        :param threshold: Executions of a statement before it is prepared
+        :param stats: Counters to record hits and misses in (optional)
+        """
+        self.__connection = connection
+        self.max_size = max_size
+        self.threshold = threshold
+        self.stats = stats if stats is not None else StatementStats()
+
+        # Keyed by statement and parameter types
+        self.__statements: OrderedDict[tuple[str, tuple[str, ...]], tuple[str, int]] = (
+            OrderedDict()
+        )
+        self.__counts: OrderedDict[tuple[str, tuple[str, ...]], int] = OrderedDict()
+        self.__unpreparable: set[tuple[str, tuple[str, ...]]] = set()
+        self.__backend_pid = connection.info.backend_pid
+
+    def execute(self, cursor, sql: str, parameters: Any) -> None:
+        """Execute a statement on cursor, through its prepared statement if there is one"""
+        args = () if parameters is None else parameters
+        statement = self.__lookup(cursor, sql, args)
+        if statement is None:
+            cursor.execute(sql, parameters)
+            self.observe(sql)
+            return
+
+        name, count = statement
+        if count:
+            cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * count)})", args)
+        else:
+            cursor.execute(f"EXECUTE {name}")
+
+    def clear(self) -> None:
+        """Forget all prepared statements, e.g. after the session was reset"""
+        self.__statements.clear()
+        self.__counts.clear()
+        self.__unpreparable.clear()
+
+    def observe(self, sql: str) -> None:
+        """
+        Forget the prepared statements that SQL executed on the connection
+        without going through the cache deallocated
+
+        :param sql: Statement or script that was executed
+        """
+        if not self.__statements:
+            return
+        for match in _DEALLOCATE_RE.finditer(sql):
+            name = match.group(1)
+            if name is None or name.lower() == "all":
+                self.clear()
+                return
+            for key, (prepared, _) in list(self.__statements.items()):
+                if prepared == name.lower():
+                    del self.__statements[key]
+
+    def __lookup(self, cursor, sql: str, args: Any) -> tuple[str, int] | None:
+        if self.__connection.info.backend_pid != self.__backend_pid:
+            self.__backend_pid = self.__connection.info.backend_pid
+            self.clear()
+
+        if not isinstance(args, (tuple, list)):
+            self.stats.add("misses")
+            return None
+        types = tuple(parameter_type(arg) for arg in args)
+        key = (sql, types)
+
+        statement = self.__statements.get(key)
+        if statement is not None:
+            self.__statements.move_to_end(key)
+            self.stats.add("hits")
+            return statement
+
+        self.stats.add("misses")
+        if key in self.__unpreparable or None in types:
+            return None
+
+        count = self.__counts.pop(key, 0) + 1
+        if count < self.threshold:
+            self.__counts[key] = count
+            while len(self.__counts) > self.max_size * 10:
+                self.__counts.popitem(last=False)
+            return None
+
+        converted = to_positional(sql)
+        if (
+            converted is None
+            or converted[1] != len(args)
+            or not sql.lstrip().lower().startswith(_PREPARABLE)
+        ):
+            self.__mark_unpreparable(key)
+            return None
+
+        return self.__prepare(cursor, key, converted[0], converted[1])
+
+    def __prepare(
+        self, cursor, key: tuple[str, tuple[str, ...]], converted: str, count: int
+    ) -> tuple[str, int] | None:
+        status = self.__connection.info.transaction_status
+        if status == psycopg2.extensions.TRANSACTION_STATUS_INERROR:
+            return None
+
+        name = f"fortress_{next(_names)}"
+        types = f" ({', '.join(key[1])})" if key[1] else ""
+        prepare = f"PREPARE {name}{types} AS {converted}"
+        if self.__connection.autocommit:
+            try:
+                cursor.execute(prepare)
+            except psycopg2.Error:
+                self.__failed(key)
+                return None
+        else:
+            # A savepoint keeps a statement that cannot be prepared, e.g.
+            # because a parameter type cannot be inferred, from aborting the
+            # caller's transaction
+            try:
+                cursor.execute(
+                    f"SAVEPOINT fortress_prepare; {prepare}; "
+                    "RELEASE SAVEPOINT fortress_prepare"
+                )
+            except psycopg2.Error:
+                cursor.execute("ROLLBACK TO SAVEPOINT fortress_prepare")
+                self.__failed(key)
+                return None
+
+        self.stats.add("prepares")
+        self.__statements[key] = (name, count)
+        if len(self.__statements) > self.max_size:
+            _, (evicted, _) = self.__statements.popitem(last=False)
+            cursor.execute(f"DEALLOCATE {evicted}")
+            self.stats.add("evictions")
+        return name, count
+
+    def __failed(self, key: tuple[str, tuple[str, ...]]) -> None:
+        self.stats.add("failures")
+        self.__mark_unpreparable(key)
+
+    def __mark_unpreparable(self, key: tuple[str, tuple[str, ...]]) -> None:
+        if len(self.__unpreparable) >= self.max_size * 10:
+            self.__unpreparable.clear()
+        self.__unpreparable.add(key)
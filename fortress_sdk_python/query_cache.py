@@ -0,0 +1,346 @@
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Iterator
+
+from . import fork
+
+_IDENTIFIER = r'((?:"[^"]+"|[\w$]+)(?:\s*\.\s*(?:"[^"]+"|[\w$]+))*)'
+_READ_RE = re.compile(r"\b(?:from|join)\s+" + _IDENTIFIER, re.IGNORECASE)
+_WRITE_RE = re.compile(
+    r"\b(?:insert\s+into|update(?:\s+only)?|delete\s+from(?:\s+only)?"
+    r"|truncate(?:\s+table)?(?:\s+only)?|merge\s+into|copy"
+    r"|(?:alter|drop)\s+table(?:\s+if\s+exists)?(?:\s+only)?)\s+" + _IDENTIFIER,
+    re.IGNORECASE,
+)
+_LOCKING_RE = re.compile(r"\bfor\s+(?:update|share|no\s+key|key)\b", re.IGNORECASE)
+
+
+def _table_name(identifier: str) -> str:
+    # Tables are tracked by unqualified name, so a write through any schema
+    # invalidates reads through any other, which errs on the safe side
+    return identifier.rsplit(".", 1)[-1].strip().strip('"').lower()
+
+
+def read_tables(sql: str) -> frozenset[str] | None:
+    """
+    Tables a cacheable query reads from
+
+    :return: Table names, or None when the statement is not a plain SELECT
+        reading from at least one table
+    """
+    statement = sql.lstrip().lower()
+    if not statement.startswith(("select", "with")) or _LOCKING_RE.search(sql):
+        return None
+    if _WRITE_RE.search(sql):
+        return None
+    tables = frozenset(_table_name(match) for match in _READ_RE.findall(sql))
+    return tables or None
+
+
+def is_read_only(sql: str) -> bool:
+    """Whether a statement only reads, so running it again has no further effect"""
+    statement = sql.lstrip().lower()
+    if not statement.startswith(("select", "with", "values", "show", "table")):
+        return False
+    return not _LOCKING_RE.search(sql) and not _WRITE_RE.search(sql)
+
+
+def written_tables(sql: str) -> frozenset[str]:
+    """Tables a statement may write to"""
+    return frozenset(_table_name(match) for match in _WRITE_RE.findall(sql))
+
+
+def _parameters_key(parameters: Any) -> Hashable | None:
+    if parameters is None or parameters is ...:
+        return ()
+    if isinstance(parameters, dict):
+        parameters = tuple(sorted(parameters.items()))
+    else:
+        parameters = tuple(parameters)
+    try:
+        hash(parameters)
+    except TypeError:
+        return None
+    return parameters
+
+
+def _result_size(rows: list[tuple[Any, ...]]) -> int:
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+    return size
+
+
+class _Entry:
+    __slots__ = ("description", "rows", "size", "expires_at", "database", "tables")
+
+    def __init__(self, description, rows, size, expires_at, database, tables) -> None:
+        self.description = description
+        self.rows = rows
+        self.size = size
+        self.expires_at = expires_at
+        self.database = database
+        self.tables = tables
+
+
+class CachedRows:
+    """Result of a cache hit, read through the same methods as a psycopg2 cursor"""
+
+    def __init__(self, description, rows: list[tuple[Any, ...]]) -> None:
+        self.description = description
+        self.rowcount = len(rows)
+        self.lastrowid = None
+        self.arraysize = 1
+        self.itersize = 2000
+        self.__rows = rows
+        self.__position = 0
+
+    def fetchone(self) -> tuple[Any, ...] | None:
+        if self.__position >= len(self.__rows):
+            return None
+        self.__position += 1
+        return self.__rows[self.__position - 1]
+
+    def fetchmany(self, size: int) -> list[tuple[Any, ...]]:
+        rows = self.__rows[self.__position : self.__position + size]
+        self.__position += len(rows)
+        return rows
+
+    def fetchall(self) -> list[tuple[Any, ...]]:
+        rows = self.__rows[self.__position :]
+        self.__position = len(self.__rows)
+        return rows
+
+    def __iter__(self) -> Iterator[tuple[Any, ...]]:
+        while self.__position < len(self.__rows):
+            self.__position += 1
+            yield self.__rows[self.__position - 1]
+
+
+class QueryCache:
+    def __init__(
+        self,
+        ttl: float = 5.0,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_result_bytes: int = 1024 * 1024,
+    ) -> None:
+        """
+        Cache of query results per tenant
+
+        Results of plain SELECT statements are kept for ttl seconds, keyed by
+        tenant, statement and parameters. When a connection commits a write
+        to a table, the cached results reading from the table are dropped for
+        every tenant on the same database, as tenants with shared isolation
+        read the same tables. Writes made outside this process are only
+        picked up once entries expire.
+
+        :param ttl: Seconds a result stays cached
+        :param max_bytes: Approximate size of all cached results, least recently used results are evicted beyond it
+        :param max_result_bytes: Results larger than this are not cached
+        """
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_result_bytes = max_result_bytes
+
+        self.__entries: OrderedDict[tuple, _Entry] = OrderedDict()
+        # Keys of the results reading a table, by database and table
+        self.__tables: dict[tuple[Hashable, str], set[tuple]] = {}
+        self.__size = 0
+        self.__lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        fork.register(self)
+
+    def _after_fork(self) -> None:
+        # Cached results stay valid in the child, the lock may not
+        self.__lock = threading.Lock()
+
+    def get(self, tenant_id: str, sql: str, parameters: Any) -> CachedRows | None:
+        """Return the cached result of a query for a tenant, if any"""
+        parameters = _parameters_key(parameters)
+        if parameters is None:
+            return None
+
+        key = (tenant_id, sql, parameters)
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None or entry.expires_at <= time.monotonic():
+                if entry is not None:
+                    self.__remove(key)
+                self.misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.hits += 1
+            return CachedRows(entry.description, entry.rows)
+
+    def put(
+        self,
+        tenant_id: str,
+        sql: str,
+        parameters: Any,
+        tables: frozenset[str],
+        description,
+        rows: list[tuple[Any, ...]],
+        database: Hashable | None = None,
+    ) -> None:
+        """
+        Cache the result of a query for a tenant
+
+        :param database: Key of the database the tenant is on, writes to the tables on it drop the result, defaults to the tenant ID (optional)
+        """
+        parameters = _parameters_key(parameters)
+        if parameters is None:
+            return
+        size = _result_size(rows)
+        if size > self.max_result_bytes:
+            return
+
+        key = (tenant_id, sql, parameters)
+        if database is None:
+            database = tenant_id
+        entry = _Entry(
+            description, rows, size, time.monotonic() + self.ttl, database, tables
+        )
+        with self.__lock:
+            if key in self.__entries:
+                self.__remove(key)
+            self.__entries[key] = entry
+            self.__size += size
+            for table in tables:
+                self.__tables.setdefault((database, table), set()).add(key)
+            while self.__size > self.max_bytes:
+                self.__remove(next(iter(self.__entries)))
+                self.evictions += 1
+
+    def invalidate(self, tenant_id: str, tables: Iterable[str] | None = None) -> None:
+        """
+        Drop the cached results of a tenant
+
+        :param tenant_id: ID of the tenant
+        :param tables: Only drop results reading from these tables (optional)
+        """
+        names = None if tables is None else {_table_name(table) for table in tables}
+        with self.__lock:
+            keys = [
+                key
+                for key, entry in self.__entries.items()
+                if key[0] == tenant_id
+                and (names is None or not entry.tables.isdisjoint(names))
+            ]
+            self.__remove_all(keys)
+
+    def invalidate_tables(self, database: Hashable, tables: Iterable[str]) -> None:
+        """
+        Drop the cached results of all tenants on a database reading from tables
+
+        :param database: Key of the database, as passed to put
+        :param tables: Tables that were written to
+        """
+        with self.__lock:
+            keys = set()
+            for table in tables:
+                keys.update(self.__tables.get((database, _table_name(table)), ()))
+            self.__remove_all(keys)
+
+    def clear(self) -> None:
+        """Drop all cached results"""
+        with self.__lock:
+            self.__entries.clear()
+            self.__tables.clear()
+            self.__size = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Return hit, miss, eviction and invalidation counts, the hit rate and the cache size"""
+        with self.__lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self.__entries),
+                "bytes": self.__size,
+            }
+
+    def __remove_all(self, keys: Iterable[tuple]) -> None:
+        for key in keys:
+            if key in self.__entries:
+                self.__remove(key)
+                self.invalidations += 1
+
+    def __remove(self, key: tuple) -> None:
+        entry = self.__entries.pop(key)
+        self.__size -= entry.size
+        for table in entry.tables:
+            keys = self.__tables.get((entry.database, table))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.__tables[(entry.database, table)]
+
+
+class QueryScope:
+    def __init__(
+        self, cache: QueryCache, tenant_id: str, database: Hashable | None = None
+    ) -> None:
+        """
+        Query cache use of one connection on behalf of one tenant
+
+        Tracks the tables written in the current transaction: reads of those
+        tables bypass the cache until the transaction ends, and a commit drops
+        the cached results for them of every tenant on the database.
+
+        :param database: Key of the database the connection is on, defaults to the tenant ID (optional)
+        """
+        self.cache = cache
+        self.tenant_id = tenant_id
+        self.database = database if database is not None else tenant_id
+        self.__pending: set[str] = set()
+
+    def lookup(
+        self, sql: str, parameters: Any, autocommit: bool = False
+    ) -> tuple[CachedRows | None, frozenset[str] | None]:
+        """
+        Look up a statement before it is executed, recording it as a write
+        when it is not a cacheable read
+
+        :return: Cached result, if any, and the tables to cache the result
+            under, or None when the result must not be cached
+        """
+        tables = read_tables(sql)
+        if tables is None:
+            self.record_write(sql, autocommit)
+            return None, None
+        if not self.__pending.isdisjoint(tables):
+            return None, None
+        return self.cache.get(self.tenant_id, sql, parameters), tables
+
+    def store(
+        self, sql: str, parameters: Any, tables: frozenset[str], description, rows
+    ) -> None:
+        self.cache.put(
+            self.tenant_id, sql, parameters, tables, description, rows, self.database
+        )
+
+    def record_write(self, sql: str, autocommit: bool = False) -> None:
+        """Record the tables a statement writes to, dropping their results right away in autocommit mode"""
+        self.record_tables(written_tables(sql), autocommit)
+
+    def record_tables(self, tables: Iterable[str], autocommit: bool = False) -> None:
+        self.__pending.update(_table_name(table) for table in tables)
+        if autocommit:
+            self.commit()
+
+    def commit(self) -> None:
+        if self.__pending:
+            self.cache.invalidate_tables(self.database, self.__pending)
+            self.__pending.clear()
+
+    def rollback(self) -> None:
+        self.__pending.clear()
@@ -0,0 +1,104 @@
+import threading
+from typing import Any, Awaitable, Callable, Hashable
+
+from .lazy import lazy_module
+
+asyncio = lazy_module("asyncio")
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        """
+        Coalesce concurrent calls for the same key into a single call
+
+        While a call for a key is in flight, other threads calling with the
+        same key wait for it and share its result or error.
+        """
+        self.__lock = threading.Lock()
+        self.__calls: dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, function: Callable[[], Any]) -> Any:
+        """
+        Call function unless a call for key is already in flight, then wait for it
+
+        :param key: Key identifying the call
+        :param function: Called without arguments by the first caller
+        :return: Result of the call
+        """
+        with self.__lock:
+            call = self.__calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.__calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.__lock:
+                del self.__calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    def __init__(self) -> None:
+        """
+        Coalesce concurrent awaits for the same key into a single coroutine
+
+        While a call for a key is in flight, other tasks calling with the same
+        key await it and share its result or error. When the task making the
+        call is cancelled, a waiting task makes the call instead.
+        """
+        self.__calls: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, function: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await function unless a call for key is already in flight, then await that
+
+        :param key: Key identifying the call
+        :param function: Called without arguments by the first caller
+        :return: Result of the call
+        """
+        while (future := self.__calls.get(key)) is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Only the caller that was cancelled gives up, the others
+                # start over and one of them makes the call
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+        future = self.__calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await function()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the error as retrieved for when no other task awaits it
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self.__calls[key]
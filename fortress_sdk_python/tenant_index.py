@@ -0,0 +1,125 @@
+import threading
+from typing import Iterator
+
+from .client import NEXT_TOKEN_FIELD, Client, Tenant, parse_tenant
+
+
+class TenantIndex:
+    def __init__(self, client: Client) -> None:
+        """
+        Local index of an organization's tenants, by tenant ID and by database
+
+        refresh first downloads the full list. Later calls only fetch the
+        tenants created since the newest one indexed, which does not notice
+        deleted tenants, or with full=True re-download the list when its ETag
+        changed.
+
+        :param client: Client used to list the tenants
+        """
+        self.__client = client
+        self.__tenants: dict[str, Tenant] = {}
+        # Dicts used as ordered sets of tenant IDs
+        self.__by_database: dict[str, dict[str, None]] = {}
+        self.__etag: str | None = None
+        self.__newest = None
+        self.__loaded = False
+        self.__lock = threading.Lock()
+
+    def refresh(self, full: bool = False) -> int:
+        """
+        Bring the index up to date with the Fortress platform
+
+        :param full: Re-download the full list if it changed, to also drop deleted tenants (optional)
+        :return: Number of tenants added or updated
+        """
+        if full or not self.__loaded:
+            return self.__refresh_full()
+
+        count = 0
+        for tenant in self.__client.iter_tenants(created_since=self.__newest):
+            if self.__tenants.get(tenant.id) != tenant:
+                self.add(tenant)
+                count += 1
+        return count
+
+    def get(self, tenant_id: str) -> Tenant | None:
+        """Return the tenant with an ID, if indexed"""
+        return self.__tenants.get(tenant_id)
+
+    def by_database(self, database_id: str) -> list[Tenant]:
+        """Return the indexed tenants of a database"""
+        tenants = self.__tenants
+        return [
+            tenants[tenant_id]
+            for tenant_id in self.__by_database.get(database_id, ())
+            if tenant_id in tenants
+        ]
+
+    def add(self, tenant: Tenant) -> None:
+        """Index a tenant, replacing the one with the same ID"""
+        with self.__lock:
+            self.__remove(tenant.id)
+            self.__tenants[tenant.id] = tenant
+            self.__by_database.setdefault(tenant.database_id, {})[tenant.id] = None
+            if self.__newest is None or tenant.created_date > self.__newest:
+                self.__newest = tenant.created_date
+
+    def discard(self, tenant_id: str) -> None:
+        """Remove a tenant from the index, e.g. after deleting it"""
+        with self.__lock:
+            self.__remove(tenant_id)
+
+    def __contains__(self, tenant_id: str) -> bool:
+        return tenant_id in self.__tenants
+
+    def __len__(self) -> int:
+        return len(self.__tenants)
+
+    def __iter__(self) -> Iterator[Tenant]:
+        return iter(list(self.__tenants.values()))
+
+    def __refresh_full(self) -> int:
+        listing = self.__client.stream_list("tenants", etag=self.__etag)
+        if listing is None:
+            return 0
+
+        tenants: dict[str, Tenant] = {}
+        by_database: dict[str, dict[str, None]] = {}
+        newest = None
+        pages = 1
+        while True:
+            for data in listing:
+                tenant = parse_tenant(data)
+                tenants[tenant.id] = tenant
+                by_database.setdefault(tenant.database_id, {})[tenant.id] = None
+                if newest is None or tenant.created_date > newest:
+                    newest = tenant.created_date
+            if listing.next_token is None:
+                break
+            listing = self.__client.stream_list(
+                "tenants", {NEXT_TOKEN_FIELD: listing.next_token}
+            )
+            pages += 1
+
+        count = sum(
+            1
+            for tenant_id, tenant in tenants.items()
+            if self.__tenants.get(tenant_id) != tenant
+        )
+        with self.__lock:
+            self.__tenants = tenants
+            self.__by_database = by_database
+            self.__newest = newest
+            # The ETag of the first page does not cover the following pages
+            self.__etag = listing.etag if pages == 1 else None
+            self.__loaded = True
+        return count
+
+    def __remove(self, tenant_id: str) -> None:
+        tenant = self.__tenants.pop(tenant_id, None)
+        if tenant is not None:
+            tenant_ids = self.__by_database.get(tenant.database_id)
+            if tenant_ids is not None:
+                tenant_ids.pop(tenant_id, None)
+                if not tenant_ids:
+                    del self.__by_database[tenant.database_id]
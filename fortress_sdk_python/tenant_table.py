@@ -0,0 +1,110 @@
+from array import array
+from typing import Iterable, Iterator
+
+from .client import Tenant
+
+
+class _StringColumn:
+    """Strings stored back to back as UTF-8 in one buffer, decoded on access"""
+
+    def __init__(self) -> None:
+        self.__data = bytearray()
+        self.__ends = array("Q")
+
+    def append(self, value: str) -> None:
+        self.__data += value.encode()
+        self.__ends.append(len(self.__data))
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += len(self.__ends)
+        start = self.__ends[index - 1] if index > 0 else 0
+        return self.__data[start : self.__ends[index]].decode()
+
+    def __len__(self) -> int:
+        return len(self.__ends)
+
+    def __iter__(self) -> Iterator[str]:
+        data = self.__data
+        start = 0
+        for end in self.__ends:
+            yield data[start:end].decode()
+            start = end
+
+
+class TenantTable:
+    def __init__(self, tenants: Iterable[Tenant] = ()) -> None:
+        """
+        Column-oriented container for large tenant listings
+
+        Tenants are stored as columns rather than one object each: IDs and
+        creation dates are packed into byte buffers, and aliases and database
+        IDs are kept once in a string table and referenced by index from
+        integer arrays. Tenant objects are only built, and their creation
+        dates parsed, when rows are read.
+
+        :param tenants: Tenants to add (optional)
+        """
+        self.__ids = _StringColumn()
+        self.__created = _StringColumn()
+        self.__aliases = array("I")
+        self.__database_ids = array("I")
+        self.__strings: list[str] = []
+        self.__string_indexes: dict[str, int] = {}
+        # Built on the first lookup by ID
+        self.__rows: dict[str, int] | None = None
+        self.extend(tenants)
+
+    def append(self, tenant: Tenant) -> None:
+        """Add a tenant"""
+        if self.__rows is not None:
+            self.__rows[tenant.id] = len(self.__ids)
+        self.__ids.append(tenant.id)
+        self.__created.append(tenant.created_date.isoformat())
+        self.__aliases.append(self.__string_index(tenant.alias))
+        self.__database_ids.append(self.__string_index(tenant.database_id))
+
+    def extend(self, tenants: Iterable[Tenant]) -> None:
+        """Add tenants, e.g. straight from Fortress.iter_tenants"""
+        for tenant in tenants:
+            self.append(tenant)
+
+    def get(self, tenant_id: str) -> Tenant | None:
+        """Return the tenant with an ID, if present"""
+        if self.__rows is None:
+            self.__rows = {id: row for row, id in enumerate(self.__ids)}
+        row = self.__rows.get(tenant_id)
+        return self[row] if row is not None else None
+
+    def ids(self) -> Iterator[str]:
+        """IDs of all tenants, in insertion order"""
+        return iter(self.__ids)
+
+    def database_ids(self) -> set[str]:
+        """IDs of the databases the tenants are on"""
+        return {self.__strings[index] for index in set(self.__database_ids)}
+
+    def __len__(self) -> int:
+        return len(self.__ids)
+
+    def __getitem__(self, row: int) -> Tenant:
+        return Tenant(
+            id=self.__ids[row],
+            alias=self.__strings[self.__aliases[row]],
+            database_id=self.__strings[self.__database_ids[row]],
+            created_date=self.__created[row],
+        )
+
+    def __iter__(self) -> Iterator[Tenant]:
+        for row in range(len(self.__ids)):
+            yield self[row]
+
+    def __contains__(self, tenant_id: str) -> bool:
+        return self.get(tenant_id) is not None
+
+    def __string_index(self, value: str) -> int:
+        index = self.__string_indexes.get(value)
+        if index is None:
+            index = self.__string_indexes[value] = len(self.__strings)
+            self.__strings.append(value)
+        return index
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from fortress_sdk_python.async_pool import AsyncConnectionPool, AsyncPooledConnection
+from fortress_sdk_python.pool import PoolTimeout
+
+
+class FakeConnection:
+    isolation_level = "read committed"
+
+    def __init__(self) -> None:
+        self.in_transaction = False
+        self.closed = False
+
+    async def execute(self, sql, parameters=...):
+        self.in_transaction = True
+
+    async def commit(self) -> None:
+        self.in_transaction = False
+
+    async def rollback(self) -> None:
+        self.in_transaction = False
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+async def connect() -> FakeConnection:
+    return FakeConnection()
+
+
+def test_concurrent_tasks_get_their_own_connection():
+    async def main():
+        pool = AsyncConnectionPool(max_size=2)
+        seen = []
+
+        async def task():
+            async with AsyncPooledConnection(
+                pool, await pool.checkout("db", connect)
+            ) as connection:
+                seen.append(connection._AsyncPooledConnection__connection)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(task(), task(), task(), task())
+        return seen, pool.stats()
+
+    seen, stats = asyncio.run(main())
+    assert len({id(connection) for connection in seen}) == 2
+    assert stats == {"keys": 1, "total": 2, "idle": 2, "in_use": 0}
+
+
+def test_exhausted_pool_times_out():
+    async def main():
+        pool = AsyncConnectionPool(max_size=1, timeout=0.01)
+        await pool.checkout("db", connect)
+        await pool.checkout("db", connect)
+
+    with pytest.raises(PoolTimeout):
+        asyncio.run(main())
+
+
+def test_checkin_rolls_back_and_discards_closed_connections():
+    async def main():
+        pool = AsyncConnectionPool(max_size=2)
+        connection = AsyncPooledConnection(pool, await pool.checkout("db", connect))
+        await connection.execute("insert into t values (1)")
+        await connection.close()
+        reused = await pool.checkout("db", connect)
+        in_transaction = reused.in_transaction
+
+        await reused.close()
+        await pool.checkin(reused)
+        return in_transaction, pool.stats()
+
+    in_transaction, stats = asyncio.run(main())
+    assert not in_transaction
+    assert stats == {"keys": 0, "total": 0, "idle": 0, "in_use": 0}
@@ -0,0 +1,46 @@
+import pytest
+
+from fortress_sdk_python import columns
+
+
+class FakeCursor:
+    def __init__(self, names: list[str], rows: list[tuple], type_code: int = 23):
+        self.description = tuple((name, type_code) for name in names)
+        self.__rows = rows
+
+    def fetchmany(self, size: int) -> list[tuple]:
+        rows, self.__rows = self.__rows[:size], self.__rows[size:]
+        return rows
+
+
+def test_column_names_unique():
+    description = (("a",), ("a",), ("a_1",), ("b",), ("a",))
+    assert columns.column_names(description) == ["a", "a_1", "a_1_1", "b", "a_2"]
+
+
+def test_column_batches_keep_repeated_names():
+    cursor = FakeCursor(["a", "a"], [(1, 2), (3, 4), (5, 6)])
+    batches = list(columns.iter_column_batches(cursor, 2))
+    assert batches == [{"a": [1, 3], "a_1": [2, 4]}, {"a": [5], "a_1": [6]}]
+
+
+def test_array_batches_keep_repeated_names():
+    numpy = pytest.importorskip("numpy")
+    cursor = FakeCursor(["a", "a"], [(1, 2), (3, 4)])
+    (batch,) = columns.iter_array_batches(cursor, 10)
+    assert list(batch) == ["a", "a_1"]
+    assert numpy.array_equal(batch["a_1"], [2, 4])
+
+
+def test_bool_column_keeps_nulls():
+    pytest.importorskip("numpy")
+    array = columns.to_array([True, None, False], 16)
+    assert array.dtype == object
+    assert list(array) == [True, None, False]
+
+
+def test_no_description_raises():
+    cursor = FakeCursor([], [])
+    cursor.description = None
+    with pytest.raises(ValueError):
+        list(columns.iter_column_batches(cursor, 10))
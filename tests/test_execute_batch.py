@@ -0,0 +1,59 @@
+"""
+Runs against a PostgreSQL database given by FORTRESS_TEST_DSN, e.g.
+
+    FORTRESS_TEST_DSN="dbname=postgres user=postgres" python -m pytest tests
+"""
+
+import os
+
+import pytest
+
+psycopg2 = pytest.importorskip("psycopg2")
+
+from fortress_sdk_python.postgres import BatchError, PostgresConnection
+
+DSN = os.environ.get("FORTRESS_TEST_DSN")
+
+pytestmark = pytest.mark.skipif(DSN is None, reason="FORTRESS_TEST_DSN is not set")
+
+
+@pytest.fixture
+def connection():
+    connection = PostgresConnection(psycopg2.connect(DSN))
+    yield connection
+    connection.rollback()
+    connection.close()
+
+
+def test_atomic_failure_keeps_earlier_work(connection):
+    connection.execute("CREATE TEMP TABLE batch_items (id int PRIMARY KEY)")
+    connection.execute("INSERT INTO batch_items VALUES (1)")
+
+    with pytest.raises(BatchError) as raised:
+        connection.execute_batch(
+            [
+                ("INSERT INTO batch_items VALUES (%s)", (2,)),
+                ("SELECT count(*) FROM batch_items", None),
+                ("INSERT INTO batch_items VALUES (%s)", (1,)),
+            ]
+        )
+    assert raised.value.index == 2
+
+    rows = connection.execute("SELECT id FROM batch_items ORDER BY id").fetchall()
+    assert rows == [(1,)]
+
+
+def test_non_atomic_failure_skips_statement(connection):
+    connection.execute("CREATE TEMP TABLE batch_items (id int PRIMARY KEY)")
+    connection.execute("INSERT INTO batch_items VALUES (1)")
+
+    results = connection.execute_batch(
+        [
+            ("INSERT INTO batch_items VALUES (%s)", (1,)),
+            ("INSERT INTO batch_items VALUES (%s)", (2,)),
+            ("SELECT count(*) FROM batch_items", None),
+        ],
+        atomic=False,
+    )
+    assert results[0].error is not None
+    assert results[2].rows == [(2,)]
@@ -0,0 +1,50 @@
+import pytest
+
+from fortress_sdk_python.pool import PooledConnection
+
+
+class FakePool:
+    def __init__(self) -> None:
+        self.checked_in = []
+
+    def checkin(self, connection, discard: bool = False) -> None:
+        self.checked_in.append((connection, discard))
+
+
+class LostConnection:
+    isolation_level = "read committed"
+    in_transaction = False
+    closed = False
+
+    def execute(self, sql, parameters=...):
+        self.closed = True
+        raise ConnectionError("server closed the connection")
+
+
+def test_failed_reconnect_raises_its_error_until_closed():
+    pool = FakePool()
+    lost = LostConnection()
+
+    def reconnect():
+        raise ConnectionError("could not connect to server")
+
+    connection = PooledConnection(
+        pool,
+        lost,
+        reconnect=reconnect,
+        retries=1,
+        backoff_factor=0,
+        is_disconnect=lambda e: isinstance(e, ConnectionError),
+    )
+
+    with pytest.raises(ConnectionError, match="could not connect"):
+        connection.execute("select 1")
+    assert pool.checked_in == [(lost, True)]
+    assert connection.closed
+
+    with pytest.raises(ConnectionError, match="could not connect"):
+        connection.cursor()
+
+    connection.close()
+    with pytest.raises(ValueError, match="already been returned"):
+        connection.cursor()
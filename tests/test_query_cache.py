@@ -0,0 +1,46 @@
+from fortress_sdk_python.query_cache import QueryCache, QueryScope
+
+SQL = "select count(*) from qc"
+
+
+def cached(cache: QueryCache, tenant_id: str) -> list | None:
+    result = cache.get(tenant_id, SQL, None)
+    return None if result is None else result.fetchall()
+
+
+def test_commit_invalidates_tenants_on_the_same_database():
+    cache = QueryCache(ttl=60)
+    writer = QueryScope(cache, "tenant-1", "database-1")
+    QueryScope(cache, "tenant-2", "database-1").store(
+        SQL, None, frozenset({"qc"}), None, [(1,)]
+    )
+    QueryScope(cache, "tenant-3", "database-2").store(
+        SQL, None, frozenset({"qc"}), None, [(1,)]
+    )
+
+    writer.record_write("insert into qc values (1)")
+    assert cached(cache, "tenant-2") == [(1,)]
+    writer.commit()
+
+    assert cached(cache, "tenant-2") is None
+    assert cached(cache, "tenant-3") == [(1,)]
+
+
+def test_rollback_keeps_results():
+    cache = QueryCache(ttl=60)
+    scope = QueryScope(cache, "tenant-1", "database-1")
+    scope.store(SQL, None, frozenset({"qc"}), None, [(1,)])
+    scope.record_write("delete from qc")
+    scope.rollback()
+    scope.commit()
+    assert cached(cache, "tenant-1") == [(1,)]
+
+
+def test_invalidate_tenant_tables():
+    cache = QueryCache(ttl=60)
+    cache.put("tenant-1", SQL, None, frozenset({"qc"}), None, [(1,)], "database-1")
+    cache.put("tenant-2", SQL, None, frozenset({"qc"}), None, [(2,)], "database-1")
+    cache.invalidate("tenant-1", ["public.qc"])
+    assert cached(cache, "tenant-1") is None
+    assert cached(cache, "tenant-2") == [(2,)]
+    assert cache.stats()["entries"] == 1